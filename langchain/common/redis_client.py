@@ -1,64 +1,184 @@
-import redis
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import logging
 import uuid
 import os
+from typing import Optional
+
+import redis.asyncio as redis
+
+from src.utils.metrics import record_lease_rejection
+
+logger = logging.getLogger(__name__)
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 64))
 MAX_USERS = int(os.getenv("MAX_USERS", 10))
 TTL_SECONDS = int(os.getenv("TTL_SECONDS", 3600))
+# 오래 걸리는 요청은 이 주기로 lease 만료 시간을 TTL_SECONDS 만큼 다시 늘림
+HEARTBEAT_SECONDS = float(os.getenv("LEASE_HEARTBEAT_SECONDS", 60))
+
+# 사용자 flow lease : member = lease id, score = 만료 시각(ms, Redis 서버 시계)
+LEASE_KEY = "flow:1:leases"
+# lease id 서명 키 (필수). 재시작/--reload 후에도, 여러 서버/worker 사이에서도 같은 값이어야
+# 이미 발급한 lease를 반납할 수 있다. 프로세스마다 랜덤 키를 쓰면 반납이 TTL 만료까지 밀린다.
+LEASE_SECRET = os.getenv("LEASE_SECRET")
+if not LEASE_SECRET:
+    raise RuntimeError("LEASE_SECRET environment variable is required to sign flow lease ids")
 
-redis_client = redis.Redis(
+# 모든 worker / 요청이 같은 connection pool을 공유 (redis.asyncio라서 이벤트 루프를 막지 않음)
+redis_pool = redis.ConnectionPool(
     host=REDIS_HOST,
     port=REDIS_PORT,
     db=0,
-    decode_responses=True
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS
 )
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+# 스크립트마다 만료된 lease를 먼저 지우므로 SCAN 없이 ZCARD로 현재 사용자 수를 셀 수 있다.
+# 시각은 Redis TIME을 사용해 서버(worker)마다 시계가 달라도 같은 기준으로 만료를 판단한다.
+_NOW_MS = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+"""
+
+# ARGV: lease id, max users, ttl(ms) → 1(획득) / 0(정원 초과)
+_ACQUIRE_SCRIPT = redis_client.register_script(_NOW_MS + """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+    return 1
+end
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+return 1
+""")
+
+# ARGV: lease id → 남은 lease 수
+_RELEASE_SCRIPT = redis_client.register_script(_NOW_MS + """
+redis.call('ZREM', KEYS[1], ARGV[1])
+return redis.call('ZCARD', KEYS[1])
+""")
+
+# ARGV: lease id, ttl(ms) → 1(연장) / 0(이미 만료 또는 반납됨)
+_RENEW_SCRIPT = redis_client.register_script(_NOW_MS + """
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+return 1
+""")
+
+_COUNT_SCRIPT = redis_client.register_script(_NOW_MS + """
+return redis.call('ZCARD', KEYS[1])
+""")
+
+
+def _sign(nonce: str) -> str:
+    return hmac.new(LEASE_SECRET.encode(), nonce.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def new_lease_id() -> str:
+    """서명된 lease id ("<uuid>.<서명>")"""
+    nonce = uuid.uuid4().hex
+    return f"{nonce}.{_sign(nonce)}"
+
+
+def verify_lease(lease_id: Optional[str]) -> bool:
+    """이 서비스가 발급한 lease id 인지 확인 (클라이언트가 다른 사용자의 lease를 만들어 쓰지 못하도록)"""
+    if not lease_id:
+        return False
+    nonce, _, signature = lease_id.partition(".")
+    return bool(nonce) and hmac.compare_digest(signature, _sign(nonce))
+
 
-def get_current_users() -> int:
-    current = redis_client.get("flow:1:current_users")
-    current_value = int(current) if current else 0
-    print(f"[DEBUG] get_current_users: current_users = {current_value}/{MAX_USERS}")
+def _check_lease(lease_id: Optional[str], action: str) -> bool:
+    """renew / release 전에 lease id 확인. 없거나 서명이 맞지 않으면 metric을 남기고 False"""
+    if not lease_id:
+        logger.warning(f"Lease {action} skipped: no lease id")
+        record_lease_rejection(action, "missing")
+        return False
+    if not verify_lease(lease_id):
+        logger.warning(f"Lease {action} skipped: lease id was not issued by this service")
+        record_lease_rejection(action, "invalid")
+        return False
+    return True
+
+
+async def get_current_users() -> int:
+    """만료되지 않은 lease 수"""
+    current_value = int(await _COUNT_SCRIPT(keys=[LEASE_KEY]))
+    logger.debug(f"get_current_users: current_users = {current_value}/{MAX_USERS}")
     return current_value
 
-def increment_users() -> str:
-    current_users = get_current_users()
-    print(f"[DEBUG] increment_users: Checking limit, current_users = {current_users}, MAX_USERS = {MAX_USERS}")
-    
-    if current_users >= MAX_USERS:
-        print(f"[DEBUG] increment_users: Max users exceeded, returning None")
+
+async def increment_users(lease_id: str = None) -> Optional[str]:
+    """사용자 lease 획득 (정원 확인과 추가를 Lua 스크립트 1번으로 처리해서 동시 요청에도 MAX_USERS를 넘지 않음)
+
+    Args:
+        lease_id: 이미 가진 lease id (이 서비스가 발급한 id면 만료 시간만 연장, 아니면 새로 발급)
+
+    Returns:
+        str: lease id (정원 초과면 None)
+    """
+    if not verify_lease(lease_id):
+        lease_id = new_lease_id()
+    acquired = await _ACQUIRE_SCRIPT(keys=[LEASE_KEY], args=[lease_id, MAX_USERS, TTL_SECONDS * 1000])
+    if not acquired:
+        logger.debug(f"increment_users: Max users exceeded ({MAX_USERS})")
         return None
-    
-    request_id = str(uuid.uuid4())
-    user_key = f"flow:1:user:{request_id}"
-    print(f"[DEBUG] increment_users: Generated request_id = {request_id}, user_key = {user_key}")
-    
-    redis_client.incr("flow:1:current_users")
-    redis_client.setex(user_key, TTL_SECONDS, "active")
-    
-    new_count = get_current_users()
-    print(f"[DEBUG] increment_users: Incremented count, new_count = {new_count}/{MAX_USERS}, TTL set to {TTL_SECONDS}s")
-    return request_id
-
-def decrement_users():
-    current = get_current_users()
-    print(f"[DEBUG] decrement_users: Starting with current_users = {current}")
-    
-    if current <= 0:
-        print(f"[DEBUG] decrement_users: No users to decrement, exiting")
+    logger.debug(f"increment_users: Acquired lease {lease_id}, TTL {TTL_SECONDS}s")
+    return lease_id
+
+
+async def decrement_users(lease_id: Optional[str]) -> int:
+    """사용자 lease 반납
+
+    Args:
+        lease_id: 반납할 lease id (없거나 이 서비스가 발급한 id가 아니면 반납하지 않고 TTL 만료에 맡김)
+
+    Returns:
+        int: 남은 lease 수
+    """
+    if not _check_lease(lease_id, "release"):
+        return await get_current_users()
+    remaining = int(await _RELEASE_SCRIPT(keys=[LEASE_KEY], args=[lease_id]))
+    logger.debug(f"decrement_users: Released lease {lease_id}, current_users = {remaining}")
+    return remaining
+
+
+async def renew_lease(lease_id: str) -> bool:
+    """lease 만료 시간을 지금부터 TTL_SECONDS 뒤로 연장 (이미 만료됐거나 발급하지 않은 id면 False)"""
+    if not _check_lease(lease_id, "renew"):
+        return False
+    return bool(await _RENEW_SCRIPT(keys=[LEASE_KEY], args=[lease_id, TTL_SECONDS * 1000]))
+
+
+@contextlib.asynccontextmanager
+async def lease_heartbeat(lease_id: Optional[str], interval: float = HEARTBEAT_SECONDS):
+    """블록이 실행되는 동안 주기적으로 lease를 연장 (TTL보다 오래 걸리는 요청이 만료로 빠지지 않도록)"""
+    if not verify_lease(lease_id):
+        yield
         return
-    
-    expired = 0
-    for key in redis_client.scan_iter("flow:1:user:*"):
-        if not redis_client.exists(key):
-            expired += 1
-            print(f"[DEBUG] decrement_users: Found expired key = {key}")
-    
-    if expired > 0:
-        redis_client.decr("flow:1:current_users", expired)
-        print(f"[DEBUG] decrement_users: Decreased count by {expired} expired keys, new_count = {get_current_users()}")
-    
-    if get_current_users() > 0:
-        redis_client.decr("flow:1:current_users")
-        print(f"[DEBUG] decrement_users: Decreased count by 1, final_count = {get_current_users()}")
-    else:
-        print(f"[DEBUG] decrement_users: Count already at 0 after expired keys, no further decrement")
\ No newline at end of file
+
+    async def beat():
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await renew_lease(lease_id):
+                    logger.warning(f"Lease {lease_id} expired before heartbeat")
+                    return
+            except Exception as e:
+                logger.warning(f"Lease heartbeat failed for {lease_id}: {e}")
+
+    task = asyncio.ensure_future(beat())
+    try:
+        yield
+    finally:
+        task.cancel()
@@ -20,6 +20,17 @@ from src.configs.call_config import Completions
 from src.configs.openai_config import OpenAIConfig, OpenAIConfig_Language
 from src.openai.openai_api_call import OpenAIService
 from src.utils.batch_handler import BatchRequestHandler
+from src.utils.sse import format_sse, format_ndjson, merge_streams, NDJSON_MEDIA_TYPE
+from src.utils.request_context import gather_with_deadline, run_with_deadline, scheduling_scope, deadline_scope, DeadlineExceeded
+from src.configs.batch_config import DeadlineConfig, GuidedSchemaConfig
+from src.utils.keyword_prefetch import keyword_prefetcher
+from src.utils.prompt_registry import prompt_registry
+from src.utils.block_catalog import modoo_block_catalog
+from src.utils.guided_schema import guided_schema_builder
+from src.utils.bulk_jobs import bulk_job_manager
+from src.utils.http_pools import http_pools
+from src.utils.metrics import observe_endpoint, render_metrics
+from src.utils.tracing import tracer, use_span, end_after
 
 from src.openai.land.openai_usrmsgclient import OpenAIUsrMsgClient
 # from src.openai.land.openai_pdfsummary import OpenAIPDFSummaryClient, OpenAIComprehensiveProposalClient, OpenAIProposalClient
@@ -32,11 +43,12 @@ from src.openai.land.openai_blockrecommend import OpenAIBlockSelector
 from src.openai.land.openai_blockcontentgenerator import OpenAIBlockContentGenerator
 from src.openai.land.openai_keywordforimage import OpenAIKeywordClient
 from src.openai.land.openai_text_regenerate import OpenAITextRegenerator
+from src.openai.land.openai_landing_pipeline import OpenAILandingPipeline
 
 from src.openai.modoo.openai_formainsection import OpenAIhtmltosectioncontents
 from src.openai.modoo.openai_forsubpage import OpenAIhtmltopagecontents
 
-from common.redis_client import get_current_users, increment_users, decrement_users
+from common.redis_client import get_current_users, increment_users, decrement_users, lease_heartbeat
 
 from src.configs.call_config import SubpageArgs
 from src.openai.subpage.openai_subpage_usrmsgsummarize import OpenAIUsrMsgProposalGenerator
@@ -53,19 +65,64 @@ from src.openai.subpage.openai_subpage_text_regenerate import OpenAITextRegenera
 # ------------------------------------------------------------------------ #
 # outdoor lib
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, ORJSONResponse, FileResponse, Response
 from pydantic import BaseModel
+import os
 import time
 import torch
 import gc
 from pymilvus import Collection
-from typing import List
+from typing import List, Optional
 import logging
 import asyncio
 # import random
 
 
-app = FastAPI()
+# orjson으로 응답 직렬화 (기본 json 인코더보다 빠르고 한글을 escape 하지 않음)
+app = FastAPI(default_response_class=ORJSONResponse)
+
+
+@app.middleware("http")
+async def record_endpoint_latency(request: Request, call_next):
+    """엔드포인트별 응답 시간 기록 (스트리밍 응답은 헤더를 보낼 때까지의 시간)"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # path 대신 route 경로(/api/bulk_jobs/{job_id})를 label로 사용해서 시계열 수가 늘지 않게 함
+        route = request.scope.get("route")
+        observe_endpoint(request.method, getattr(route, "path", "unmatched"), status, time.perf_counter() - start)
+
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """요청 1건을 root span으로 기록 (sampling된 요청만, 응답 헤더 X-Trace-Id로 trace id 반환)"""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    root = tracer.new_trace(f"{request.method} {request.url.path}",
+                            traceparent=request.headers.get("traceparent"),
+                            **{"http.method": request.method, "http.target": request.url.path})
+    # sampling되지 않은 요청도 NOOP span을 현재 span으로 지정해서 하위 span이 새 trace를 만들지 않게 함
+    try:
+        with use_span(root):
+            response = await call_next(request)
+    except BaseException as e:
+        root.end(e)
+        raise
+    if not root.sampled:
+        return response
+    route = request.scope.get("route")
+    if route is not None:
+        root.name = f"{request.method} {route.path}"
+    root.set_attribute("http.status_code", response.status_code)
+    response.headers["X-Trace-Id"] = root.trace.trace_id
+    # 스트리밍 응답은 생성이 끝날 때까지 root span을 열어 둠
+    response.body_iterator = end_after(response.body_iterator, root)
+    return response
 
 
 # ---------------------------------
@@ -85,7 +142,9 @@ async def generate_menu(path: str = '', path2: str = '', path3: str = ''):
         start = time.time()
         # ContentChain에서 결과 생성
         content_chain = ContentChain()
-        result = content_chain.run(
+        # ContentChain은 동기 Ollama 호출을 하므로 이벤트 루프를 막지 않도록 스레드에서 실행
+        result = await asyncio.to_thread(
+            content_chain.run,
             pdf_data,
             model='bllossom',
             value_type='menu'
@@ -446,6 +505,23 @@ openai_config = OpenAIConfig()
 openai_config_language = OpenAIConfig_Language()
 openai_service = OpenAIService(openai_config)
 batch_handler = BatchRequestHandler(openai_service)
+deadline_config = DeadlineConfig()
+
+
+def request_tenant(requests) -> Optional[str]:
+    """요청 묶음의 tenant (Completions.user). 동시 실행 슬롯을 tenant 사이에 공정하게 나눌 때 사용"""
+    return next((req.user for req in requests if getattr(req, "user", None)), None)
+
+
+# 1번 API 응답의 lease_id를 이후 API 호출에 실어 보내는 헤더
+LEASE_HEADER = "X-Flow-Lease"
+
+def flow_lease(http_request: Request) -> Optional[str]:
+    """요청의 사용자 lease id (헤더가 없으면 None → 반납하지 않고 TTL 만료에 맡김)
+
+    서명 확인은 common.redis_client 에서 하므로 헤더 값을 그대로 넘긴다.
+    """
+    return http_request.headers.get(LEASE_HEADER)
 
 MAX_TOKENS_USR_MSG_PROPOSAL = 500
 MAX_TOKENS_SUMMARIZE_TEXT = 1000
@@ -456,15 +532,29 @@ MAX_TOKENS_CREATE_SECTION_CONTENTS = 1800
 MAX_TOKENS_SELECT_BLOCK = 50
 MAX_TOKENS_GENERATE_CONTENTS = 250
 MAX_TOKENS_SECTION_KEYWORD_RECOMMEND = 100
+# Modoo 서브페이지 변환에서 동시에 처리할 섹션 수
+MODOO_SECTION_CONCURRENCY = 6
 
 @app.post("/batch_completions")
-async def batch_completions(requests: List[Completions]):
+async def batch_completions(requests: List[Completions], compact: bool = False, stream: bool = False):
+    """배치 completion
+
+    Query:
+        compact: True면 항목마다 {"request_id", "success", "text"} 만 (실패 시 "error", "error_type")
+        stream: True면 끝나는 순서대로 항목을 NDJSON 한 줄씩 전송 (request_id로 순서 확인)
+    """
     try:
         # Convert Pydantic models to dictionaries
         request_dicts = [req.dict() for req in requests]
 
+        if stream:
+            async def ndjson_stream():
+                async for item in batch_handler.iter_batch(request_dicts, compact=compact):
+                    yield format_ndjson(item)
+            return StreamingResponse(ndjson_stream(), media_type=NDJSON_MEDIA_TYPE)
+
         # Process batch requests
-        response = await batch_handler.process_batch(request_dicts)
+        response = await batch_handler.process_batch(request_dicts, compact=compact)
 
         # Check if all requests failed
         if response.get("successful_requests", 0) == 0:
@@ -481,19 +571,128 @@ async def batch_completions(requests: List[Completions]):
             detail=str(e)
         ) from e
 
+
+@app.get("/api/batch_status")
+async def batch_status():
+    """BatchRequestHandler 상태(모델별 rate limit 버킷 등)와 서브시스템별 snapshot 조회"""
+    status = batch_handler.get_status()
+    status["prompt_registry"] = prompt_registry.snapshot()
+    status["keyword_prefetch"] = keyword_prefetcher.snapshot()
+    status["block_catalog"] = modoo_block_catalog.snapshot()
+    status["guided_schema"] = guided_schema_builder.snapshot()
+    status["bulk_jobs"] = bulk_job_manager.snapshot()
+    status["http_pools"] = http_pools.snapshot()
+    status["tracing"] = tracer.snapshot()
+    return status
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape 엔드포인트"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+#====================================
+# offline bulk 작업 : JSONL 파일 단위 대량 요청 (bulk priority, 재시작 시 이어서 처리)
+#====================================
+@app.post("/api/bulk_jobs")
+async def submit_bulk_job(http_request: Request, tenant: Optional[str] = None):
+    """JSONL 본문(한 줄 = /batch_completions 요청 1개, 선택적으로 request_id)으로 bulk 작업 생성"""
+    try:
+        job = await bulk_job_manager.submit(http_request.stream(), tenant=tenant)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return job.progress()
+
+
+@app.get("/api/bulk_jobs")
+async def list_bulk_jobs():
+    return bulk_job_manager.list()
+
+
+@app.get("/api/bulk_jobs/{job_id}")
+async def bulk_job_status(job_id: str):
+    job = bulk_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Bulk job '{job_id}' not found")
+    return job.progress()
+
+
+@app.get("/api/bulk_jobs/{job_id}/results")
+async def bulk_job_results(job_id: str):
+    """지금까지 끝난 항목의 결과 (output.jsonl, 끝난 순서)"""
+    job = bulk_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Bulk job '{job_id}' not found")
+    if not os.path.exists(job.output_path):
+        return StreamingResponse(iter([]), media_type=NDJSON_MEDIA_TYPE)
+    return FileResponse(job.output_path, media_type=NDJSON_MEDIA_TYPE, filename=f"{job_id}.jsonl")
+
+
+@app.post("/api/bulk_jobs/{job_id}/cancel")
+async def cancel_bulk_job(job_id: str):
+    job = await bulk_job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Bulk job '{job_id}' not found")
+    return job.progress()
+
+
+@app.on_event("startup")
+async def start_replica_health_checks():
+    # NOTE : 모듈 하단에서 openai_service를 다시 만들기 때문에 실행 시점의 전역 객체 기준으로 시작
+    openai_service.start_health_checks()
+    # vLLM httpx client는 OpenAIService 생성 시 만들어지고, Ollama aiohttp session은 루프 안에서 열어야 함
+    await http_pools.start()
+    tracer.start()
+    # Modoo 블록 카탈로그는 첫 요청 전에 미리 로드하고 엑셀이 바뀌면 다시 로드
+    try:
+        await asyncio.to_thread(modoo_block_catalog.load)
+    except Exception as e:
+        logger.error(f"Failed to preload Modoo block catalog: {str(e)}")
+    modoo_block_catalog.start_watch()
+    if GuidedSchemaConfig.warmup_on_startup:
+        asyncio.ensure_future(warmup_guided_schemas())
+    # 끝나지 않은 bulk 작업은 output.jsonl에 없는 항목부터 이어서 처리
+    bulk_job_manager.start(batch_handler)
+
+
+async def warmup_guided_schemas():
+    """카탈로그 블록 schema의 FSM 컴파일을 첫 사용자 요청 전에 끝내 둠"""
+    try:
+        with scheduling_scope("bulk"):
+            await guided_schema_builder.warmup(batch_handler, modoo_block_catalog.tag_length_list(),
+                                               concurrency=GuidedSchemaConfig.warmup_concurrency)
+    except Exception as e:
+        logger.error(f"Guided JSON schema warmup failed: {str(e)}")
+
+
+@app.on_event("shutdown")
+async def stop_replica_health_checks():
+    await openai_service.stop_health_checks()
+    await modoo_block_catalog.stop_watch()
+    await bulk_job_manager.stop()
+    # 남은 trace 내보내기
+    await tracer.stop()
+    # 진행 중인 호출이 모두 끝난 뒤 연결 pool 닫기
+    await http_pools.aclose()
+
 # 상위 호출 코드
 #====================================
 # 1번 API : usr_msg 및 pdf 입력 받아서 proposal 생성 및 병합
 #====================================
 @app.post("/api/input_data_process")
-async def openai_input_data_process(requests: List[Completions]):
+async def openai_input_data_process(requests: List[Completions], http_request: Request):
     try:
-        request_id = increment_users()
+        request_id = await increment_users(flow_lease(http_request))
         if not request_id:
             raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
         start = time.time()
         tasks = [inputDataProcess(req, idx) for idx, req in enumerate(requests)]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request,
+            priority="bulk", tenant=request_tenant(requests)
+        )
 
         
         processed_results = []
@@ -505,7 +704,7 @@ async def openai_input_data_process(requests: List[Completions]):
                         "success": False,
                         "data": None,
                         "error": str(result),
-                        "error_details": str(result.__traceback__)
+                        "error_details": {"type": type(result).__name__}
                     }
                 })
             else:
@@ -518,8 +717,13 @@ async def openai_input_data_process(requests: List[Completions]):
             "successful_requests": sum(1 for r in processed_results if r["result"]["success"]),
             "failed_requests": sum(1 for r in processed_results if not r["result"]["success"]),
             "results": processed_results,
-            "current_users": get_current_users()
+            # 이후 API 호출 때 X-Flow-Lease 헤더로 보내면 이 lease를 연장 / 반납
+            "lease_id": request_id,
+            "current_users": await get_current_users()
         }
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
@@ -675,8 +879,26 @@ async def inputDataProcess(req, req_idx):
 # 2번 API : 섹션 생성 및 section_context
 #====================================
 # NOTE 250219: API 이름 바꾸기 논의
+def section_contexts_of(results) -> list:
+    """section_select 결과에서 섹션별 context 문자열 목록 추출 (실패한 결과는 건너뜀)"""
+    contexts = []
+    for result in results:
+        try:
+            section_contents = result["section_contents"]["data"]["generations"][0][0]["text"]
+        except (TypeError, KeyError, IndexError):
+            continue
+        if isinstance(section_contents, dict):
+            contexts.extend(section_contents.values())
+    return contexts
+
+
+def section_result_ok(result) -> bool:
+    """섹션 생성 결과 1개가 성공했는지 ({"error": ...} 항목이나 빈 값이 있으면 실패)"""
+    return bool(result) and "error" not in result and all(result.values())
+
+
 @app.post("/api/section_select")
-async def openai_section_select(requests: List[Completions]):
+async def openai_section_select(requests: List[Completions], http_request: Request):
     """Landing page section generation API"""
     try:
         start = time.time()
@@ -693,8 +915,18 @@ async def openai_section_select(requests: List[Completions]):
         generator = OpenAISectionGenerator(output_language=output_language,
                                            batch_handler=batch_handler)
 
-        results = await generator.generate_landing_page(requests, max_tokens=MAX_TOKENS_CREATE_SECTION_STRUCTURE)
+        results = await run_with_deadline(
+            generator.generate_landing_page(requests, max_tokens=MAX_TOKENS_CREATE_SECTION_STRUCTURE),
+            deadline_config.budget(http_request), http_request,
+            priority="default", tenant=request_tenant(requests)
+        )
         
+        # 섹션 context가 나오자마자 이미지 키워드를 미리 생성 (block_content_generate에서 꺼내 씀)
+        keyword_prefetcher.prefetch(OpenAIKeywordClient(batch_handler=batch_handler),
+                                    section_contexts_of(results),
+                                    max_tokens=MAX_TOKENS_SECTION_KEYWORD_RECOMMEND,
+                                    tenant=request_tenant(requests))
+
         end = time.time()
         processing_time = end - start
         # logger.info(f"Processing time: {processing_time} seconds")s
@@ -702,14 +934,17 @@ async def openai_section_select(requests: List[Completions]):
         response = {
             "timestamp": processing_time,
             "total_requests": len(requests),
-            "successful_requests": sum(1 for r in results if all(r.values())),
-            "failed_requests": sum(1 for r in results if not all(r.values())),
+            "successful_requests": sum(1 for r in results if section_result_ok(r)),
+            "failed_requests": sum(1 for r in results if not section_result_ok(r)),
             "results": results,
-            "current_users": get_current_users()
+            "current_users": await get_current_users()
         }
 
         return response
 
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in section generation: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -718,7 +953,7 @@ async def openai_section_select(requests: List[Completions]):
 # 3번 API : 블록 선택, (※ LLM & RANDOM)
 #====================================
 @app.post("/api/block_select")
-async def openai_block_select(requests: List[Completions]):
+async def openai_block_select(requests: List[Completions], http_request: Request):
     try:
         start = time.time()
         
@@ -749,7 +984,10 @@ async def openai_block_select(requests: List[Completions]):
                 tasks.append(task)
                 
         # 모든 배치 작업을 병렬로 실행
-        batch_results = await asyncio.gather(*tasks)
+        batch_results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request, return_exceptions=False,
+            priority="default", tenant=request_tenant(requests)
+        )
 
         for result in batch_results:
             final_results.append(result)
@@ -766,12 +1004,15 @@ async def openai_block_select(requests: List[Completions]):
             "successful_requests": len(flat_results),
             "failed_requests": len(requests) - len(flat_results),
             "results": final_results,
-            "current_users": get_current_users()
+            "current_users": await get_current_users()
         }
         
                 
         return response
 
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error occurred: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -780,11 +1021,45 @@ async def openai_block_select(requests: List[Completions]):
         ) from e
 
 
+async def page_content_batch_process(requests, blockcontentclient, keywordclient):
+    """content_mode == "PAGE" : usr_msg가 같은 섹션들의 컨텐츠를 1회 호출로 생성, 키워드는 섹션별로 동시에 생성
+
+    Returns:
+        list: requests와 같은 순서의 {"content": ..., "keywords": ...}
+    """
+    groups = {}
+    for index, req in enumerate(requests):
+        groups.setdefault(req.usr_msg or "", []).append(index)
+
+    content_tasks = [
+        blockcontentclient.generate_page_content(
+            usr_msg, [(requests[i].tag_length, requests[i].section_context) for i in indexes], max_tokens=1000
+        )
+        for usr_msg, indexes in groups.items()
+    ]
+    keyword_tasks = [
+        keyword_prefetcher.get(keywordclient, next(iter(req.section_context.values())), max_tokens=MAX_TOKENS_SECTION_KEYWORD_RECOMMEND)
+        for req in requests
+    ]
+    gathered = await asyncio.gather(*content_tasks, *keyword_tasks, return_exceptions=True)
+    page_results, keyword_results = gathered[:len(content_tasks)], gathered[len(content_tasks):]
+
+    content_results = [None] * len(requests)
+    for indexes, page_result in zip(groups.values(), page_results):
+        for n, index in enumerate(indexes):
+            content_results[index] = page_result if isinstance(page_result, Exception) else page_result[n]
+
+    return [
+        {"content": content_result, "keywords": keyword_result}
+        for content_result, keyword_result in zip(content_results, keyword_results)
+    ]
+
+
 #====================================
 # 4번 API : 블록 컨텐츠 및 키워드 생성
 #====================================
 @app.post("/api/block_content_generate")
-async def openai_block_content_generate(requests: List[Completions]):
+async def openai_block_content_generate(requests: List[Completions], http_request: Request):
     try:
         start = time.time()
         
@@ -803,7 +1078,7 @@ async def openai_block_content_generate(requests: List[Completions]):
             try:
                 # 각 요청 내에서도 content와 keyword 생성을 병렬로 처리
                 content_task = blockcontentclient.generate_content(req.usr_msg, req.tag_length, req.section_context, max_tokens=1000)
-                keyword_task = keywordclient.section_keyword_create_logic(context=next(iter(req.section_context.values())), max_tokens=MAX_TOKENS_SECTION_KEYWORD_RECOMMEND)
+                keyword_task = keyword_prefetcher.get(keywordclient, next(iter(req.section_context.values())), max_tokens=MAX_TOKENS_SECTION_KEYWORD_RECOMMEND)
 
                 # 두 작업을 동시에 실행
                 content_result, keyword_result = await asyncio.gather(content_task, keyword_task, return_exceptions=True)
@@ -815,11 +1090,26 @@ async def openai_block_content_generate(requests: List[Completions]):
             except Exception as e:
                 return e  # 예외를 반환하여 상위 레벨에서 처리
 
-        # 각 요청에 대한 처리 작업 생성
-        tasks = [content_batch_process(req, blockcontentclient, keywordclient) for req in requests]
-        
-        # 모든 섹션 데이터를 한번 병렬처리로 실행
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        content_mode = requests[0].content_mode
+        if content_mode is None:
+            content_mode = "PAGE" if blockcontentclient.block_content_config.page_mode else "SECTION"
+
+        if content_mode == "PAGE" and len(requests) > 1:
+            # 페이지 모드 : 섹션 컨텐츠를 묶어서 생성 (시스템 프롬프트 prefill 1회)
+            results = await run_with_deadline(
+                page_content_batch_process(requests, blockcontentclient, keywordclient),
+                deadline_config.budget(http_request), http_request,
+                priority="default", tenant=request_tenant(requests)
+            )
+        else:
+            # 각 요청에 대한 처리 작업 생성
+            tasks = [content_batch_process(req, blockcontentclient, keywordclient) for req in requests]
+
+            # 모든 섹션 데이터를 한번 병렬처리로 실행
+            results = await gather_with_deadline(
+                tasks, deadline_config.budget(http_request), http_request,
+                priority="default", tenant=request_tenant(requests)
+            )
 
         # 예외 처리
         processed_results = []
@@ -829,7 +1119,7 @@ async def openai_block_content_generate(requests: List[Completions]):
             else:
                 processed_results.append(result)
         
-        decrement_users()  # 사용자 수 감소
+        await decrement_users(flow_lease(http_request))  # 사용자 수 감소
         
         end = time.time()
         processing_time = end - start
@@ -839,9 +1129,12 @@ async def openai_block_content_generate(requests: List[Completions]):
             "successful_requests": sum(1 for r in processed_results if "error" not in r),
             "failed_requests": sum(1 for r in processed_results if "error" in r),
             "results": processed_results,
-            "current_users": get_current_users()
+            "current_users": await get_current_users()
         }
         return response
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as ve:
         logger.error(f"Validation error: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -850,17 +1143,180 @@ async def openai_block_content_generate(requests: List[Completions]):
         raise HTTPException(status_code=500, detail=str(e))
     
 
+#====================================
+# 4번 API (SSE) : 블록 컨텐츠 스트리밍 생성
+#====================================
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@app.post("/api/block_content_generate/stream")
+async def openai_block_content_generate_stream(requests: List[Completions], http_request: Request):
+    """/api/block_content_generate 의 Server-Sent Events 버전
+
+    events:
+        tag : {"index", "section", "tag", "value"} 태그 값이 생성될 때마다 (value는 지금까지 생성된 값)
+        section : {"index", "section", "content", "keywords"} 섹션 1개 완료 (실패 시 "error")
+        done : {"timestamp", "total_requests", "successful_requests", "failed_requests", "current_users"}
+    """
+    start = time.time()
+    lease_id = flow_lease(http_request)
+    budget = deadline_config.budget(http_request)
+
+    output_language = openai_config_language.Language_KR
+    if requests and requests[0].standard_country_code == "JP":
+        output_language = openai_config_language.Language_JP
+    elif requests and requests[0].standard_country_code == "US":
+        output_language = openai_config_language.Language_US
+
+    blockcontentclient = OpenAIBlockContentGenerator(output_language=output_language,
+                                                     batch_handler=batch_handler)
+    keywordclient = OpenAIKeywordClient(batch_handler=batch_handler)
+    failed = []
+
+    async def section_stream(idx, req):
+        section_name = next(iter(req.section_context.keys()), None)
+        keyword_task = None
+        try:
+            # 키워드는 짧으므로 스트리밍 없이 컨텐츠와 병렬로 생성
+            keyword_task = asyncio.ensure_future(keyword_prefetcher.get(
+                keywordclient,
+                next(iter(req.section_context.values())),
+                max_tokens=MAX_TOKENS_SECTION_KEYWORD_RECOMMEND
+            ))
+            content_result = None
+            async for kind, value in blockcontentclient.generate_content_stream(
+                req.usr_msg, req.tag_length, req.section_context, max_tokens=1000
+            ):
+                if kind == "tag":
+                    for tag, tag_value in value.items():
+                        yield format_sse("tag", {"index": idx, "section": section_name, "tag": tag, "value": tag_value})
+                else:
+                    content_result = value
+            try:
+                keyword_result = await keyword_task
+            except Exception as e:
+                keyword_result = str(e)
+            yield format_sse("section", {
+                "index": idx,
+                "section": section_name,
+                "content": content_result,
+                "keywords": keyword_result
+            })
+        except Exception as e:
+            logger.error(f"Stream section {idx} failed: {str(e)}", exc_info=True)
+            failed.append(idx)
+            yield format_sse("section", {"index": idx, "section": section_name, "error": str(e)})
+        finally:
+            if keyword_task is not None and not keyword_task.done():
+                keyword_task.cancel()
+
+    async def event_stream():
+        try:
+            with deadline_scope(budget), scheduling_scope("default", request_tenant(requests)):
+                async with lease_heartbeat(lease_id):
+                    async for event in merge_streams([section_stream(idx, req) for idx, req in enumerate(requests)]):
+                        yield event
+            yield format_sse("done", {
+                "timestamp": time.time() - start,
+                "total_requests": len(requests),
+                "successful_requests": len(requests) - len(failed),
+                "failed_requests": len(failed),
+                "current_users": await get_current_users()
+            })
+        finally:
+            await decrement_users(lease_id)  # 사용자 수 감소 (연결이 끊겨도 감소)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+#====================================
+# 통합 API : 1~4번 API를 서버에서 한 번에 실행
+#====================================
+@app.post("/api/landing_pipeline")
+async def openai_landing_pipeline(requests: List[Completions], http_request: Request):
+    """input_data_process → section_select → block_select → block_content_generate 를
+    서버에서 한 번에 실행하고 완성된 페이지를 반환
+
+    요청 필드:
+        pdf_data1~3, usr_msg, standard_country_code : 1번 API와 같음
+        block : {섹션 이름("Hero" 등): {Block_id: HTML_Tag}} 섹션 종류별 후보 블록
+        tag_length : {Block_id: tag_length} 블록별 태그 길이
+        block_select_mode : "AI" / "RANDOM" (기본 AI)
+    """
+    request_id = await increment_users()
+    try:
+        if not request_id:
+            raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
+        start = time.time()
+
+        async def landing_pipeline(req, req_idx):
+            output_language = openai_config_language.Language_KR
+            if req.standard_country_code == "JP":
+                output_language = openai_config_language.Language_JP
+            elif req.standard_country_code == "US":
+                output_language = openai_config_language.Language_US
+
+            # 1번 API와 같은 방식으로 proposal 생성
+            proposal_results = await inputDataProcess(req, req_idx)
+            final_result = next((r for r in proposal_results if r["type"] == "final_result"), None)
+            if final_result is None or not final_result["result"]["success"]:
+                return {"proposal": proposal_results, "error": "Proposal generation failed"}
+            all_usr_data = final_result["result"]["data"]['generations'][0][0]['text']
+
+            # 2~4번 API : 섹션마다 context가 나오는 즉시 블록 선택 / 키워드 / 컨텐츠 생성
+            pipeline = OpenAILandingPipeline(output_language=output_language,
+                                             batch_handler=batch_handler,
+                                             max_tokens_section_structure=MAX_TOKENS_CREATE_SECTION_STRUCTURE,
+                                             max_tokens_select_block=MAX_TOKENS_SELECT_BLOCK,
+                                             max_tokens_keyword=MAX_TOKENS_SECTION_KEYWORD_RECOMMEND)
+            page = await pipeline.run(all_usr_data, req.usr_msg or "", req.block, req.tag_length or {},
+                                      req.block_select_mode)
+            page["proposal"] = all_usr_data
+            return page
+
+        tasks = [landing_pipeline(req, idx) for idx, req in enumerate(requests)]
+        async with lease_heartbeat(request_id):
+            results = await gather_with_deadline(
+                tasks, deadline_config.budget(http_request), http_request,
+                priority="default", tenant=request_tenant(requests)
+            )
+
+        processed_results = [{"error": str(r)} if isinstance(r, Exception) else r for r in results]
+        end = time.time()
+        return {
+            "timestamp": end - start,
+            "total_requests": len(requests),
+            "successful_requests": sum(1 for r in processed_results if "error" not in r),
+            "failed_requests": sum(1 for r in processed_results if "error" in r),
+            "results": processed_results,
+            "current_users": await get_current_users()
+        }
+    except HTTPException:
+        raise
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in landing pipeline: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if request_id:
+            await decrement_users(request_id)
+
+
 #====================================
 # 단위 API_1 : 텍스트 재생성
 #====================================
 @app.post("/api/text_regenerate")
-async def openai_text_regenerate(requests: List[Completions]):
+async def openai_text_regenerate(requests: List[Completions], http_request: Request):
     try:
         start = time.time()
         textregenerateclient = OpenAITextRegenerator(batch_handler=batch_handler)
         
         tasks = [textregenerateclient.regenerate(req.text_box, req.section_context, req.tag_length) for req in requests]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request,
+            priority="interactive", tenant=request_tenant(requests)
+        )
         
         # # 예외 처리
         # processed_results = []
@@ -879,10 +1335,13 @@ async def openai_text_regenerate(requests: List[Completions]):
             # "successful_requests": sum(1 for r in processed_results if "error" not in r),
             # "failed_requests": sum(1 for r in processed_results if "error" in r),
             "results": results
-            # "current_users": get_current_users()
+            # "current_users": await get_current_users()
         }
         
         return response
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as ve:
         logger.error(f"Validation error: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -890,17 +1349,52 @@ async def openai_text_regenerate(requests: List[Completions]):
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+#====================================
+# 단위 API_1 (SSE) : 텍스트 재생성 스트리밍
+#====================================
+@app.post("/api/text_regenerate/stream")
+async def openai_text_regenerate_stream(requests: List[Completions], http_request: Request):
+    """/api/text_regenerate 의 Server-Sent Events 버전
+
+    events:
+        tag : {"index", "tag", "value"} 텍스트가 늘어날 때마다 (value는 지금까지 생성된 텍스트)
+        result : {"index", "result"} 요청 1개 완료 (result는 {tag: text}, 실패 시 None)
+        done : {"timestamp", "total_requests"}
+    """
+    start = time.time()
+    budget = deadline_config.budget(http_request)
+    textregenerateclient = OpenAITextRegenerator(batch_handler=batch_handler)
+
+    async def regenerate_stream(idx, req):
+        async for kind, value in textregenerateclient.regenerate_stream(req.text_box, req.section_context, req.tag_length):
+            if kind == "tag":
+                for tag, tag_value in value.items():
+                    yield format_sse("tag", {"index": idx, "tag": tag, "value": tag_value})
+            else:
+                yield format_sse("result", {"index": idx, "result": value})
+
+    async def event_stream():
+        with deadline_scope(budget), scheduling_scope("interactive", request_tenant(requests)):
+            async for event in merge_streams([regenerate_stream(idx, req) for idx, req in enumerate(requests)]):
+                yield event
+        yield format_sse("done", {"timestamp": time.time() - start, "total_requests": len(requests)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 #====================================
 # 단위 API_2 : 키워드 생성
 #====================================
 @app.post("/api/keyword_generate")
-async def openai_keyword_generate(requests: List[Completions]):
+async def openai_keyword_generate(requests: List[Completions], http_request: Request):
     try:
         start = time.time()
         keywordgenerateclient = OpenAIKeywordClient(batch_handler=batch_handler)
         
         tasks = [keywordgenerateclient.section_keyword_recommend(req.usr_msg) for req in requests]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request,
+            priority="interactive", tenant=request_tenant(requests)
+        )
         
         # # 예외 처리
         # processed_results = []
@@ -919,10 +1413,13 @@ async def openai_keyword_generate(requests: List[Completions]):
             # "successful_requests": sum(1 for r in processed_results if "error" not in r),
             # "failed_requests": sum(1 for r in processed_results if "error" in r),
             "results": results
-            # "current_users": get_current_users()
+            # "current_users": await get_current_users()
         }
         
         return response
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as ve:
         logger.error(f"Validation error: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -941,14 +1438,17 @@ async def openai_keyword_generate(requests: List[Completions]):
 # ================================================================================== 
 
 @app.post("/api/formainsection")
-async def openai_for_main_section(requests: List[Completions]):
+async def openai_for_main_section(requests: List[Completions], http_request: Request):
     try:
         start = time.time()
         # logger.info(f"Received section generation request: {requests}")
         
         generator = OpenAIhtmltosectioncontents(batch_handler)
         tasks = [generator.generate_main_section(req.section_html) for req in requests]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request,
+            priority="bulk", tenant=request_tenant(requests)
+        )
         
         end = time.time()
         processing_time = end - start
@@ -964,19 +1464,25 @@ async def openai_for_main_section(requests: List[Completions]):
 
         return response
 
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in section generation: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
     
 @app.post("/api/forsubpage")
-async def openai_for_sub_page(requests: List[Completions]):
+async def openai_for_sub_page(requests: List[Completions], http_request: Request):
     try:
         start = time.time()
         # logger.info(f"Received section generation request: {requests}")
         
         generator = OpenAIhtmltopagecontents(batch_handler)
-        tasks = [generator.generate_sub_page_process(req.section_html) for req in requests]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [generator.generate_sub_page_process(req.section_html, max_concurrency=MODOO_SECTION_CONCURRENCY) for req in requests]
+        results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request,
+            priority="bulk", tenant=request_tenant(requests)
+        )
         end = time.time()
         processing_time = end - start
         # logger.info(f"Processing time: {processing_time} seconds")s
@@ -988,10 +1494,56 @@ async def openai_for_sub_page(requests: List[Completions]):
 
         return response
 
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in section generation: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    
+
+
+@app.post("/api/forsubpage/stream")
+async def openai_for_sub_page_stream(requests: List[Completions], http_request: Request):
+    """/api/forsubpage 의 Server-Sent Events 버전 (섹션이 끝나는 대로 전송)
+
+    events:
+        section : {"request_index", "index", "section_tag", "result"} 섹션 1개 완료 (실패 시 result = None)
+        error : {"request_index", "error"} 서브페이지를 섹션으로 나누지 못함
+        done : {"timestamp", "total_requests", "successful_sections", "failed_sections"}
+    """
+    start = time.time()
+    budget = deadline_config.budget(http_request)
+    generator = OpenAIhtmltopagecontents(batch_handler)
+    counts = {"successful_sections": 0, "failed_sections": 0}
+
+    async def page_stream(request_index, req):
+        try:
+            async for index, section_tag, result in generator.generate_sub_page_process_stream(
+                req.section_html, max_concurrency=MODOO_SECTION_CONCURRENCY
+            ):
+                counts["successful_sections" if result else "failed_sections"] += 1
+                yield format_sse("section", {
+                    "request_index": request_index,
+                    "index": index,
+                    "section_tag": section_tag,
+                    "result": result
+                })
+        except Exception as e:
+            logger.error(f"Stream subpage {request_index} failed: {str(e)}", exc_info=True)
+            yield format_sse("error", {"request_index": request_index, "error": str(e)})
+
+    async def event_stream():
+        with deadline_scope(budget), scheduling_scope("bulk", request_tenant(requests)):
+            async for event in merge_streams([page_stream(idx, req) for idx, req in enumerate(requests)]):
+                yield event
+        yield format_sse("done", {
+            "timestamp": time.time() - start,
+            "total_requests": len(requests),
+            **counts
+        })
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 # ==================================================================================
 # ==================================================================================
 # ==================================================================================
@@ -1024,43 +1576,22 @@ MAX_TOKENS_SELECT_BLOCK = 50
 MAX_TOKENS_GENERATE_CONTENTS = 250
 MAX_TOKENS_SECTION_KEYWORD_RECOMMEND = 100
 
-@app.post("/batch_completions")
-async def batch_completions(requests: List[SubpageArgs]):
-    try:
-        # Convert Pydantic models to dictionaries
-        request_dicts = [req.dict() for req in requests]
-
-        # Process batch requests
-        response = await batch_handler.process_batch(request_dicts)
-
-        # Check if all requests failed
-        if response.get("successful_requests", 0) == 0:
-            raise HTTPException(
-                status_code=500,
-                detail="All batch requests failed"
-            )
-
-        return response
-
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=str(e)
-        ) from e
-
 # 상위 호출 코드
 #====================================
 # 1번 API : usr_msg 및 pdf 입력 받아서 proposal 생성 및 병합
 #====================================
 @app.post("/api/subpage/input_data_process")
-async def openai_subpage_input_data_process(requests: List[SubpageArgs]):
+async def openai_subpage_input_data_process(requests: List[SubpageArgs], http_request: Request):
     try:
-        request_id = increment_users()
+        request_id = await increment_users(flow_lease(http_request))
         if not request_id:
             raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
         start = time.time()
-        tasks = [inputDataProcess(req, idx) for idx, req in enumerate(requests)]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [subpageInputDataProcess(req, idx) for idx, req in enumerate(requests)]
+        results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request,
+            priority="bulk", tenant=request_tenant(requests)
+        )
 
         
         processed_results = []
@@ -1072,7 +1603,7 @@ async def openai_subpage_input_data_process(requests: List[SubpageArgs]):
                         "success": False,
                         "data": None,
                         "error": str(result),
-                        "error_details": str(result.__traceback__)
+                        "error_details": {"type": type(result).__name__}
                     }
                 })
             else:
@@ -1085,8 +1616,13 @@ async def openai_subpage_input_data_process(requests: List[SubpageArgs]):
             "successful_requests": sum(1 for r in processed_results if r["result"]["success"]),
             "failed_requests": sum(1 for r in processed_results if not r["result"]["success"]),
             "results": processed_results,
-            "current_users": get_current_users()
+            # 이후 API 호출 때 X-Flow-Lease 헤더로 보내면 이 lease를 연장 / 반납
+            "lease_id": request_id,
+            "current_users": await get_current_users()
         }
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
@@ -1121,7 +1657,7 @@ async def openai_subpage_input_data_process(requests: List[SubpageArgs]):
 #====================================
 # 1번 API 내부 함수 : 다른 API들처럼 1개로 합치기 진행
 #====================================
-async def inputDataProcess(req, req_idx):
+async def subpageInputDataProcess(req, req_idx):
     
     output_language = openai_config_language.Language_KR
     if req.standard_country_code == "KR":
@@ -1182,7 +1718,7 @@ async def inputDataProcess(req, req_idx):
 #====================================
 
 @app.post("/api/subpage/section_n_context_generate")
-async def openai_subpage_section_n_context_generate(requests: List[SubpageArgs]):
+async def openai_subpage_section_n_context_generate(requests: List[SubpageArgs], http_request: Request):
     """Landing page section generation API"""
     try:
         start = time.time()
@@ -1199,8 +1735,18 @@ async def openai_subpage_section_n_context_generate(requests: List[SubpageArgs])
         generator = OpenAISectionGenerator(output_language=output_language,
                                            batch_handler=batch_handler)
 
-        results = await generator.generate_subpage(requests, max_tokens=MAX_TOKENS_CREATE_SECTION_STRUCTURE)
+        results = await run_with_deadline(
+            generator.generate_subpage(requests, max_tokens=MAX_TOKENS_CREATE_SECTION_STRUCTURE),
+            deadline_config.budget(http_request), http_request,
+            priority="default", tenant=request_tenant(requests)
+        )
         
+        # 섹션 context가 나오자마자 이미지 키워드를 미리 생성 (block_content_generate에서 꺼내 씀)
+        keyword_prefetcher.prefetch(OpenAIKeywordClient(batch_handler=batch_handler),
+                                    section_contexts_of(results),
+                                    max_tokens=MAX_TOKENS_SECTION_KEYWORD_RECOMMEND,
+                                    tenant=request_tenant(requests))
+
         end = time.time()
         processing_time = end - start
         # logger.info(f"Processing time: {processing_time} seconds")s
@@ -1208,14 +1754,17 @@ async def openai_subpage_section_n_context_generate(requests: List[SubpageArgs])
         response = {
             "timestamp": processing_time,
             "total_requests": len(requests),
-            "successful_requests": sum(1 for r in results if all(r.values())),
-            "failed_requests": sum(1 for r in results if not all(r.values())),
+            "successful_requests": sum(1 for r in results if section_result_ok(r)),
+            "failed_requests": sum(1 for r in results if not section_result_ok(r)),
             "results": results,
-            "current_users": get_current_users()
+            "current_users": await get_current_users()
         }
 
         return response
 
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in section generation: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -1224,7 +1773,7 @@ async def openai_subpage_section_n_context_generate(requests: List[SubpageArgs])
 # 3번 API : 블록 선택, (※ LLM & RANDOM)
 #====================================
 @app.post("/api/subpage/block_select")
-async def openai_subpage_block_select(requests: List[SubpageArgs]):
+async def openai_subpage_block_select(requests: List[SubpageArgs], http_request: Request):
     try:
         start = time.time()
         
@@ -1255,7 +1804,10 @@ async def openai_subpage_block_select(requests: List[SubpageArgs]):
                 tasks.append(task)
                 
         # 모든 배치 작업을 병렬로 실행
-        batch_results = await asyncio.gather(*tasks)
+        batch_results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request, return_exceptions=False,
+            priority="default", tenant=request_tenant(requests)
+        )
 
         for result in batch_results:
             final_results.append(result)
@@ -1272,12 +1824,15 @@ async def openai_subpage_block_select(requests: List[SubpageArgs]):
             "successful_requests": len(flat_results),
             "failed_requests": len(requests) - len(flat_results),
             "results": final_results,
-            "current_users": get_current_users()
+            "current_users": await get_current_users()
         }
         
                 
         return response
 
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error occurred: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -1290,7 +1845,7 @@ async def openai_subpage_block_select(requests: List[SubpageArgs]):
 # 4번 API : 블록 컨텐츠 및 키워드 생성
 #====================================
 @app.post("/api/subpage/block_content_generate")
-async def openai_subpage_block_content_generate(requests: List[SubpageArgs]):
+async def openai_subpage_block_content_generate(requests: List[SubpageArgs], http_request: Request):
     try:
         start = time.time()
         
@@ -1309,7 +1864,7 @@ async def openai_subpage_block_content_generate(requests: List[SubpageArgs]):
             try:
                 # 각 요청 내에서도 content와 keyword 생성을 병렬로 처리
                 content_task = blockcontentclient.generate_content(req.usr_msg, req.tag_length, req.section_context, max_tokens=1000)
-                keyword_task = keywordclient.section_keyword_create_logic(context=next(iter(req.section_context.values())), max_tokens=MAX_TOKENS_SECTION_KEYWORD_RECOMMEND)
+                keyword_task = keyword_prefetcher.get(keywordclient, next(iter(req.section_context.values())), max_tokens=MAX_TOKENS_SECTION_KEYWORD_RECOMMEND)
 
                 # 두 작업을 동시에 실행
                 content_result, keyword_result = await asyncio.gather(content_task, keyword_task, return_exceptions=True)
@@ -1321,11 +1876,26 @@ async def openai_subpage_block_content_generate(requests: List[SubpageArgs]):
             except Exception as e:
                 return e  # 예외를 반환하여 상위 레벨에서 처리
 
-        # 각 요청에 대한 처리 작업 생성
-        tasks = [content_batch_process(req, blockcontentclient, keywordclient) for req in requests]
-        
-        # 모든 섹션 데이터를 한번 병렬처리로 실행
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        content_mode = requests[0].content_mode
+        if content_mode is None:
+            content_mode = "PAGE" if blockcontentclient.block_content_config.page_mode else "SECTION"
+
+        if content_mode == "PAGE" and len(requests) > 1:
+            # 페이지 모드 : 섹션 컨텐츠를 묶어서 생성 (시스템 프롬프트 prefill 1회)
+            results = await run_with_deadline(
+                page_content_batch_process(requests, blockcontentclient, keywordclient),
+                deadline_config.budget(http_request), http_request,
+                priority="default", tenant=request_tenant(requests)
+            )
+        else:
+            # 각 요청에 대한 처리 작업 생성
+            tasks = [content_batch_process(req, blockcontentclient, keywordclient) for req in requests]
+
+            # 모든 섹션 데이터를 한번 병렬처리로 실행
+            results = await gather_with_deadline(
+                tasks, deadline_config.budget(http_request), http_request,
+                priority="default", tenant=request_tenant(requests)
+            )
 
         # 예외 처리
         processed_results = []
@@ -1335,7 +1905,7 @@ async def openai_subpage_block_content_generate(requests: List[SubpageArgs]):
             else:
                 processed_results.append(result)
         
-        decrement_users()  # 사용자 수 감소
+        await decrement_users(flow_lease(http_request))  # 사용자 수 감소
         
         end = time.time()
         processing_time = end - start
@@ -1345,9 +1915,12 @@ async def openai_subpage_block_content_generate(requests: List[SubpageArgs]):
             "successful_requests": sum(1 for r in processed_results if "error" not in r),
             "failed_requests": sum(1 for r in processed_results if "error" in r),
             "results": processed_results,
-            "current_users": get_current_users()
+            "current_users": await get_current_users()
         }
         return response
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as ve:
         logger.error(f"Validation error: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -1360,13 +1933,16 @@ async def openai_subpage_block_content_generate(requests: List[SubpageArgs]):
 # 단위 API_1 : 텍스트 재생성
 #====================================
 @app.post("/api/subpage/text_regenerate")
-async def openai_subpage_text_regenerate(requests: List[SubpageArgs]):
+async def openai_subpage_text_regenerate(requests: List[SubpageArgs], http_request: Request):
     try:
         start = time.time()
         textregenerateclient = OpenAITextRegenerator(batch_handler=batch_handler)
         
         tasks = [textregenerateclient.regenerate(req.text_box, req.section_context, req.tag_length) for req in requests]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request,
+            priority="interactive", tenant=request_tenant(requests)
+        )
         
         # # 예외 처리
         # processed_results = []
@@ -1385,10 +1961,13 @@ async def openai_subpage_text_regenerate(requests: List[SubpageArgs]):
             # "successful_requests": sum(1 for r in processed_results if "error" not in r),
             # "failed_requests": sum(1 for r in processed_results if "error" in r),
             "results": results
-            # "current_users": get_current_users()
+            # "current_users": await get_current_users()
         }
         
         return response
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as ve:
         logger.error(f"Validation error: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -1400,13 +1979,16 @@ async def openai_subpage_text_regenerate(requests: List[SubpageArgs]):
 # 단위 API_2 : 키워드 생성
 #====================================
 @app.post("/api/subpage/keyword_generate")
-async def openai_subpage_keyword_generate(requests: List[SubpageArgs]):
+async def openai_subpage_keyword_generate(requests: List[SubpageArgs], http_request: Request):
     try:
         start = time.time()
         keywordgenerateclient = OpenAIKeywordClient(batch_handler=batch_handler)
         
         tasks = [keywordgenerateclient.section_keyword_recommend(req.usr_msg) for req in requests]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await gather_with_deadline(
+            tasks, deadline_config.budget(http_request), http_request,
+            priority="interactive", tenant=request_tenant(requests)
+        )
         
         # # 예외 처리
         # processed_results = []
@@ -1425,10 +2007,13 @@ async def openai_subpage_keyword_generate(requests: List[SubpageArgs]):
             # "successful_requests": sum(1 for r in processed_results if "error" not in r),
             # "failed_requests": sum(1 for r in processed_results if "error" in r),
             "results": results
-            # "current_users": get_current_users()
+            # "current_users": await get_current_users()
         }
         
         return response
+    except DeadlineExceeded as e:
+        logger.error(f"Deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as ve:
         logger.error(f"Validation error: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
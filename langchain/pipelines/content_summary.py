@@ -109,13 +109,13 @@ class SummaryContentChain:
             for i, chunk in enumerate(chunks):
                 logger.debug(f"Processing chunk {i + 1}/{len(chunks)}.")
                 prompt = f"요약: {chunk}"
-                summary =  self.ollama_client.generate(model='solar',prompt=prompt)
+                summary = await self.ollama_client.agenerate(model='solar', prompt=prompt)
                 summaries.append(summary)
             combined_summary = " ".join(summaries)
         else:
             # If within token limits, directly summarize
             prompt = f"요약: {state['content']}"
-            combined_summary =  self.ollama_client.generate(model='solar',prompt=prompt)
+            combined_summary = await self.ollama_client.agenerate(model='solar', prompt=prompt)
 
         logger.debug(f"Generated Summary: {combined_summary[:200]}...")
         return {"summaries": [combined_summary]}
@@ -190,13 +190,13 @@ class SummaryContentChain:
             for i, chunk in enumerate(chunks):
                 logger.debug(f"Processing chunk {i + 1}/{len(chunks)} for final summary.")
                 prompt = f"최종 요약: {chunk}"
-                summary =  self.ollama_client.generate(model='solar',prompt=prompt)
+                summary = await self.ollama_client.agenerate(model='solar', prompt=prompt)
                 summaries.append(summary)
             final_summary = " ".join(summaries)
         else:
             # If within token limits, directly summarize
             prompt = f"최종 요약: {combined_text}"
-            final_summary =  self.ollama_client.generate(model='solar',prompt=prompt)
+            final_summary = await self.ollama_client.agenerate(model='solar', prompt=prompt)
 
         logger.debug(f"Final Summary: {final_summary[:200]}...")
         return {"final_summary": final_summary}
@@ -221,12 +221,12 @@ class SummaryContentChain:
             for i, chunk in enumerate(chunks):
                 logger.debug(f"Processing chunk {i + 1}/{len(chunks)}.")
                 prompt = f"요약: {chunk}"
-                summary =  self.ollama_client.generate(model='solar',prompt=prompt)
+                summary = await self.ollama_client.agenerate(model='solar', prompt=prompt)
                 summaries.append(summary)
             combined_summary = " ".join(summaries)
         else:
             prompt = f"최종 요약: {combined_text}"
-            combined_summary =  self.ollama_client.generate(model='solar',prompt=prompt)
+            combined_summary = await self.ollama_client.agenerate(model='solar', prompt=prompt)
 
         logger.debug(f"Reduced Summary: {combined_summary[:200]}...")
         return combined_summary
@@ -0,0 +1,120 @@
+'''
+prompt registry 레이아웃 변경에 대한 vLLM prefix caching TTFT 벤치마크
+
+실제 트래픽처럼 요청마다 가변값(output_language, length, tag)을 바꿔 가며
+두 가지 프롬프트 배치의 첫 토큰까지 걸린 시간(TTFT)을 비교한다.
+- legacy   : 기존 프롬프트처럼 가변값이 시스템 프롬프트 앞쪽에 오는 배치
+- registry : prompt registry 배치 (바이트 단위로 같은 고정 prefix + 마지막에만 가변값)
+
+가변 부분에는 요청 번호를 넣어 모든 요청이 서로 다르게 만든다.
+(같은 프롬프트가 반복되면 legacy 배치도 통째로 cache hit 되어 차이가 사라짐)
+두 배치는 요청마다 번갈아 보내고 순서도 바꿔서 서버 warm-up 상태가 한쪽에만 유리하지 않게 한다.
+
+사용법 (langchain 디렉토리에서)
+    python -m script.benchmark_prefix_cache --base-url http://localhost:8022/v1 --requests 20
+'''
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+
+import httpx
+
+from src.openai.openai_api_call import OpenAIService
+from src.openai.land.openai_blockcontentgenerator import BLOCK_CONTENT_PROMPT
+from src.openai.land.openai_sectiongenerator import SECTION_CONTENT_PROMPT
+from src.openai.land.openai_text_regenerate import TEXT_REGENERATE_PROMPT
+
+# 템플릿별로 요청마다 돌려가며 쓰는 가변값
+TEMPLATES = {
+    "block_content": (BLOCK_CONTENT_PROMPT, [
+        {"output_language": language} for language in ("Korean", "English", "Japanese", "Chinese")
+    ]),
+    "section_content": (SECTION_CONTENT_PROMPT, [
+        {"output_language": language} for language in ("Korean", "English", "Japanese", "Chinese")
+    ]),
+    "text_regenerate": (TEXT_REGENERATE_PROMPT, [
+        {"length": length, "tag": tag}
+        for length, tag in itertools.product((20, 50, 120, 300), ("h1_0", "h2_0", "p_0"))
+    ]),
+}
+USR_PROMPT = "Section_name = Hero\nall_usr_data = AI 기반 웹사이트 제작 서비스 위븐"
+
+
+async def measure_ttft(http_client, base_url: str, model: str, sys_prompt: str) -> float:
+    """스트리밍 요청을 보내고 첫 토큰이 올 때까지 걸린 시간(초)"""
+    start = time.perf_counter()
+    async with http_client.stream("POST", f"{base_url}/chat/completions", json={
+        "model": model,
+        "messages": [
+            {"role": "system", "content": sys_prompt},
+            {"role": "user", "content": USR_PROMPT},
+        ],
+        "max_tokens": 16,
+        "temperature": 0,
+        "stream": True,
+    }) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            chunk = json.loads(line[len("data: "):])
+            if chunk["choices"] and chunk["choices"][0]["delta"].get("content"):
+                return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+def variable_part(template, values: dict, salt: str) -> str:
+    """요청마다 다른 가변 부분 (salt = 실행 id + 요청 번호)"""
+    return f"Request = {salt}\n{template.dynamic.format(**values)}"
+
+
+def legacy_layout(template, values: dict, salt: str) -> str:
+    """가변값이 앞에 오는 기존 배치 (요청마다 첫 블록부터 달라짐)"""
+    return f"{variable_part(template, values, salt)}\n\n{template.static}"
+
+
+def registry_layout(template, values: dict, salt: str) -> str:
+    """고정 prefix 뒤에 가변값 (template.render 와 같은 배치)"""
+    return f"{template.static}\n\n{variable_part(template, values, salt)}"
+
+
+def summarize(samples: list) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"p50={statistics.median(samples) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms"
+
+
+async def main(base_url: str, model: str, n_requests: int):
+    async with httpx.AsyncClient(timeout=120) as http_client:
+        # 두 배치와 prefix가 겹치지 않는 요청으로 서버만 먼저 깨움
+        await measure_ttft(http_client, base_url, model, "warm-up")
+        for name, (template, value_sets) in TEMPLATES.items():
+            values = list(itertools.islice(itertools.cycle(value_sets), n_requests))
+            run_id = time.time_ns()  # 이전 실행에서 cache에 남은 프롬프트와도 겹치지 않도록
+
+            legacy, registry = [], []
+            for index, value in enumerate(values):
+                runs = [(legacy, legacy_layout), (registry, registry_layout)]
+                if index % 2:
+                    runs.reverse()
+                for samples, layout in runs:
+                    prompt = layout(template, value, f"{run_id}-{index}")
+                    samples.append(await measure_ttft(http_client, base_url, model, prompt))
+
+            print(f"[{name}] prefix {len(template.static)} chars ({template.prefix_hash}), "
+                  f"{len(value_sets)} value sets")
+            print(f"  legacy   : {summarize(legacy)}")
+            print(f"  registry : {summarize(registry)}")
+            print(f"  TTFT p50 {statistics.median(legacy) / statistics.median(registry):.2f}x faster with registry layout")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=OpenAIService.MODEL_BASE_URLS["gemma"])
+    parser.add_argument("--model", default=OpenAIService.MODEL_PATHS["gemma"])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url.rstrip("/"), args.model, args.requests))
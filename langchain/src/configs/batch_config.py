@@ -0,0 +1,342 @@
+"""This module contains configs for BatchRequestHandler"""
+import os
+
+
+class RateLimitConfig:
+    """Per-model token bucket configs.
+
+    model_key는 OpenAIService.model_router의 키("eeve", "gemma")와 같다.
+
+    Attributes:
+        eeve_rate (float): EEVE vLLM 서버의 초당 토큰 보충 수.
+        eeve_burst (int): EEVE 버킷 최대 용량 (순간 허용 요청 수).
+        gemma_rate (float): gemma vLLM 서버의 초당 토큰 보충 수.
+        gemma_burst (int): gemma 버킷 최대 용량.
+    """
+    eeve_rate = float(os.getenv("RATE_LIMIT_EEVE_RPS", 20))
+    eeve_burst = int(os.getenv("RATE_LIMIT_EEVE_BURST", 20))
+    gemma_rate = float(os.getenv("RATE_LIMIT_GEMMA_RPS", 20))
+    gemma_burst = int(os.getenv("RATE_LIMIT_GEMMA_BURST", 20))
+
+    def __init__(
+        self,
+        eeve_rate: float = None,
+        eeve_burst: int = None,
+        gemma_rate: float = None,
+        gemma_burst: int = None
+    ) -> None:
+        self.eeve_rate = eeve_rate or self.eeve_rate
+        self.eeve_burst = eeve_burst or self.eeve_burst
+        self.gemma_rate = gemma_rate or self.gemma_rate
+        self.gemma_burst = gemma_burst or self.gemma_burst
+
+    def as_dict(self) -> dict:
+        return {
+            "eeve": {"rate": self.eeve_rate, "burst": self.eeve_burst},
+            "gemma": {"rate": self.gemma_rate, "burst": self.gemma_burst},
+        }
+
+
+class ConcurrencyConfig:
+    """Per-model adaptive concurrency (AIMD) configs.
+
+    Attributes:
+        eeve_initial_limit (int): EEVE 서버 시작 동시 실행 수.
+        eeve_max_limit (int): EEVE 서버 최대 동시 실행 수.
+        eeve_target_tpot (float): EEVE 목표 토큰당 지연(초). 0이면 baseline 기준만 사용.
+        gemma_initial_limit (int): gemma 서버 시작 동시 실행 수.
+        gemma_max_limit (int): gemma 서버 최대 동시 실행 수.
+        gemma_target_tpot (float): gemma 목표 토큰당 지연(초). 0이면 baseline 기준만 사용.
+        min_limit (int): 줄일 수 있는 최소 동시 실행 수.
+        latency_tolerance (float): baseline 대비 허용하는 토큰당 지연 배수.
+        backoff_ratio (float): 과부하 시 limit에 곱하는 비율.
+        tenant_weights (str): 대기열 WFQ의 tenant별 가중치 ("tenant_a:2,tenant_b:0.5", 없으면 모두 1).
+    """
+    eeve_initial_limit = int(os.getenv("CONCURRENCY_EEVE_INITIAL", 8))
+    eeve_max_limit = int(os.getenv("CONCURRENCY_EEVE_MAX", 50))
+    eeve_target_tpot = float(os.getenv("CONCURRENCY_EEVE_TARGET_TPOT", 0))
+    gemma_initial_limit = int(os.getenv("CONCURRENCY_GEMMA_INITIAL", 16))
+    gemma_max_limit = int(os.getenv("CONCURRENCY_GEMMA_MAX", 50))
+    gemma_target_tpot = float(os.getenv("CONCURRENCY_GEMMA_TARGET_TPOT", 0))
+    min_limit = int(os.getenv("CONCURRENCY_MIN", 2))
+    latency_tolerance = float(os.getenv("CONCURRENCY_LATENCY_TOLERANCE", 2.0))
+    backoff_ratio = float(os.getenv("CONCURRENCY_BACKOFF_RATIO", 0.7))
+    tenant_weights = os.getenv("CONCURRENCY_TENANT_WEIGHTS", "")
+
+    def __init__(self, max_limit: int = None) -> None:
+        # max_limit이 주어지면 (BatchRequestHandler의 max_concurrent_requests) 모델별 최대값 상한으로 사용
+        if max_limit is not None:
+            self.eeve_max_limit = min(self.eeve_max_limit, max_limit)
+            self.gemma_max_limit = min(self.gemma_max_limit, max_limit)
+
+    def _limits(self, initial_limit: int, max_limit: int, target_tpot: float) -> dict:
+        min_limit = min(self.min_limit, max_limit)
+        return {
+            "initial_limit": max(min_limit, min(initial_limit, max_limit)),
+            "min_limit": min_limit,
+            "max_limit": max_limit,
+            "target_tpot": target_tpot or None,
+            "latency_tolerance": self.latency_tolerance,
+            "backoff_ratio": self.backoff_ratio,
+            "tenant_weights": self._tenant_weights(),
+        }
+
+    def _tenant_weights(self) -> dict:
+        weights = {}
+        for item in self.tenant_weights.split(","):
+            tenant, _, weight = item.strip().rpartition(":")
+            if tenant and weight:
+                weights[tenant] = float(weight)
+        return weights
+
+    def as_dict(self) -> dict:
+        return {
+            "eeve": self._limits(self.eeve_initial_limit, self.eeve_max_limit, self.eeve_target_tpot),
+            "gemma": self._limits(self.gemma_initial_limit, self.gemma_max_limit, self.gemma_target_tpot),
+        }
+
+
+class MicroBatchConfig:
+    """Micro-batching configs for OpenAIService.
+
+    활성화하면 chat 요청을 로컬에서 chat template으로 렌더링한 뒤
+    같은 model / sampling 파라미터 / guided schema 끼리 모아서 /v1/completions 한 번으로 보낸다.
+
+    Attributes:
+        enabled (bool): micro-batching 사용 여부 (기본 off).
+        window_ms (float): 첫 요청 이후 같은 배치를 모으는 시간(ms).
+        max_batch_size (int): 한 번에 보낼 최대 프롬프트 수.
+    """
+    enabled = os.getenv("MICRO_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+    window_ms = float(os.getenv("MICRO_BATCH_WINDOW_MS", 5))
+    max_batch_size = int(os.getenv("MICRO_BATCH_MAX_SIZE", 16))
+
+    def __init__(
+        self,
+        enabled: bool = None,
+        window_ms: float = None,
+        max_batch_size: int = None
+    ) -> None:
+        self.enabled = self.enabled if enabled is None else enabled
+        self.window_ms = window_ms or self.window_ms
+        self.max_batch_size = max_batch_size or self.max_batch_size
+
+
+class ResponseCacheConfig:
+    """LLM response cache configs.
+
+    Attributes:
+        enabled (bool): 프로세스 내 LRU 캐시 사용 여부.
+        max_size (int): LRU에 담을 최대 응답 수.
+        ttl (float): LRU 항목 유효 시간(초).
+        redis_enabled (bool): common/redis_client 의 Redis를 2차 캐시로 사용할지 여부.
+        redis_ttl (int): Redis 항목 유효 시간(초).
+        max_temperature (float): 요청에 cache 지정이 없을 때 캐시할 최대 temperature.
+            (기본값 0 : greedy 호출만 캐시, temperature가 없는 요청은 캐시하지 않음)
+    """
+    enabled = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    max_size = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", 1024))
+    ttl = float(os.getenv("RESPONSE_CACHE_TTL", 3600))
+    redis_enabled = os.getenv("RESPONSE_CACHE_REDIS", "false").lower() in ("1", "true", "yes")
+    redis_ttl = int(os.getenv("RESPONSE_CACHE_REDIS_TTL", 86400))
+    max_temperature = float(os.getenv("RESPONSE_CACHE_MAX_TEMPERATURE", 0.0))
+
+
+class DeadlineConfig:
+    """Request-scoped deadline budget configs.
+
+    엔드포인트에서 요청 전체 budget을 정하고, 각 LLM 호출은 남은 시간만 사용한다.
+    클라이언트가 X-Request-Deadline 헤더(초)로 더 짧거나 긴 budget을 요청할 수 있다.
+
+    Attributes:
+        default_budget (float): 헤더가 없을 때 요청 전체 budget(초).
+        max_budget (float): 헤더로 요청할 수 있는 최대 budget(초).
+    """
+    header = "X-Request-Deadline"
+    default_budget = float(os.getenv("REQUEST_DEADLINE_SECONDS", 300))
+    max_budget = float(os.getenv("REQUEST_DEADLINE_MAX_SECONDS", 600))
+
+    def budget(self, request=None) -> float:
+        """요청에 적용할 budget(초)"""
+        value = request.headers.get(self.header) if request is not None else None
+        try:
+            budget = float(value) if value else self.default_budget
+        except ValueError:
+            budget = self.default_budget
+        return max(1.0, min(budget, self.max_budget))
+
+
+class ReplicaPoolConfig:
+    """Per-model vLLM replica pool configs.
+
+    VLLM_EEVE_URLS / VLLM_GEMMA_URLS 에 콤마로 여러 서버 주소를 주면 해당 모델은 replica pool로 분산된다.
+    지정하지 않으면 OpenAIService.MODEL_BASE_URLS 의 서버 1대만 사용한다.
+
+    Attributes:
+        eeve_urls (str): EEVE vLLM 서버 주소 목록 (콤마 구분).
+        gemma_urls (str): gemma vLLM 서버 주소 목록 (콤마 구분).
+        max_failures (int): 연속 과부하/연결 에러가 이 횟수를 넘으면 replica를 제외.
+        eject_seconds (float): replica 제외 시간(초). 반복되면 최대 8배까지 늘어남.
+        probe_interval (float): /v1/models health probe 주기(초). 0이면 probe 하지 않음.
+        probe_timeout (float): health probe 타임아웃(초).
+    """
+    eeve_urls = os.getenv("VLLM_EEVE_URLS", "")
+    gemma_urls = os.getenv("VLLM_GEMMA_URLS", "")
+    max_failures = int(os.getenv("REPLICA_MAX_FAILURES", 3))
+    eject_seconds = float(os.getenv("REPLICA_EJECT_SECONDS", 30))
+    probe_interval = float(os.getenv("REPLICA_PROBE_INTERVAL", 10))
+    probe_timeout = float(os.getenv("REPLICA_PROBE_TIMEOUT", 3))
+
+    def urls(self, model_key: str, default: str) -> list:
+        """model_key의 replica 주소 목록 (설정이 없으면 [default])"""
+        value = getattr(self, f"{model_key}_urls", "")
+        urls = [url.strip() for url in value.split(",") if url.strip()]
+        return urls or [default]
+
+
+class SectionGenerateConfig:
+    """Section structure generation configs.
+
+    Attributes:
+        max_concurrency (int): 섹션 구조 생성 API에서 동시에 처리할 요청 수. 0이면 모델 서버의 AIMD 동시 실행 limit 현재값을 따름.
+    """
+    max_concurrency = int(os.getenv("SECTION_GENERATE_CONCURRENCY", 0))
+
+
+class BlockSelectConfig:
+    """Block selection configs.
+
+    Attributes:
+        page_batch (bool): 페이지의 모든 섹션 블록 선택을 guided_json 1회 호출로 처리.
+        max_schema_tags (int): 1회 호출 schema에 넣을 수 있는 최대 태그(enum) 수. 넘으면 섹션별 호출을 동시에 실행.
+    """
+    page_batch = os.getenv("BLOCK_SELECT_PAGE_BATCH", "true").lower() in ("1", "true", "yes")
+    max_schema_tags = int(os.getenv("BLOCK_SELECT_MAX_SCHEMA_TAGS", 80))
+
+
+class BlockContentConfig:
+    """Block content generation configs.
+
+    Attributes:
+        page_mode (bool): 요청에 content_mode가 없을 때 페이지의 모든 섹션을 guided_json 1회 호출로 생성.
+        max_model_len (int): vLLM --max-model-len. prompt + 예상 출력이 넘으면 섹션 묶음을 나눠서 호출.
+        tokens_per_char (float): tag_length(글자 수)로 출력 토큰 수를 추정할 때 쓰는 글자당 토큰 수.
+        chars_per_prompt_token (float): 프롬프트 길이로 입력 토큰 수를 추정할 때 쓰는 토큰당 글자 수.
+    """
+    page_mode = os.getenv("BLOCK_CONTENT_PAGE_MODE", "false").lower() in ("1", "true", "yes")
+    max_model_len = int(os.getenv("BLOCK_CONTENT_MAX_MODEL_LEN", 8192))
+    tokens_per_char = float(os.getenv("BLOCK_CONTENT_TOKENS_PER_CHAR", 1.0))
+    chars_per_prompt_token = float(os.getenv("BLOCK_CONTENT_CHARS_PER_PROMPT_TOKEN", 2.0))
+
+
+class KeywordPrefetchConfig:
+    """Image keyword prefetch configs.
+
+    /api/section_select 응답 직후 섹션 context별 키워드 생성을 미리 시작하고
+    /api/block_content_generate 에서 같은 context가 들어오면 그 결과를 사용한다.
+
+    Attributes:
+        enabled (bool): section_select 이후 키워드 prefetch 사용 여부.
+        max_size (int): 보관할 최대 context 수.
+        ttl (float): 결과 보관 시간(초).
+        timeout (float): prefetch 1건의 최대 실행 시간(초).
+    """
+    enabled = os.getenv("KEYWORD_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+    max_size = int(os.getenv("KEYWORD_PREFETCH_MAX_SIZE", 2048))
+    ttl = float(os.getenv("KEYWORD_PREFETCH_TTL", 1800))
+    timeout = float(os.getenv("KEYWORD_PREFETCH_TIMEOUT", 120))
+
+
+class BlockCatalogConfig:
+    """Modoo block catalog configs.
+
+    Attributes:
+        modoo_path (str): Modoo 매칭 블록 엑셀 경로 (langchain 디렉토리 기준).
+        modoo_snapshot_path (str): 파싱 결과 JSON 스냅샷 경로 (빈 값이면 스냅샷 사용 안 함). 기본값은 엑셀 옆.
+        watch_interval (float): 엑셀 mtime 확인 주기(초).
+    """
+    modoo_path = os.getenv("MODOO_BLOCK_CATALOG_PATH", "src/openai/modoo/matching_block_data/Modoo_matching_blocks.xlsx")
+    modoo_snapshot_path = os.getenv("MODOO_BLOCK_CATALOG_SNAPSHOT",
+                                    "src/openai/modoo/matching_block_data/Modoo_matching_blocks.snapshot.json")
+    watch_interval = float(os.getenv("MODOO_BLOCK_CATALOG_WATCH_INTERVAL", 10))
+
+
+class GuidedSchemaConfig:
+    """Guided JSON schema configs.
+
+    Attributes:
+        warmup_on_startup (bool): 시작할 때 카탈로그 블록의 schema로 vLLM guided decoding FSM을 미리 컴파일.
+        warmup_concurrency (int): 동시에 보낼 warmup 요청 수.
+    """
+    warmup_on_startup = os.getenv("GUIDED_SCHEMA_WARMUP", "true").lower() in ("1", "true", "yes")
+    warmup_concurrency = int(os.getenv("GUIDED_SCHEMA_WARMUP_CONCURRENCY", 4))
+
+
+class BulkJobConfig:
+    """Offline bulk job configs.
+
+    JSONL 파일로 제출한 대량 요청을 백그라운드 worker가 bulk priority로 처리한다.
+
+    Attributes:
+        jobs_dir (str): 작업별 input/output JSONL과 manifest를 저장할 디렉토리.
+        workers (int): 작업 1개에서 동시에 처리할 최대 항목 수.
+        capacity_share (float): 모델 동시 실행 limit 중 bulk 작업 전체가 쓸 수 있는 비율.
+        item_timeout (float): 항목 1건의 최대 실행 시간(초).
+        compact_results (bool): 결과를 {"text": ...} 형식(compact)으로 저장할지 여부.
+        resume_on_startup (bool): 시작할 때 끝나지 않은 작업을 이어서 처리할지 여부.
+    """
+    jobs_dir = os.getenv("BULK_JOB_DIR", "/tmp/bulk_jobs")
+    workers = int(os.getenv("BULK_JOB_WORKERS", 8))
+    capacity_share = float(os.getenv("BULK_JOB_CAPACITY_SHARE", 0.5))
+    item_timeout = float(os.getenv("BULK_JOB_ITEM_TIMEOUT", 300))
+    compact_results = os.getenv("BULK_JOB_COMPACT_RESULTS", "true").lower() in ("1", "true", "yes")
+    resume_on_startup = os.getenv("BULK_JOB_RESUME", "true").lower() in ("1", "true", "yes")
+
+
+class HTTPPoolConfig:
+    """Shared outbound HTTP connection pool configs.
+
+    vLLM(httpx)과 Ollama(aiohttp) 호출이 서버(host)별로 연결을 재사용하도록 하는 설정.
+
+    Attributes:
+        vllm_max_connections (int): vLLM 서버 1대당 최대 연결 수 (동시 실행 limit 최대값보다 크게).
+        vllm_max_keepalive (int): vLLM 서버 1대당 유지할 idle 연결 수.
+        ollama_max_connections (int): Ollama 전체 최대 연결 수.
+        ollama_max_connections_per_host (int): Ollama 서버 1대당 최대 연결 수.
+        keepalive_seconds (float): idle 연결 유지 시간(초).
+        connect_timeout (float): 연결 timeout(초).
+        dns_ttl (int): Ollama DNS 조회 결과 캐시 시간(초).
+        http2 (bool): vLLM 호출에 HTTP/2 사용 여부 (h2 패키지 필요, 없으면 HTTP/1.1).
+    """
+    vllm_max_connections = int(os.getenv("HTTP_POOL_VLLM_MAX_CONNECTIONS", 64))
+    vllm_max_keepalive = int(os.getenv("HTTP_POOL_VLLM_MAX_KEEPALIVE", 64))
+    ollama_max_connections = int(os.getenv("HTTP_POOL_OLLAMA_MAX_CONNECTIONS", 64))
+    ollama_max_connections_per_host = int(os.getenv("HTTP_POOL_OLLAMA_MAX_CONNECTIONS_PER_HOST", 32))
+    keepalive_seconds = float(os.getenv("HTTP_POOL_KEEPALIVE_SECONDS", 60))
+    connect_timeout = float(os.getenv("HTTP_POOL_CONNECT_TIMEOUT", 5))
+    dns_ttl = int(os.getenv("HTTP_POOL_DNS_TTL", 300))
+    http2 = os.getenv("HTTP_POOL_HTTP2", "false").lower() in ("1", "true", "yes")
+
+
+class TracingConfig:
+    """Per-request tracing configs.
+
+    요청 1건의 단계별 span(엔드포인트 → stage → send_request → 대기/vLLM 호출)을 trace로 묶어 내보낸다.
+    sample_rate가 0이면 traceparent 헤더로 sampled를 지정한 요청만 기록한다.
+
+    Attributes:
+        sample_rate (float): trace를 기록할 요청 비율 (0 ~ 1).
+        exporters (list): 내보낼 곳 목록 (jsonl, otlp 중 콤마로 구분).
+        jsonl_path (str): jsonl exporter가 trace 1개를 1줄로 추가할 파일.
+        otlp_endpoint (str): OTLP/HTTP(JSON) collector의 traces 주소.
+        service_name (str): OTLP resource의 service.name.
+        queue_size (int): 내보내기를 기다릴 수 있는 최대 trace 수 (넘으면 버림).
+        max_spans_per_trace (int): trace 1개에 기록할 최대 span 수.
+    """
+    sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", 0.0))
+    exporters = [name.strip() for name in os.getenv("TRACE_EXPORTERS", "jsonl").split(",") if name.strip()]
+    jsonl_path = os.getenv("TRACE_JSONL_PATH", "/tmp/traces/traces.jsonl")
+    otlp_endpoint = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    service_name = os.getenv("TRACE_SERVICE_NAME", "llm-rag")
+    queue_size = int(os.getenv("TRACE_QUEUE_SIZE", 1000))
+    max_spans_per_trace = int(os.getenv("TRACE_MAX_SPANS_PER_TRACE", 2000))
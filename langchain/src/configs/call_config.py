@@ -27,6 +27,7 @@ class Completions(BaseModel):
     usr_msg: Optional[str] = None
     block: Dict[str, Dict[str, str]] = Field(default_factory=dict)
     block_select_mode: Optional[str] = None
+    content_mode: Optional[str] = None
     tag_length: Optional[Dict[str, Any]] = Field(default_factory=dict)
     section_context: Optional[Dict[str, str]] = Field(default_factory=dict)
     all_usr_data: Optional[str] = None
@@ -84,13 +85,14 @@ class ChatCompletions(BaseModel):
 class SubpageArgs(BaseModel):
     """Custom class for Completions data"""
     # model: str = "/usr/local/bin/models/EEVE-Korean-Instruct-10.8B-v1.0"
-    # user: Optional[str] = None
+    user: Optional[str] = None
     subpage_n_prompt: Optional[Dict[str, str]] = Field(default_factory=dict)
     main_context: Optional[str] = None
     sub_context: Optional[str] = None
     
     block: Dict[str, Dict[str, str]] = Field(default_factory=dict)
     block_select_mode: Optional[str] = None
+    content_mode: Optional[str] = None
     tag_length: Optional[Dict[str, Any]] = Field(default_factory=dict)
     section_context: Optional[Dict[str, str]] = Field(default_factory=dict)
     all_usr_data: Optional[str] = None
@@ -1,14 +1,20 @@
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import re
 import difflib
 import json
 import random
+from src.utils.request_context import remaining_timeout
+from src.configs.batch_config import BlockSelectConfig
+from src.utils.metrics import track_stage, record_retry, record_parse_failure, record_repair_fallback
+from src.utils.tracing import traced
 
 class OpenAIBlockSelector:
-    def __init__(self, batch_handler):
+    def __init__(self, batch_handler, block_select_config: BlockSelectConfig = None):
         self.batch_handler = batch_handler
+        self.block_select_config = block_select_config or BlockSelectConfig()
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 50, extra_body: dict = None) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
         try:
@@ -22,11 +28,12 @@ class OpenAIBlockSelector:
                     "max_tokens": max_tokens,
                     "temperature": 0.1,
                     "top_p": 0.1,
+                    "cache": True,  # guided_json enum 선택이라 같은 입력이면 같은 블록을 재사용
                     "n": 1,
                     "stream": False,
                     "logprobs": None
                 }, request_id=0),
-                timeout=300  # 적절한 타임아웃 값 설정
+                timeout=remaining_timeout(300)  # 적절한 타임아웃 값 설정
             )
             return response
         except asyncio.TimeoutError:
@@ -36,6 +43,7 @@ class OpenAIBlockSelector:
             print(f"[ERROR] Unexpected error: {str(e)}")
             return f"Error: {str(e)}"
 
+    @track_stage("block_select")
     async def select_block(self,
         section_context: Dict[str, str],
         block_list: Dict[str, str],
@@ -46,6 +54,8 @@ class OpenAIBlockSelector:
 
         
         for attempt in range(3):  # 최대 3번 시도
+            if attempt:
+                record_retry()
             try:
                 sys_prompt = f"""
                 You are an AI assistant that selects appropriate HTML tags for website sections. Follow these instructions precisely:
@@ -122,6 +132,7 @@ class OpenAIBlockSelector:
             except Exception as e:
                 
                 print(f"[DEBUG] LLM.select() was not working. Maybe the block recommendation is just 1.{e}")
+                record_repair_fallback("random_choice")
 
                 random_index = random.randint(0, len(block_list[1].keys()) - 1)
 
@@ -142,24 +153,124 @@ class OpenAIBlockSelector:
         max_tokens: int = 50) -> List[Dict[str, Any]]:
 
 
-        # NOTE 250424 : 우선 한 번 더 감싸는거 배제함. 추후 batch에서 문제 생기면 복원 예정
-        select_block_results = []
+        # NOTE : 요청(페이지) 1개 = 섹션 전체를 1회 호출로 선택, 페이지끼리는 동시에 실행
+        tasks = []
         for section_name, block_list in zip(section_names_n_contents, section_names_n_block_lists):
 
-            # print("section_name : ", section_name)
-            # print("block_list : ", block_list)
-
             # NOTE 250219 : 데이터가 들어오는 만큼 뭉텅이로 보낼 수 있게 설계
             temp_section_list = list(section_name.items())
             temp_block_list = list(block_list.items())
+            tasks.append(self.select_block_page(temp_section_list, temp_block_list, max_tokens))
 
-            for n_temp_list, n_temp_block_list in zip(temp_section_list, temp_block_list):
-                
-                select_block_result = await self.select_block(n_temp_list, n_temp_block_list, max_tokens)
-                select_block_results.append(select_block_result)
-
-        # NOTE 250220: batch 방식은 추후 적용
+        select_block_results = []
+        for page_results in await asyncio.gather(*tasks):
+            select_block_results.extend(page_results)
         return select_block_results
+
+    @track_stage("block_select")
+    async def select_block_page(
+        self,
+        section_contexts: List[Tuple[str, str]],
+        block_lists: List[Tuple[str, Dict[str, str]]],
+        max_tokens: int = 50) -> List[Any]:
+        """페이지 1개의 모든 섹션 블록을 guided_json 1회 호출로 선택
+
+        섹션마다 그 섹션의 태그만 enum으로 가진 property를 만들어서 prefill 1번으로 끝낸다.
+        태그 수가 max_schema_tags를 넘거나 일부 섹션 결과가 없으면 해당 섹션은 select_block을 동시에 호출한다.
+
+        Args:
+            section_contexts: [(섹션 이름, section context), ...]
+            block_lists: [(섹션 이름, {Block_id: HTML_Tag}), ...] (section_contexts와 같은 순서)
+            max_tokens: 섹션 1개당 max_tokens
+
+        Returns:
+            list: 섹션 순서대로 select_block 결과와 같은 형식의 리스트
+        """
+        pairs = list(zip(section_contexts, block_lists))
+        if not pairs:
+            return []
+
+        n_tags = sum(len(block_list[1]) for _, block_list in pairs)
+        results = [None] * len(pairs)
+        if self.block_select_config.page_batch and len(pairs) > 1 and n_tags <= self.block_select_config.max_schema_tags:
+            try:
+                results = await self.select_block_page_once(pairs, max_tokens)
+            except Exception as e:
+                print(f"[DEBUG] Page block selection failed, falling back to per-section selection. {e}")
+
+        missing = [i for i, result in enumerate(results) if not result]
+        if missing:
+            record_repair_fallback("per_section")
+            fallback = await asyncio.gather(*(
+                self.select_block(pairs[i][0], pairs[i][1], max_tokens) for i in missing
+            ))
+            for i, result in zip(missing, fallback):
+                results[i] = result
+        return results
+
+    async def select_block_page_once(self, pairs, max_tokens: int = 50) -> List[Any]:
+        """select_block_page의 1회 호출 부분 (선택하지 못한 섹션은 None)"""
+        sys_prompt = f"""
+        You are an AI assistant that selects appropriate HTML tags for website sections. Follow these instructions precisely:
+        1. Read each section context and its tag list.
+        2. For EACH section, select the tags from ITS OWN list that best represent that section context.
+        3. Return ONLY a JSON object with one key per section ("section_1", "section_2", ...) and the chosen tags as its value.
+        4. Do NOT include any additional text or explanations.
+        5. Ensure the output is a valid JSON object.
+        """
+        usr_prompt = "\n".join(
+            f"""
+        section_{i} ({section_context[0]})
+        section context = {section_context[1]}
+        tag list = {list(block_list[1].values())}
+        """
+            for i, (section_context, block_list) in enumerate(pairs, start=1)
+        )
+
+        properties = {}
+        for i, (_, block_list) in enumerate(pairs, start=1):
+            tag_slice = list(dict.fromkeys(block_list[1].values()))
+            properties[f"section_{i}"] = {
+                "type": "array",
+                "items": {
+                    "type": "string",
+                    "enum": tag_slice
+                },
+                "minItems": min(2, len(tag_slice)),
+                "maxItems": 2
+            }
+        extra_body = {
+            "guided_json": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties.keys())
+            }
+        }
+
+        result = await self.send_request(
+            sys_prompt=sys_prompt,
+            usr_prompt=usr_prompt,
+            max_tokens=max_tokens * len(pairs),
+            extra_body=extra_body
+            )
+        selected_json = self.extract_json(result.data['generations'][0][0]['text']) or {}
+
+        results = []
+        for i, (section_context, block_list) in enumerate(pairs, start=1):
+            reversed_block_dict = {value: key for key, value in block_list[1].items()}
+            selected_tags = selected_json.get(f"section_{i}")
+            if not isinstance(selected_tags, list):
+                results.append(None)
+                continue
+            results.append([
+                {
+                    'Section_name': section_context[0],
+                    'Block_id': reversed_block_dict[selected_tag],
+                    'HTML_Tag': selected_tag
+                }
+                for selected_tag in selected_tags if selected_tag in reversed_block_dict
+            ] or None)
+        return results
             
     async def select_block_randomly(self, block_list: Dict[str, str]) -> Dict[str, Any]:
 
@@ -278,6 +389,7 @@ class OpenAIBlockSelector:
             if json_str:
                 json_str = json_str.group() + '}'
             else:
+                record_parse_failure()
                 return None
 
         # Balance braces if necessary
@@ -289,11 +401,14 @@ class OpenAIBlockSelector:
         try:
             return json.loads(json_str)
         except json.JSONDecodeError:
+            record_parse_failure()
             # Try a more lenient parsing approach
             try:
-                return json.loads(json_str.replace("'", '"'))
+                parsed = json.loads(json_str.replace("'", '"'))
             except json.JSONDecodeError:
                 return None
+            record_repair_fallback("quote_fix")
+            return parsed
 
 
 # class OpenAIBlockSelector:
@@ -1,6 +1,9 @@
 import asyncio
 import json
 import re
+from src.utils.request_context import remaining_timeout
+from src.utils.metrics import record_parse_failure, record_repair_fallback
+from src.utils.tracing import traced
 
 # NOTE 250429 : 이거 뭐지?
 
@@ -8,6 +11,7 @@ class OpenAIBlockRefresh:
     def __init__(self, batch_handler):
         self.batch_handler = batch_handler
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 100, extra_body: dict = None) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
         response = await asyncio.wait_for(
@@ -21,9 +25,10 @@ class OpenAIBlockRefresh:
                 "top_p": 0.6,
                 "n": 1,
                 "stream": False,
-                "logprobs": None
+                "logprobs": None,
+                "cache": False  # 다시 생성하는 요청이므로 캐시 사용 안 함
             }, request_id=0),
-            timeout=30
+            timeout=remaining_timeout(30)
         )
         return response
 
@@ -100,6 +105,7 @@ class OpenAIBlockRefresh:
             if json_str:
                 json_str = json_str.group() + '}'
             else:
+                record_parse_failure("block_refresh")
                 return None
 
         # Balance braces if necessary
@@ -111,8 +117,11 @@ class OpenAIBlockRefresh:
         try:
             return json.loads(json_str)
         except json.JSONDecodeError:
+            record_parse_failure("block_refresh")
             # Try a more lenient parsing approach
             try:
-                return json.loads(json_str.replace("'", '"'))
+                parsed = json.loads(json_str.replace("'", '"'))
             except json.JSONDecodeError:
-                return None
\ No newline at end of file
+                return None
+            record_repair_fallback("quote_fix", "block_refresh")
+            return parsed
\ No newline at end of file
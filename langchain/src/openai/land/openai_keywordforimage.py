@@ -2,11 +2,15 @@ import json
 import re
 import asyncio
 from src.utils.batch_handler import BatchRequestHandler
+from src.utils.request_context import remaining_timeout
+from src.utils.metrics import track_stage, record_retry, record_parse_failure
+from src.utils.tracing import traced
 
 class OpenAIKeywordClient:
     def __init__(self, batch_handler: BatchRequestHandler):
         self.batch_handler = batch_handler
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, extra_body, max_tokens: int = 100) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
         try:
@@ -22,8 +26,9 @@ class OpenAIKeywordClient:
                     "n": 1,
                     "stream": False,
                     "logprobs": None,
+                    "cache": True,  # 같은 섹션 내용이면 같은 키워드를 재사용
                 }, request_id=0),
-                timeout=120  # 타임아웃 설정
+                timeout=remaining_timeout(120)  # 타임아웃 설정
             )
             return response
         except asyncio.TimeoutError:
@@ -33,6 +38,7 @@ class OpenAIKeywordClient:
             print(f"[ERROR] Unexpected error: {str(e)}")
             return f"Error: {str(e)}"
 
+    @track_stage("keyword")
     async def section_keyword_recommend(self, context: str, max_tokens: int = 100) -> 'RequestResult':
         
         sys_prompt = f"""
@@ -86,7 +92,11 @@ class OpenAIKeywordClient:
 
         temp_result = result.data['generations'][0][0]['text']
 
-        json_temp_result = json.loads(temp_result)
+        try:
+            json_temp_result = json.loads(temp_result)
+        except json.JSONDecodeError:
+            record_parse_failure()
+            raise
 
         only_keywords = json_temp_result["keyword"]
 
@@ -98,6 +108,8 @@ class OpenAIKeywordClient:
         try:
             repeat_count = 0
             while repeat_count < 3:
+                if repeat_count:
+                    record_retry("keyword")
                 try:
                     result = await self.section_keyword_recommend(context, max_tokens)
                     if result.success:
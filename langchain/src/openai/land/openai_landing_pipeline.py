@@ -0,0 +1,142 @@
+import asyncio
+from typing import Any, Dict, Optional
+import logging
+
+from src.openai.land.openai_sectiongenerator import OpenAISectionGenerator
+from src.openai.land.openai_blockrecommend import OpenAIBlockSelector
+from src.openai.land.openai_blockcontentgenerator import OpenAIBlockContentGenerator
+from src.openai.land.openai_keywordforimage import OpenAIKeywordClient
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAILandingPipeline:
+    """섹션 구조 → 섹션 context → 블록 선택 / 키워드 → 블록 컨텐츠 를 서버에서 한 번에 실행
+
+    /api/section_select, /api/block_select, /api/block_content_generate 와 같은 클래스를 사용하고
+    섹션마다 context가 만들어지는 즉시 그 섹션의 블록 선택과 키워드 생성을 시작한다.
+    (다른 섹션의 context를 기다리지 않음)
+    """
+
+    def __init__(self, output_language, batch_handler,
+                 max_tokens_section_structure: int = 200,
+                 max_tokens_section_contents: int = 300,
+                 max_tokens_select_block: int = 50,
+                 max_tokens_block_contents: int = 1000,
+                 max_tokens_keyword: int = 100):
+        self.section_generator = OpenAISectionGenerator(output_language=output_language,
+                                                        batch_handler=batch_handler)
+        self.section_generator.structure_generator.set_extra_body(self.section_generator.structure_extra_body())
+        self.block_selector = OpenAIBlockSelector(batch_handler=batch_handler)
+        self.block_content_generator = OpenAIBlockContentGenerator(output_language=output_language,
+                                                                   batch_handler=batch_handler)
+        self.keyword_client = OpenAIKeywordClient(batch_handler=batch_handler)
+
+        self.max_tokens_section_structure = max_tokens_section_structure
+        self.max_tokens_section_contents = max_tokens_section_contents
+        self.max_tokens_select_block = max_tokens_select_block
+        self.max_tokens_block_contents = max_tokens_block_contents
+        self.max_tokens_keyword = max_tokens_keyword
+
+    async def run(self,
+                  all_usr_data: str,
+                  usr_msg: str,
+                  blocks: Dict[str, Dict[str, str]],
+                  block_tag_length: Dict[str, Any],
+                  block_select_mode: Optional[str] = None) -> Dict[str, Any]:
+        """랜딩 페이지 1개 생성
+
+        Args:
+            all_usr_data: 1번 API(input_data_process)의 final_result 텍스트
+            usr_msg: 블록 컨텐츠 생성에 같이 넣을 사용자 메시지
+            blocks: {섹션 이름("Hero" 등): {Block_id: HTML_Tag}} 섹션별 후보 블록
+            block_tag_length: {Block_id: tag_length} 블록별 태그 길이 (block_content_generate의 tag_length)
+            block_select_mode: "AI" / "RANDOM" (None이면 AI)
+
+        Returns:
+            dict: {"section_structure": {...}, "sections": [섹션별 결과, ...]}
+        """
+        combined_data = f"PDF summary data = {all_usr_data}"
+        structure_result = await self.section_generator.generate_section_structure(
+            combined_data, self.max_tokens_section_structure
+        )
+        if structure_result is None:
+            return {"error": "Section structure generation failed"}
+        section_structure = structure_result.data['generations'][0][0]['text']
+
+        tasks = [
+            self.run_section(section_key, section_name, combined_data, usr_msg,
+                             blocks.get(section_name) or {}, block_tag_length, block_select_mode or "AI")
+            for section_key, section_name in section_structure.items()
+        ]
+        sections = await asyncio.gather(*tasks, return_exceptions=True)
+        return {
+            "section_structure": section_structure,
+            "sections": [
+                {"section_key": section_key, "section_name": section_name, "error": str(section)}
+                if isinstance(section, Exception) else section
+                for (section_key, section_name), section in zip(section_structure.items(), sections)
+            ]
+        }
+
+    async def run_section(self, section_key: str, section_name: str, combined_data: str, usr_msg: str,
+                          block_list: Dict[str, str], block_tag_length: Dict[str, Any],
+                          block_select_mode: str) -> Dict[str, Any]:
+        """섹션 1개: context 생성 후 블록 선택과 키워드를 동시에, 선택된 블록으로 컨텐츠 생성"""
+        result = {"section_key": section_key, "section_name": section_name}
+
+        context = await self.section_generator.content_generator.generate_section_content(
+            section_name, combined_data, self.max_tokens_section_contents
+        )
+        if context is None:
+            result["error"] = "Section context generation failed"
+            return result
+        result["section_context"] = {section_name: context}
+
+        keyword_task = asyncio.ensure_future(
+            self.keyword_client.section_keyword_create_logic(context=context, max_tokens=self.max_tokens_keyword)
+        )
+        try:
+            if not block_list:
+                result["error"] = f"No block candidates for section '{section_name}'"
+                result["keywords"] = await keyword_task
+                return result
+
+            selected_blocks = await self.select_block(section_name, context, block_list, block_select_mode)
+            result["selected_blocks"] = selected_blocks
+            block_id = selected_blocks[0]['Block_id']
+            tag_length = block_tag_length.get(block_id)
+            if not tag_length:
+                result["error"] = f"No tag_length for block '{block_id}'"
+                result["keywords"] = await keyword_task
+                return result
+
+            content_result, keyword_result = await asyncio.gather(
+                self.block_content_generator.generate_content(
+                    usr_msg, tag_length, result["section_context"], max_tokens=self.max_tokens_block_contents
+                ),
+                keyword_task,
+                return_exceptions=True
+            )
+            result["content"] = content_result if not isinstance(content_result, Exception) else {"error": str(content_result)}
+            result["keywords"] = keyword_result if not isinstance(keyword_result, Exception) else str(keyword_result)
+            return result
+        finally:
+            if not keyword_task.done():
+                keyword_task.cancel()
+
+    async def select_block(self, section_name: str, context: str, block_list: Dict[str, str],
+                           block_select_mode: str) -> list:
+        """/api/block_select 와 같은 방식으로 후보 블록 선택 (AI 선택이 실패하면 랜덤)"""
+        if block_select_mode == "AI":
+            try:
+                selected = await self.block_selector.select_block(
+                    (section_name, context), (section_name, block_list), self.max_tokens_select_block
+                )
+            except Exception as e:
+                logger.error(f"AI block selection failed for '{section_name}': {str(e)}")
+                selected = None
+            if selected:
+                return selected
+            logger.info(f"AI block selection returned nothing for '{section_name}', falling back to random")
+        return await self.block_selector.select_block_randomly((section_name, block_list))
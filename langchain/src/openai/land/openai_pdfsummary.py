@@ -4,6 +4,9 @@ import json
 import re
 from typing import List
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from src.utils.request_context import remaining_timeout
+from src.utils.metrics import track_stage
+from src.utils.tracing import traced
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -14,6 +17,7 @@ class OpenAIProposalClient:
         self.pdf_content = pdf_content or ""
         self.batch_handler = batch_handler
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, temperature:float, top_p:float, max_tokens: int = 100) -> str:
 
         model = "/usr/local/bin/models/gemma-3-4b-it"
@@ -31,7 +35,7 @@ class OpenAIProposalClient:
                     "stream": False,
                     "logprobs": None,
                 }, request_id=0),
-                timeout=120  # 타임아웃 설정
+                timeout=remaining_timeout(120)  # 타임아웃 설정
             )
             return response
         except asyncio.TimeoutError:
@@ -41,6 +45,7 @@ class OpenAIProposalClient:
             print(f"[ERROR] Unexpected error: {str(e)}")
             return f"Error: {str(e)}"
 
+    @track_stage("proposal")
     async def generate_proposal(self, max_tokens: int = 500, temperature = 0.7, top_p = 0.9) -> dict:
         try:
             sys_prompt = f"""
@@ -88,6 +93,7 @@ class OpenAIProposalClient:
             logger.error(f"Proposal 생성 오류: {str(e)}")
             return {"error": str(e)}
         
+    @track_stage("consolidation")
     async def consolidate_proposals(self, proposals: List[str], max_tokens: int = 800, temperature = 0.3, top_p = 0.3) -> dict:
         """PDF가 2개 이상일 때 Proposal을 통합"""
         try:
@@ -1,7 +1,37 @@
 import json
 import re
 import asyncio
+import logging
 from src.utils.batch_handler import BatchRequestHandler
+from src.configs.batch_config import SectionGenerateConfig
+from src.utils.request_context import remaining_timeout
+from src.utils.metrics import track_stage, record_parse_failure, record_repair_fallback
+from src.utils.prompt_registry import prompt_registry
+from src.utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# NOTE : vLLM prefix caching을 위해 요청마다 바뀌는 값(output_language)은 마지막에만 둔다
+SECTION_CONTENT_PROMPT = prompt_registry.register(
+    "section_content",
+    static="""
+    [System]
+    You are a professional content generator for sections in the website landing pages.
+    You know what should be included in the composition of each section.
+    Your task is to generate concise, unique content based on combined_data.
+
+    #### INSTRUCTIONS ####
+    1. WRITE PLAIN TEXT CONTENT FOR THE 'section_name' SECTION.
+    2. WRITE BETWEEN 200 AND 300 CHARACTERS IN FOR THE OUTPUT.
+    3. USE ONLY RELEVANT PARTS OF THE USER'S DATA: 'combined_data'.
+    4. AVOID REPEATING CONTENT.
+    5. DO NOT include ANY structure, tags, headers (e.g., ###, [System], [Response]), or metadata. Output ONLY the raw text.
+    """,
+    dynamic="""
+    #### Output Language ####
+    **{output_language}**
+    """
+)
 
 
 class OpenAISectionStructureGenerator:
@@ -15,6 +45,7 @@ class OpenAISectionStructureGenerator:
         self.extra_body = extra_body
         
     # async def send_request(self, prompt: str, max_tokens: int = 200) -> str:
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 200, extra_body: dict = None) -> str:
         if extra_body is None:
             extra_body = self.extra_body
@@ -33,10 +64,11 @@ class OpenAISectionStructureGenerator:
                 "stream": False,
                 "logprobs": None
             }, request_id=0),
-            timeout=300  # 적절한 타임아웃 값 설정
+            timeout=remaining_timeout(300)  # 적절한 타임아웃 값 설정
         )
         return response
     
+    @track_stage("structure")
     async def create_section_structure(self, final_summary_data: str, max_tokens: int = 200):
 
         sys_prompt = f"""
@@ -85,6 +117,7 @@ class OpenAISectionContentGenerator:
         self.output_language = output_language
         self.batch_handler = batch_handler
     
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 300) -> str:
     # async def send_request(self, prompt: str, max_tokens: int = 300) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
@@ -101,7 +134,7 @@ class OpenAISectionContentGenerator:
                 "stream": False,
                 "logprobs": None
             }, request_id=0),
-            timeout=120  # 적절한 타임아웃 값 설정
+            timeout=remaining_timeout(120)  # 적절한 타임아웃 값 설정
         )
         return response
     
@@ -111,22 +144,7 @@ class OpenAISectionContentGenerator:
         # is_korean = any(ord(c) >= 0xAC00 and ord(c) <= 0xD7A3 for c in combined_data)
         # language_instruction = "한국어로 작성하세요." if is_korean else "Write in English."
 
-        sys_prompt = f"""
-        [System]
-        You are a professional content generator for sections in the website landing pages.
-        You know what should be included in the composition of each section.
-        Your task is to generate concise, unique content based on combined_data.
-
-        #### INSTRUCTIONS ####
-        1. WRITE PLAIN TEXT CONTENT FOR THE 'section_name' SECTION.
-        2. WRITE BETWEEN 200 AND 300 CHARACTERS IN FOR THE OUTPUT.
-        3. USE ONLY RELEVANT PARTS OF THE USER'S DATA: 'combined_data'.
-        4. AVOID REPEATING CONTENT.
-        5. DO NOT include ANY structure, tags, headers (e.g., ###, [System], [Response]), or metadata. Output ONLY the raw text.
-        
-        #### Output Language ####
-        **{self.output_language}**
-        """
+        sys_prompt = SECTION_CONTENT_PROMPT.render(output_language=self.output_language)
         
         usr_prompt = f"""
         Section_name = {section_name}
@@ -134,25 +152,29 @@ class OpenAISectionContentGenerator:
         """
         return sys_prompt, usr_prompt
     
+    async def generate_section_content(self, section_name, combined_data, max_tokens=300):
+        """섹션 1개의 context 생성 (실패하면 None)"""
+        sys_prompt, usr_prompt = self.create_section_prompt(section_name, combined_data)
+        response = await self.send_request(sys_prompt=sys_prompt, usr_prompt=usr_prompt, max_tokens=max_tokens)
+        if response.success and hasattr(response, 'data'):
+            # content = response.data.generations[0][0].text
+            content = response.data['generations'][0][0]['text']
+            # 콘텐츠 정제
+            return self.clean_content(content)
+        return None
+
     async def generate_section_contents_individually(self, section_structure, combined_data, max_tokens=300):
-        # 모든 섹션에 대한 태스크 생성
-        tasks = []
-        for section_key, section_name in section_structure.items():
-            sys_prompt, usr_prompt = self.create_section_prompt(section_name, combined_data)
-            tasks.append(self.send_request(sys_prompt=sys_prompt, usr_prompt=usr_prompt, max_tokens=max_tokens))
-        
-        # 모든 태스크를 병렬로 실행
-        results = {}
+        # 모든 섹션에 대한 태스크를 병렬로 실행
+        tasks = [
+            self.generate_section_content(section_name, combined_data, max_tokens)
+            for section_name in section_structure.values()
+        ]
         responses = await asyncio.gather(*tasks)
-        
+
         # 결과 처리
-        for section_key, response in zip(section_structure.keys(), responses):
-            section_name = section_structure[section_key]
-            if response.success and hasattr(response, 'data'):
-                # content = response.data.generations[0][0].text
-                content = response.data['generations'][0][0]['text']
-                # 콘텐츠 정제
-                content = self.clean_content(content)
+        results = {}
+        for section_name, content in zip(section_structure.values(), responses):
+            if content is not None:
                 results[section_name] = content
         
         return results
@@ -226,9 +248,10 @@ class OpenAISectionGenerator:
         self.structure_generator = OpenAISectionStructureGenerator(batch_handler)
         self.content_generator = OpenAISectionContentGenerator(output_language, batch_handler)
         
-    async def generate_landing_page(self, requests, max_tokens: int = 200):
-        results = []
-        extra_body = {
+    @staticmethod
+    def structure_extra_body() -> dict:
+        """섹션 구조 생성용 guided_json"""
+        return {
             "guided_json": {
                 "type": "object",
                 "properties": {
@@ -260,17 +283,76 @@ class OpenAISectionGenerator:
                 "required": ["section_1", "section_2", "section_3", "section_4", "section_5", "section_6"]
             }
         }
-        
+
+    async def generate_landing_page(self, requests, max_tokens: int = 200, max_concurrency: int = None):
+        """요청들을 최대 max_concurrency개까지 동시에 처리
+
+        max_concurrency를 지정하지 않으면 SECTION_GENERATE_CONCURRENCY,
+        그것도 없으면 gemma 서버의 AIMD 동시 실행 limit 현재값을 사용한다.
+
+        Returns:
+            list: requests와 같은 순서의 결과 (실패한 요청은 {"error": 에러 메시지})
+        """
+        extra_body = self.structure_extra_body()
         self.structure_generator.set_extra_body(extra_body)
-        for req in requests:
+        if max_concurrency is None:
+            max_concurrency = SectionGenerateConfig.max_concurrency or \
+                self.batch_handler.current_concurrency_limit("/usr/local/bin/models/gemma-3-4b-it")
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
-            section_data = await self.generate_section(req.all_usr_data, max_tokens)
-            results.append(section_data)
-        return results
+        async def generate(index, req):
+            async with semaphore:
+                try:
+                    result = await self.generate_section(req.all_usr_data, max_tokens)
+                except Exception as e:
+                    # 한 요청이 실패해도 나머지 요청 결과는 그대로 반환 (/api/landing_pipeline 과 같은 에러 형식)
+                    logger.error(f"Error in generate_landing_page request {index}: {str(e)}", exc_info=True)
+                    return {"error": str(e)}
+                if result is None:
+                    return {"error": "Section structure generation failed"}
+                return result
+
+        return await asyncio.gather(*(generate(index, req) for index, req in enumerate(requests)))
 
     # NOTE : merged된 데이터가 들어오면서 기존 2개를 합치던 방식이 1개로 바뀜
     async def generate_section(self, all_usr_data: str, max_tokens: int = 200):
         combined_data = f"PDF summary data = {all_usr_data}"
+        section_structure_LLM_result = await self.generate_section_structure(combined_data, max_tokens)
+        if section_structure_LLM_result is None:
+            return None
+
+        # create_section = section_structure_LLM_result.data.generations[0][0].text
+        create_section = section_structure_LLM_result.data['generations'][0][0]['text']
+        section_content_data = await self.content_generator.generate_section_contents_individually(
+            create_section,
+            combined_data,
+            max_tokens=300
+        )
+
+        return {
+            "section_structure": section_structure_LLM_result,  # 그대로 유지
+            "section_contents": {
+                "success": True,
+                "data": {
+                    "generations": [
+                        [
+                            {
+                                "text": section_content_data
+                            }
+                        ]
+                    ]
+                }
+            }
+        }
+
+    async def generate_section_structure(self, combined_data: str, max_tokens: int = 200):
+        """섹션 구조 생성 후 허용된 값/중복 보정
+
+        NOTE : structure_generator에 structure_extra_body()가 설정되어 있어야 함
+
+        Returns:
+            RequestResult: data['generations'][0][0]['text'] = {"section_1": "Hero", ...} (실패하면 None)
+        """
         allowed_values = {
             "section_1": ["Hero"],
             "section_2": ["Feature", "Content"],
@@ -304,6 +386,7 @@ class OpenAISectionGenerator:
             updated_structure = {}
             used_values = set()  # 이미 사용된 값을 추적
             if section_structure is None or not isinstance(section_structure, dict):
+                record_repair_fallback("random_choice", "structure")
                 section_structure = {}
                 for section_key in allowed_values.keys():
                     # 해당 섹션에 대해 허용된 값들 중에서 랜덤으로 하나 선택
@@ -330,29 +413,7 @@ class OpenAISectionGenerator:
                     section_structure[section_key] = random.choice(allowed_values[section_key])
             else:
                 break
-        # create_section = section_structure_LLM_result.data.generations[0][0].text
-        create_section = section_structure_LLM_result.data['generations'][0][0]['text']
-        section_content_data = await self.content_generator.generate_section_contents_individually(
-            create_section,
-            combined_data,
-            max_tokens=300
-        )
-
-        return {
-            "section_structure": section_structure_LLM_result,  # 그대로 유지
-            "section_contents": {
-                "success": True,
-                "data": {
-                    "generations": [
-                        [
-                            {
-                                "text": section_content_data
-                            }
-                        ]
-                    ]
-                }
-            }
-        }
+        return section_structure_LLM_result
         
     def extract_json(self, text):
         # 가장 바깥쪽의 중괄호 쌍을 찾습니다.
@@ -367,6 +428,7 @@ class OpenAISectionGenerator:
             if json_str:
                 json_str = json_str.group() + '}'
             else:
+                record_parse_failure("structure")
                 return None
 
         # Balance braces if necessary
@@ -378,8 +440,11 @@ class OpenAISectionGenerator:
         try:
             return json.loads(json_str)
         except json.JSONDecodeError:
+            record_parse_failure("structure")
             # Try a more lenient parsing approach
             try:
-                return json.loads(json_str.replace("'", '"'))
+                parsed = json.loads(json_str.replace("'", '"'))
             except json.JSONDecodeError:
-                return None
\ No newline at end of file
+                return None
+            record_repair_fallback("quote_fix", "structure")
+            return parsed
\ No newline at end of file
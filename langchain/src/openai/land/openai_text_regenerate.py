@@ -1,11 +1,44 @@
 import asyncio
 import json
 import re
+from src.utils.partial_json import PartialJSONTracker
+from src.utils.request_context import remaining_timeout
+from src.utils.metrics import record_parse_failure, record_repair_fallback
+from src.utils.prompt_registry import prompt_registry
+from src.utils.tracing import traced
+
+# NOTE : vLLM prefix caching을 위해 요청마다 바뀌는 값(length, tag)은 마지막에만 둔다
+TEXT_REGENERATE_PROMPT = prompt_registry.register(
+    "text_regenerate",
+    static="""
+    You are an expert at making sentences flow smoothly.
+    Please create natural and contextual text.
+
+    Important guidelines:
+
+    - Create a text of approximately the Target length given below.
+    - It does not have to be exactly the Target length.
+    - Write naturally within the range of -15% to 0% of the Target length.
+    - Prioritize completeness and context of content.
+    - Write in a balanced amount, not too short or too long.
+    - The text will be inserted within the HTML tag given below. But don't need to add tags like <p>.
+    - 출력은 반드시 extra_body 형식을 맞추고, 언어는 **한국어**로 해줘.
+
+    Please create natural and fluid text that follows the guidelines above.
+    """,
+    dynamic="""
+    Target length = {length} characters
+    HTML tag = {tag}
+    """
+)
+
+
 class OpenAITextRegenerator:
     
     def __init__(self, batch_handler):
         self.batch_handler = batch_handler
     
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 100, extra_body: dict = None) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
         response = await asyncio.wait_for(
@@ -19,64 +52,75 @@ class OpenAITextRegenerator:
                 "top_p": 0.6,
                 "n": 1,
                 "stream": False,
-                "logprobs": None
+                "logprobs": None,
+                "cache": False  # 다시 생성하는 요청이므로 캐시 사용 안 함
             }, request_id=0),
-            timeout=30
+            timeout=remaining_timeout(30)
         )
         return response
 
-    # NOTE 250428 : request를 받고 거기서 풀어내기
-    async def regenerate(self, text_box: str, section_context: dict, tag_length: dict):
-        try:
-            # 태그 이름과 기존 콘텐츠 추출
-            
-            section = list(section_context.keys())[0]
-            context = list(section_context.values())[0]
-            tag = list(tag_length.keys())[0]
-            length = int(list(tag_length.values())[0])
-        
-            # NOTE 250429 : 좀 더 자유도 부분에서 체크가 필요. hyperparameter 수정 필요
-            sys_prompt = f"""
-            You are an expert at making sentences flow smoothly.
-            Please create natural and contextual text.
+    async def stream_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 100, extra_body: dict = None):
+        """send_request의 스트리밍 버전 (생성되는 텍스트 조각을 yield)"""
+        model = "/usr/local/bin/models/gemma-3-4b-it"
+        async for chunk in self.batch_handler.stream_single_request({
+            "sys_prompt": sys_prompt,
+            "usr_prompt": usr_prompt,
+            "extra_body": extra_body,
+            "max_tokens": max_tokens,
+            "model": model,
+            "temperature": 0.8,
+            "top_p": 0.6,
+            "n": 1,
+            "stream": True,
+            "logprobs": None
+        }, request_id=0):
+            yield chunk
 
-            Based on the information above, create a text of approximately {length} characters.
+    def build_regenerate_prompt(self, text_box: str, section_context: dict, tag_length: dict):
+        """regenerate / regenerate_stream 에서 같이 쓰는 프롬프트 생성
 
-            Important guidelines:
+        Returns:
+            tuple: (tag, sys_prompt, usr_prompt, extra_body)
+        """
+        # 태그 이름과 기존 콘텐츠 추출
+        
+        section = list(section_context.keys())[0]
+        context = list(section_context.values())[0]
+        tag = list(tag_length.keys())[0]
+        length = int(list(tag_length.values())[0])
+        
+        # NOTE 250429 : 좀 더 자유도 부분에서 체크가 필요. hyperparameter 수정 필요
+        sys_prompt = TEXT_REGENERATE_PROMPT.render(length=length, tag=tag)
+        
+        usr_prompt = f"""
+        Please generate natural text considering the following context and existing text.
+        
+        Section = {section}
+        
+        Context = {context}
+        
+        previous text = "HTML {tag}: {text_box}"
+        
+        """
 
-            - It does not have to be exactly {length} characters.
-            - Write naturally within the range of -15% to 0% of {length}.
-            - Prioritize completeness and context of content.
-            - Write in a balanced amount, not too short or too long.
-            - The text will be inserted within an HTML {tag}. But don't need to add tags like <p>.
-            - 출력은 반드시 extra_body 형식을 맞추고, 언어는 **한국어**로 해줘.
-            
-            Please create natural and fluid text that follows the guidelines above.
-            """
-            
-            usr_prompt = f"""
-            Please generate natural text considering the following context and existing text.
-            
-            Section = {section}
-            
-            Context = {context}
-            
-            previous text = "HTML {tag}: {text_box}"
-            
-            """
-
-            # extra_body에 태그 이름 설정
-            extra_body = {
-                "guided_json": {
-                    "type": "object",
-                    "properties": {
-                        tag: {
-                            "type": "string",
-                        }
-                    },
-                    "required": [tag]
-                }
+        # extra_body에 태그 이름 설정
+        extra_body = {
+            "guided_json": {
+                "type": "object",
+                "properties": {
+                    tag: {
+                        "type": "string",
+                    }
+                },
+                "required": [tag]
             }
+        }
+        return tag, sys_prompt, usr_prompt, extra_body
+
+    # NOTE 250428 : request를 받고 거기서 풀어내기
+    async def regenerate(self, text_box: str, section_context: dict, tag_length: dict):
+        try:
+            tag, sys_prompt, usr_prompt, extra_body = self.build_regenerate_prompt(text_box, section_context, tag_length)
 
             # send_request 호출
             result = await self.send_request(
@@ -96,6 +140,25 @@ class OpenAITextRegenerator:
             print(f"Exception occurred while regenerating: {str(e)}")
             return None
         
+    async def regenerate_stream(self, text_box: str, section_context: dict, tag_length: dict):
+        """regenerate의 스트리밍 버전
+
+        Yields:
+            ("tag", {tag: 지금까지 생성된 텍스트}) : 텍스트가 늘어날 때마다
+            ("content", {tag: 최종 텍스트}) : 마지막 1회 (실패 시 None)
+        """
+        try:
+            tag, sys_prompt, usr_prompt, extra_body = self.build_regenerate_prompt(text_box, section_context, tag_length)
+            tracker = PartialJSONTracker()
+            async for chunk in self.stream_request(sys_prompt, usr_prompt, max_tokens=200, extra_body=extra_body):
+                changed = tracker.feed(chunk)
+                if changed:
+                    yield "tag", changed
+            yield "content", self.extract_json(tracker.text)
+        except Exception as e:
+            print(f"Exception occurred while regenerating: {str(e)}")
+            yield "content", None
+
     def extract_json(self, text):
         # 가장 바깥쪽의 중괄호 쌍을 찾습니다.
         text = re.sub(r'[\n\r\\\\/]', '', text, flags=re.DOTALL)
@@ -108,6 +171,7 @@ class OpenAITextRegenerator:
             if json_str:
                 json_str = json_str.group() + '}'
             else:
+                record_parse_failure("regenerate")
                 return None
 
         # Balance braces if necessary
@@ -119,8 +183,11 @@ class OpenAITextRegenerator:
         try:
             return json.loads(json_str)
         except json.JSONDecodeError:
+            record_parse_failure("regenerate")
             # Try a more lenient parsing approach
             try:
-                return json.loads(json_str.replace("'", '"'))
+                parsed = json.loads(json_str.replace("'", '"'))
             except json.JSONDecodeError:
-                return None
\ No newline at end of file
+                return None
+            record_repair_fallback("quote_fix", "regenerate")
+            return parsed
\ No newline at end of file
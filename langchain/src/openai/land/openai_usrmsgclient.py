@@ -1,5 +1,8 @@
 import asyncio
 from langchain.prompts import PromptTemplate
+from src.utils.request_context import remaining_timeout
+from src.utils.metrics import track_stage
+from src.utils.tracing import traced
 
 class OpenAIUsrMsgClient:
     def __init__(self, output_language, usr_msg, batch_handler):
@@ -7,6 +10,7 @@ class OpenAIUsrMsgClient:
         self.batch_handler = batch_handler
         self.usr_msg = str(usr_msg) if usr_msg else "입력 내용 없음"
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 500) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
         try:
@@ -24,7 +28,7 @@ class OpenAIUsrMsgClient:
                     "stream": False,
                     "logprobs": None,
                 }, request_id=0),
-                timeout=120  # 타임아웃 설정
+                timeout=remaining_timeout(120)  # 타임아웃 설정
             )
             return response
         except asyncio.TimeoutError:
@@ -35,6 +39,7 @@ class OpenAIUsrMsgClient:
             return f"Error: {str(e)}"
 
 
+    @track_stage("proposal")
     async def usr_msg_proposal(self, max_tokens: int = 500) -> dict:
         try:
             # 프롬프트 템플릿 정의 (간결하게)
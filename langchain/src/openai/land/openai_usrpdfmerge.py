@@ -1,6 +1,9 @@
 import asyncio
 import logging
 from typing import List
+from src.utils.request_context import remaining_timeout
+from src.utils.metrics import track_stage
+from src.utils.tracing import traced
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
@@ -11,6 +14,7 @@ class OpenAIComprehensiveProposalClient:
         self.pdf_proposals = pdf_proposals or []  # 빈 리스트로 초기화
         self.batch_handler = batch_handler
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 100) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
         try:
@@ -27,7 +31,7 @@ class OpenAIComprehensiveProposalClient:
                     "stream": False,
                     "logprobs": None,
                 }, request_id=0),
-                timeout=120  # 타임아웃 설정
+                timeout=remaining_timeout(120)  # 타임아웃 설정
             )
             return response
         except asyncio.TimeoutError:
@@ -38,6 +42,7 @@ class OpenAIComprehensiveProposalClient:
             return f"Error: {str(e)}"
             
 
+    @track_stage("consolidation")
     async def generate_comprehensive_proposal(self, max_tokens: int = 800) -> dict:
         try:
             # 입력 상황에 따라 프롬프트 동적 설정
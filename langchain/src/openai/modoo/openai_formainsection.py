@@ -4,10 +4,13 @@ import asyncio
 from src.utils.batch_handler import BatchRequestHandler
 
 from itertools import groupby
-import pandas as pd
 from typing import Dict, Any
 from collections import defaultdict
 import random
+from src.utils.request_context import remaining_timeout
+from src.utils.guided_schema import guided_schema_builder
+from src.utils.block_catalog import modoo_block_catalog
+from src.utils.tracing import traced
 
 class OpenAISectionStructureSelector:
     def __init__(self, batch_handler, model="gpt-3.5-turbo"):
@@ -19,6 +22,7 @@ class OpenAISectionStructureSelector:
         """extra_body 설정 메서드"""
         self.extra_body = extra_body
         
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 100, extra_body: dict = None) -> str:
         if extra_body is None:
             extra_body = self.extra_body
@@ -36,7 +40,7 @@ class OpenAISectionStructureSelector:
                 "stream": False,
                 "logprobs": None
             }, request_id=0),
-            timeout=300  # 적절한 타임아웃 값 설정
+            timeout=remaining_timeout(300)  # 적절한 타임아웃 값 설정
         )
         return response
     
@@ -84,70 +88,13 @@ class OpenAISectionTextGenerator:
         self.batch_handler = batch_handler
 
     def convert_tag_length_to_schema(self, tag_length):
-        properties = {}
-        required = []
-        
-        if isinstance(tag_length, dict):
-            for key, value in tag_length.items():
-                # 리스트인 경우 (li_0, li_1 등 처리)
-                if isinstance(value, list):
-                    for i, item in enumerate(value):
-                        if isinstance(item, dict):
-                            item_properties = {}
-                            item_required = []
-                            new_key = f"{key}_{i}"  # li_0_0, li_0_1, li_1_0 등
-                            for sub_key, sub_value in item.items():
-                                item_properties[sub_key] = {
-                                    "type": "string",
-                                }
-                                item_required.append(sub_key)
-                            properties[new_key] = {
-                                "type": "array",
-                                "items": {
-                                        "type": "object",
-                                        "properties": item_properties,
-                                        "required": item_required
-                                    },
-                                "minItems": 1,
-                                "maxItems": 1
-                            }
-                            
-                            required.append(new_key)
-                # 딕셔너리인 경우 (중첩 객체)
-                elif isinstance(value, dict):
-                    nested_schema = self.convert_tag_length_to_schema(value)
-                    properties[key] = {
-                        "type": "object",
-                        "properties": nested_schema["properties"],
-                        "required": nested_schema["required"]
-                    }
-                    required.append(key)
-                # 정수나 문자열인 경우 (최대/최소 길이 지정)
-                elif isinstance(value, (int, str)):
-
-                    properties[key] = {
-                        "type": "string",
-                    }
-                    required.append(key)
-                # 기타 타입
-                else:
-                    properties[key] = {"type": "string"}
-                    required.append(key)
-        return {
-            "properties": properties,
-            "required": required
-        }
+        # NOTE : 같은 구조면 항상 같은 schema가 나오도록 공용 builder 사용 (vLLM FSM 재컴파일 방지)
+        return guided_schema_builder.tag_length_schema(tag_length)
 
     def create_extra_body(self, tag_length):
-        schema = self.convert_tag_length_to_schema(tag_length)
-        return {
-            "guided_json": {
-                "type": "object",
-                "properties": schema["properties"],
-                "required": schema["required"]
-            }
-        }
+        return guided_schema_builder.extra_body(tag_length)
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, extra_body, max_tokens: int = 500) -> str:
         
         response = await asyncio.wait_for(
@@ -162,7 +109,7 @@ class OpenAISectionTextGenerator:
                 "stream": False,
                 "logprobs": None,
             }, request_id=0),
-            timeout=120  # 타임아웃 설정
+            timeout=remaining_timeout(120)  # 타임아웃 설정
         )
         return response
 
@@ -257,7 +204,7 @@ class OpenAISectionTextGenerator:
                 "stream": False,
                 "logprobs": None
             }, request_id=0),
-            timeout=120  # 적절한 타임아웃 값 설정
+            timeout=remaining_timeout(120)  # 적절한 타임아웃 값 설정
         )
         return result
 
@@ -364,23 +311,13 @@ class OpenAIhtmltosectioncontents:
         self.batch_handler = batch_handler
         self.structure_selector = OpenAISectionStructureSelector(batch_handler)
         self.tag_text_generator = OpenAISectionTextGenerator(batch_handler)
-        self.block_dataframe = pd.read_excel("src/openai/modoo/matching_block_data/Modoo_matching_blocks.xlsx", index_col=0)
+        # 엑셀은 프로세스에서 1번만 읽고 인덱스/파싱 결과를 공유 (파일이 바뀌면 자동으로 다시 로드)
+        self.block_catalog = modoo_block_catalog
         
         
     async def generate_main_section(self, req, max_tokens: int = 200):
         
-        extra_body = {
-            "guided_json": {
-                "type": "object",
-                "properties": {
-                    "selected_tag": {
-                        "type": "string",
-                        "enum": self.block_dataframe["converted_html_tag"].astype(str).tolist()
-                    }
-                },
-                "required": ["section"]
-            }
-        }
+        extra_body = self.block_catalog.guided_json()
         
         self.structure_selector.set_extra_body(extra_body)
         
@@ -491,10 +428,7 @@ class OpenAIhtmltosectioncontents:
             # 예외 처리: 객체 구조가 예상과 다를 경우
        
         converted_section_html_tag = json.loads(selected_html_tag)        
-        block_ids = self.block_dataframe[self.block_dataframe["converted_html_tag"] == converted_section_html_tag["selected_tag"]].index.tolist()
-        choiced_block_id = random.choice(block_ids)        
-        choiced_section_tag_length = self.block_dataframe.loc[choiced_block_id, "tag_length"]
-        dict_choiced_section_tag_length = json.loads(choiced_section_tag_length)
+        choiced_block_id, dict_choiced_section_tag_length = self.block_catalog.choose_block(converted_section_html_tag["selected_tag"])
         kv_extracted_context = {"Content" : extracted_context}
         tag_text_generator_result = await self.tag_text_generator.generate_tag_text_process(dict_choiced_section_tag_length, kv_extracted_context)
         
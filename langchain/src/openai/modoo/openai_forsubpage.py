@@ -4,10 +4,13 @@ import asyncio
 from src.utils.batch_handler import BatchRequestHandler
 
 from itertools import groupby
-import pandas as pd
 from typing import Dict, Any
 from collections import defaultdict
 import random
+from src.utils.request_context import remaining_timeout
+from src.utils.guided_schema import guided_schema_builder
+from src.utils.block_catalog import modoo_block_catalog
+from src.utils.tracing import traced
 
 
 class OpenAISectionSlicer:
@@ -20,6 +23,7 @@ class OpenAISectionSlicer:
         """extra_body 설정 메서드"""
         self.extra_body = extra_body
         
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 150, extra_body: dict = None) -> str:
         if extra_body is None:
             extra_body = self.extra_body
@@ -37,7 +41,7 @@ class OpenAISectionSlicer:
                 "stream": False,
                 "logprobs": None
             }, request_id=0),
-            timeout=300  # 적절한 타임아웃 값 설정
+            timeout=remaining_timeout(300)  # 적절한 타임아웃 값 설정
         )
         return response
     
@@ -116,6 +120,7 @@ class OpenAISectionStructureSelector:
         """extra_body 설정 메서드"""
         self.extra_body = extra_body
         
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 100, extra_body: dict = None) -> str:
         if extra_body is None:
             extra_body = self.extra_body
@@ -133,7 +138,7 @@ class OpenAISectionStructureSelector:
                 "stream": False,
                 "logprobs": None
             }, request_id=0),
-            timeout=300  # 적절한 타임아웃 값 설정
+            timeout=remaining_timeout(300)  # 적절한 타임아웃 값 설정
         )
         return response
     
@@ -177,70 +182,13 @@ class OpenAISectionTextGenerator:
         self.batch_handler = batch_handler
 
     def convert_tag_length_to_schema(self, tag_length):
-        properties = {}
-        required = []
-        
-        if isinstance(tag_length, dict):
-            for key, value in tag_length.items():
-                # 리스트인 경우 (li_0, li_1 등 처리)
-                if isinstance(value, list):
-                    for i, item in enumerate(value):
-                        if isinstance(item, dict):
-                            item_properties = {}
-                            item_required = []
-                            new_key = f"{key}_{i}"  # li_0_0, li_0_1, li_1_0 등
-                            for sub_key, sub_value in item.items():
-                                item_properties[sub_key] = {
-                                    "type": "string",
-                                }
-                                item_required.append(sub_key)
-                            properties[new_key] = {
-                                "type": "array",
-                                "items": {
-                                        "type": "object",
-                                        "properties": item_properties,
-                                        "required": item_required
-                                    },
-                                "minItems": 1,
-                                "maxItems": 1
-                            }
-                            
-                            required.append(new_key)
-                # 딕셔너리인 경우 (중첩 객체)
-                elif isinstance(value, dict):
-                    nested_schema = self.convert_tag_length_to_schema(value)
-                    properties[key] = {
-                        "type": "object",
-                        "properties": nested_schema["properties"],
-                        "required": nested_schema["required"]
-                    }
-                    required.append(key)
-                # 정수나 문자열인 경우 (최대/최소 길이 지정)
-                elif isinstance(value, (int, str)):
-
-                    properties[key] = {
-                        "type": "string",
-                    }
-                    required.append(key)
-                # 기타 타입
-                else:
-                    properties[key] = {"type": "string"}
-                    required.append(key)
-        return {
-            "properties": properties,
-            "required": required
-        }
+        # NOTE : 같은 구조면 항상 같은 schema가 나오도록 공용 builder 사용 (vLLM FSM 재컴파일 방지)
+        return guided_schema_builder.tag_length_schema(tag_length)
 
     def create_extra_body(self, tag_length):
-        schema = self.convert_tag_length_to_schema(tag_length)
-        return {
-            "guided_json": {
-                "type": "object",
-                "properties": schema["properties"],
-                "required": schema["required"]
-            }
-        }
+        return guided_schema_builder.extra_body(tag_length)
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, extra_body, max_tokens: int = 500) -> str:
         
         response = await asyncio.wait_for(
@@ -255,7 +203,7 @@ class OpenAISectionTextGenerator:
                 "stream": False,
                 "logprobs": None,
             }, request_id=0),
-            timeout=120  # 타임아웃 설정
+            timeout=remaining_timeout(120)  # 타임아웃 설정
         )
         return response
 
@@ -350,7 +298,7 @@ class OpenAISectionTextGenerator:
                 "stream": False,
                 "logprobs": None
             }, request_id=0),
-            timeout=120  # 적절한 타임아웃 값 설정
+            timeout=remaining_timeout(120)  # 적절한 타임아웃 값 설정
         )
         return result
 
@@ -458,52 +406,80 @@ class OpenAIhtmltopagecontents:
         self.section_slicer = OpenAISectionSlicer(batch_handler)
         self.structure_selector = OpenAISectionStructureSelector(batch_handler)
         self.tag_text_generator = OpenAISectionTextGenerator(batch_handler)
-        self.block_dataframe = pd.read_excel("src/openai/modoo/matching_block_data/Modoo_matching_blocks.xlsx", index_col=0)
+        # 엑셀은 프로세스에서 1번만 읽고 인덱스/파싱 결과를 공유 (파일이 바뀌면 자동으로 다시 로드)
+        self.block_catalog = modoo_block_catalog
         
         
-    async def generate_sub_page_process(self, req, max_tokens: int = 200):        
+    async def generate_sub_page_process(self, req, max_tokens: int = 200, max_concurrency: int = 6):
+        """서브페이지 1개 변환: 섹션별 블록 선택/텍스트 생성을 최대 max_concurrency개까지 동시에 실행
+
+        Returns:
+            list: 섹션 순서대로 성공한 섹션 결과
+        """
         results = []
-        extra_body = {
-            "guided_json": {
-                "type": "object",
-                "properties": {
-                    "selected_tag": {
-                        "type": "string",
-                        "enum": self.block_dataframe["converted_html_tag"].astype(str).tolist()
-                    }
-                },
-                "required": ["section"]
-            }
-        }
-        
+        async for _, _, result in self.generate_sub_page_process_stream(req, max_tokens, max_concurrency, ordered=True):
+            if result:
+                results.append(result)
+        return results
+
+    async def generate_sub_page_process_stream(self, req, max_tokens: int = 200, max_concurrency: int = 6,
+                                               ordered: bool = False):
+        """generate_sub_page_process의 스트리밍 버전
+
+        Args:
+            ordered: True면 섹션 순서대로, False면 먼저 끝난 섹션부터 yield
+
+        Yields:
+            (섹션 index, converted_section_html_tag, 섹션 결과 (실패 시 None))
+        """
+        sumed_section_dict = await self.prepare_sub_page_sections(req)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def generate(index, converted_section_html_tag, extracted_section_context):
+            async with semaphore:
+                try:
+                    result = await self.generate_sub_page(converted_section_html_tag, extracted_section_context, max_tokens)
+                except Exception as e:
+                    print(f"Error processing task: {e}")
+                    result = None
+            return index, converted_section_html_tag, result
+
+        tasks = [
+            asyncio.ensure_future(generate(index, converted_section_html_tag, extracted_section_context))
+            for index, (converted_section_html_tag, extracted_section_context) in enumerate(sumed_section_dict.items())
+        ]
+        try:
+            for task in (tasks if ordered else asyncio.as_completed(tasks)):
+                yield await task
+        finally:
+            # 소비하는 쪽이 중간에 멈추면(연결 종료 등) 남은 섹션 생성을 취소
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def prepare_sub_page_sections(self, req) -> dict:
+        """서브페이지 HTML을 섹션으로 나누고 {converted_section_html_tag: 섹션 context} 반환"""
+        extra_body = self.block_catalog.guided_json()
+
         self.structure_selector.set_extra_body(extra_body)
-        
+
         converted_html_tag = await self.converting_html_tag(req)
         print("TEST_converted_html_tag : ", converted_html_tag)
         extracted_page_context = await self.extracting_page_context(req)
         print("TEST_extracted_page_context : ", extracted_page_context)
-        
+
         sliced_sections = await self.section_slicer.slice_sub_page_to_sections(converted_html_tag)
-        sliced_sections_dict = json.loads(sliced_sections.data['generations'][0][0]['text'].strip())            
+        sliced_sections_dict = json.loads(sliced_sections.data['generations'][0][0]['text'].strip())
         print("TEST_sliced_sections_dict : ", sliced_sections_dict)
-        
+
         # NOTE : 애초에 Section 별로 이상하게 잘림
         splited_section_context = await self.split_html_by_tags(extracted_page_context, sliced_sections_dict)
         print("TEST_splited_section_context : ", splited_section_context)
-        
+
         # NOTE : 끝에가 먼저 나오는 케이스 발견 0,1,2로 나와야 하는데 2,0,1로 나옴
         sumed_section_dict = await self.sum_section_dict(sliced_sections_dict, splited_section_context)
         print("TEST_sumed_section_dict : ", sumed_section_dict)
-        
-        tasks = [await self.generate_sub_page(converted_section_html_tag, extracted_section_context, max_tokens) for converted_section_html_tag, extracted_section_context in sumed_section_dict.items()]
-        for task in tasks:
-            try:
-                result = task
-                if result:
-                    results.append(result)
-            except Exception as e:
-                print(f"Error processing task: {e}")
-        return results
+        return sumed_section_dict
 
     async def converting_html_tag(self, section_html: str):
         
@@ -730,13 +706,7 @@ class OpenAIhtmltopagecontents:
         
         converted_section_html_tag = json.loads(selected_html_tag)
         
-        block_ids = self.block_dataframe[self.block_dataframe["converted_html_tag"] == converted_section_html_tag["selected_tag"]].index.tolist()
-        
-        choiced_block_id = random.choice(block_ids)
-        
-        choiced_section_tag_length = self.block_dataframe.loc[choiced_block_id, "tag_length"]
-
-        dict_choiced_section_tag_length = json.loads(choiced_section_tag_length)
+        choiced_block_id, dict_choiced_section_tag_length = self.block_catalog.choose_block(converted_section_html_tag["selected_tag"])
         
         kv_extracted_context = {"Content" : extracted_section_context}
         
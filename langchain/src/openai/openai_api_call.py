@@ -6,21 +6,53 @@ from langchain.schema import HumanMessage, SystemMessage, AIMessage
 from langchain.callbacks.manager import AsyncCallbackManager, CallbackManager
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from src.configs.openai_config import OpenAIConfig
+from src.configs.batch_config import MicroBatchConfig, ReplicaPoolConfig
+from src.utils.micro_batcher import MicroBatcher
+from src.utils.replica_pool import Replica, ReplicaPool
+from src.utils.http_pools import http_pools
+from src.utils.metrics import record_tokens, record_chat_usage
+from openai import AsyncOpenAI
 import asyncio
 class OpenAIService:
     """This class handles openai requests."""
 
+    # model_router 키 -> vLLM에 올라간 모델 경로
+    MODEL_PATHS = {
+        "eeve": "/usr/local/bin/models/EEVE-Korean-Instruct-10.8B-v1.0",
+        "gemma": "/usr/local/bin/models/gemma-3-4b-it",
+    }
+    DEFAULT_MODEL_KEY = "eeve"
+    # model_router 키 -> vLLM 서버 주소
+    MODEL_BASE_URLS = {
+        "eeve": "http://vllm_eeve:8002/v1",
+        "gemma": "http://vllm_gemma:8022/v1",
+    }
+    # /v1/completions 로 보낼 때 생성을 멈출 토큰 (chat template의 턴 종료 토큰)
+    STOP_TOKENS = {
+        "eeve": ["</s>", "\nHuman:"],
+        "gemma": ["<end_of_turn>"],
+    }
+    # 요청에 max_tokens가 없을 때 기본값
+    DEFAULT_MAX_TOKENS = {
+        "eeve": 2000,
+        "gemma": 500,
+    }
+
     # Initialize logger
 
     def __init__(
         self,
         openai_config: OpenAIConfig = None,
-        streaming: bool = False
+        streaming: bool = False,
+        micro_batch_config: MicroBatchConfig = None,
+        replica_pool_config: ReplicaPoolConfig = None
         ) -> None:
         """Intializer method of the class
 
         Args:
             openai_config (OpenAIConfig): Neccessary configs for openai api.
+            micro_batch_config (MicroBatchConfig): chat 요청을 /v1/completions 로 묶어 보내는 설정.
+            replica_pool_config (ReplicaPoolConfig): 모델별 vLLM replica 주소 및 health 설정.
 
         Returns:
             None
@@ -49,114 +81,203 @@ class OpenAIService:
         print("openai_config.openai_api_base : ", openai_config.openai_api_base)
         
         
-        self.chat_EEVE = ChatOpenAI(
-            model="/usr/local/bin/models/EEVE-Korean-Instruct-10.8B-v1.0",
-            openai_api_key=openai_config.openai_api_key,
-            # openai_api_base=openai_config.openai_api_base,
-            openai_api_base="http://vllm_eeve:8002/v1",
-            streaming=streaming,
-            max_tokens=2000
-        )
-
-        self.chat_gemma_3_4b = ChatOpenAI(
-            model="/usr/local/bin/models/gemma-3-4b-it",
-            openai_api_key=openai_config.openai_api_key,
-            openai_api_base="http://vllm_gemma:8022/v1",
-            streaming=streaming,
-            max_tokens=500
+        # 모델별 replica pool (서버마다 ChatOpenAI / AsyncOpenAI 클라이언트 1쌍, 연결은 http_pools의 서버별 client 공유)
+        self.replica_pool_config = replica_pool_config or ReplicaPoolConfig()
+        self.model_router = {
+            model_key: ReplicaPool(
+                model_key,
+                [
+                    Replica(base_url, {
+                        "chat": ChatOpenAI(
+                            model=self.MODEL_PATHS[model_key],
+                            openai_api_key=openai_config.openai_api_key,
+                            openai_api_base=base_url,
+                            streaming=streaming,
+                            max_tokens=self.DEFAULT_MAX_TOKENS[model_key],
+                            http_async_client=http_pools.vllm_client(base_url)
+                        ),
+                        # /v1/completions 용 클라이언트 (list prompt 호출)
+                        "completion": AsyncOpenAI(api_key=openai_config.openai_api_key, base_url=base_url,
+                                                  http_client=http_pools.vllm_client(base_url)),
+                    })
+                    for base_url in self.replica_pool_config.urls(model_key, default_url)
+                ],
+                max_failures=self.replica_pool_config.max_failures,
+                eject_seconds=self.replica_pool_config.eject_seconds
+            )
+            for model_key, default_url in self.MODEL_BASE_URLS.items()
+        }
+
+        # 기존 코드 호환용 (첫 번째 replica)
+        self.chat_EEVE = self.model_router["eeve"].primary.clients["chat"]
+        self.chat_gemma_3_4b = self.model_router["gemma"].primary.clients["chat"]
+
+        # NOTE : micro-batching은 opt-in (MICRO_BATCH_ENABLED)
+        micro_batch_config = micro_batch_config or MicroBatchConfig()
+        self.micro_batcher = MicroBatcher(
+            self._flush_micro_batch,
+            window_ms=micro_batch_config.window_ms,
+            max_batch_size=micro_batch_config.max_batch_size
+        ) if micro_batch_config.enabled else None
+
+    @classmethod
+    def get_model_key(cls, model: str = None) -> str:
+        """요청의 model 경로를 model_router 키로 변환 (모르는 모델은 eeve)"""
+        for model_key, model_path in cls.MODEL_PATHS.items():
+            if model == model_path:
+                return model_key
+        return cls.DEFAULT_MODEL_KEY
+
+    def start_health_checks(self):
+        """replica health probe 시작 (이벤트 루프 안에서 호출)"""
+        if self.replica_pool_config.probe_interval <= 0:
+            return
+        for pool in self.model_router.values():
+            pool.start_probes(self.replica_pool_config.probe_interval, self.replica_pool_config.probe_timeout)
+
+    async def stop_health_checks(self):
+        for pool in self.model_router.values():
+            await pool.stop_probes()
+
+    def get_pool_status(self) -> dict:
+        return {model_key: pool.snapshot() for model_key, pool in self.model_router.items()}
+
+    @staticmethod
+    def render_chat_prompt(model_key: str, sys_prompt: str, usr_prompt: str) -> str:
+        """chat template을 로컬에서 렌더링 (/v1/completions 용)
+
+        NOTE : <bos>는 vLLM이 토크나이즈할 때 붙이므로 넣지 않음
+        """
+        if model_key == "gemma":
+            # gemma-3는 system 턴이 없어서 첫 user 턴 앞에 붙임
+            user_content = f"{sys_prompt}\n\n{usr_prompt}" if sys_prompt else usr_prompt
+            return (
+                f"<start_of_turn>user\n{user_content}<end_of_turn>\n"
+                f"<start_of_turn>model\n"
+            )
+        # EEVE-Korean-Instruct 템플릿
+        sys_prompt = sys_prompt or (
+            "A chat between a curious user and an artificial intelligence assistant. "
+            "The assistant gives helpful, detailed, and polite answers to the user's questions."
         )
-        
+        return f"{sys_prompt}\nHuman: {usr_prompt}\nAssistant:\n"
+
+    def _completion_params(self, model_key: str, **kwargs) -> dict:
+        params = {
+            "model": self.MODEL_PATHS[model_key],
+            "max_tokens": kwargs.get("max_tokens") or self.DEFAULT_MAX_TOKENS[model_key],
+            "stop": self.STOP_TOKENS[model_key],
+        }
+        # temperature=0(greedy) 같은 값도 그대로 전달 (빠지면 vLLM 기본값 1.0으로 sampling됨)
+        for key in ("temperature", "top_p", "n", "extra_body"):
+            if kwargs.get(key) is not None:
+                params[key] = kwargs[key]
+        return params
 
     async def completions(self, **kwargs):
-        max_tokens = kwargs.get("max_tokens", self.llm.max_tokens)
+        """/v1/completions 호출 (prompt는 문자열 또는 리스트)
+
+        Returns:
+            dict: {'generations': [[{'text': ...}, ...(n개)], ...(prompt 수)]}
+        """
+        model_key = self.get_model_key(kwargs.get("model"))
         try:
             if self.streaming:
-                response = await self.stream_completion(**kwargs)
-            else:
-                response = await asyncio.to_thread(self.llm.generate, [kwargs['prompt']], max_tokens=max_tokens)
-                print(f"Completions response: {response}")
-            return response
-        
+                text = await self.stream_completion(**kwargs)
+                return {'generations': [[{'text': text}]]}
+
+            prompt = kwargs['prompt']
+            params = self._completion_params(model_key, **kwargs)
+            async with self.model_router[model_key].lease() as replica:
+                response = await replica.clients["completion"].completions.create(prompt=prompt, **params)
+            # micro-batch로 묶인 요청도 여기서 한 번만 집계됨
+            if response.usage is not None:
+                record_tokens(model_key, response.usage.prompt_tokens, response.usage.completion_tokens)
+
+            # choice.index = prompt 순서 * n + j
+            n = params.get("n", 1)
+            n_prompts = len(prompt) if isinstance(prompt, list) else 1
+            generations = [[] for _ in range(n_prompts)]
+            for choice in sorted(response.choices, key=lambda c: c.index):
+                generations[choice.index // n].append({'text': choice.text})
+            return {'generations': generations}
+
         except Exception as e:
             print(f"OpenAI API call failed: {str(e)}")
             raise
 
     async def stream_completion(self, **kwargs):
+        model_key = self.get_model_key(kwargs.get("model"))
+        params = self._completion_params(model_key, **kwargs)
         response = ""
-        async for chunk in self.llm.astream(kwargs['prompt']):
-            response += chunk
-            print(chunk, end="", flush=True)
+        async with self.model_router[model_key].lease() as replica:
+            async for chunk in await replica.clients["completion"].completions.create(
+                prompt=kwargs['prompt'], stream=True, **params
+            ):
+                if chunk.choices and chunk.choices[0].text:
+                    response += chunk.choices[0].text
+                    print(chunk.choices[0].text, end="", flush=True)
         return response
 
+    async def _flush_micro_batch(self, params: dict, prompts: list) -> list:
+        """MicroBatcher에서 모은 프롬프트를 list prompt 한 번으로 전송"""
+        result = await self.completions(prompt=prompts, **params)
+        return [generation[0]['text'] for generation in result['generations']]
+
+    def _get_prompts(self, **kwargs):
+        """sys_prompt / usr_prompt 추출 (usr_prompt가 없으면 messages의 마지막 내용 사용)"""
+        sys_prompt = kwargs.get('sys_prompt', '')
+        usr_prompt = kwargs.get('usr_prompt', None)
+        # usr_prompt 처리 최적화
+        if not usr_prompt and 'messages' in kwargs and kwargs['messages']:
+            usr_prompt = kwargs['messages'][-1]['content']
+
+        if not usr_prompt:
+            raise ValueError("No user prompt provided in 'usr_prompt' or 'messages'")
+        return sys_prompt, usr_prompt
+
+    def _build_invoke_params(self, **kwargs) -> dict:
+        """ChatOpenAI ainvoke / astream 에 넘길 파라미터 생성"""
+        sys_prompt, usr_prompt = self._get_prompts(**kwargs)
+        # 메시지 생성을 최적화
+        messages = [
+            SystemMessage(content=sys_prompt),
+            HumanMessage(content=usr_prompt)
+        ]
+
+        invoke_params = {"input": messages}
+        # repetition_penalty 등은 extra_body로 전달
+        for key in ("max_tokens", "extra_body", "temperature", "top_p", "n"):
+            if kwargs.get(key) is not None: invoke_params[key] = kwargs[key]
+        return invoke_params
+
     async def chat_completions(self, **kwargs):
         try:
-            # 필요한 값들만 효율적으로 추출
-            sys_prompt = kwargs.get('sys_prompt', '')
-            usr_prompt = kwargs.get('usr_prompt', None)
-            max_tokens = kwargs.get('max_tokens')
-            temperature = kwargs.get('temperature')
-            model = kwargs.get('model')
-            # extra_body를 명시적으로 초기화
-            extra_body = kwargs.get('extra_body')
-            # =====================================
-            # 추가적인 파라미터들
-            # repetition_penalty = kwargs.get('repetition_penalty', 1.0)
-            top_p = kwargs.get('top_p')
+            model_key = self.get_model_key(kwargs.get('model'))
             n = kwargs.get('n')
-            
-            if model == '/usr/local/bin/models/gemma-3-4b-it':
-                model_key = "gemma"
-            else:
-                model_key = "eeve"
-            # usr_prompt 처리 최적화
-            if not usr_prompt and 'messages' in kwargs and kwargs['messages']:
-                usr_prompt = kwargs['messages'][-1]['content']
-                
-            if not usr_prompt:
-                raise ValueError("No user prompt provided in 'usr_prompt' or 'messages'")
-                
-            # 메시지 생성을 최적화
-            messages = [
-                SystemMessage(content=sys_prompt),
-                HumanMessage(content=usr_prompt)
-            ]
-            
-            message_gemma = f"""
-                <bos>
-						<start_of_turn>
-								system\n\n           {sys_prompt} 
-								
-						<end_of_turn>\n
-                        <start_of_turn>
-                                user\n\n            {usr_prompt}
-                        <end_of_turn>
-						<start_of_turn>model\n", 
-            """
-            
-            # 단일 ainvoke 호출로 최적화
-            invoke_params = {"input": messages}
-            if max_tokens: invoke_params["max_tokens"] = max_tokens
-            if extra_body: invoke_params["extra_body"] = extra_body
-            if temperature: invoke_params["temperature"] = temperature
-            # if repetition_penalty: invoke_params["repetition_penalty"] = repetition_penalty
-            if top_p: invoke_params["top_p"] = top_p
-            if n: invoke_params["n"] = n
-            if model == "/usr/local/bin/models/EEVE-Korean-Instruct-10.8B-v1.0":
-                model_key = "eeve"
-            elif model == "/usr/local/bin/models/gemma-3-4b-it":
-                model_key = "gemma"
-            else:
-                model_key = "eeve"
-            # invoke_params["model"] = model_key
 
+            # micro-batching: 호환되는 요청끼리 /v1/completions 한 번으로 묶음 (n > 1 은 제외)
+            if self.micro_batcher is not None and not (n and n > 1) and not self.streaming:
+                sys_prompt, usr_prompt = self._get_prompts(**kwargs)
+                params = {
+                    "model": self.MODEL_PATHS[model_key],
+                    "max_tokens": kwargs.get('max_tokens'),
+                    "temperature": kwargs.get('temperature'),
+                    "top_p": kwargs.get('top_p'),
+                    "extra_body": kwargs.get('extra_body'),
+                }
+                text = await self.micro_batcher.submit(
+                    params, self.render_chat_prompt(model_key, sys_prompt, usr_prompt)
+                )
+                return AIMessage(content=text)
 
+            # 단일 ainvoke 호출로 최적화
+            invoke_params = self._build_invoke_params(**kwargs)
             print(f"**invoke_params : {invoke_params}**")
-            model_router = {
-                "eeve": self.chat_EEVE,
-                "gemma": self.chat_gemma_3_4b
-            }
-            
-            result = await model_router[model_key].ainvoke(**invoke_params)
+
+            async with self.model_router[model_key].lease() as replica:
+                result = await replica.clients["chat"].ainvoke(**invoke_params)
+            record_chat_usage(model_key, result)
             
             print("[DEBUG] openapi_call_result : ", result)
             return result
@@ -186,13 +307,14 @@ class OpenAIService:
     #         raise
                 
     async def stream_chat_completion(self, **kwargs):
-        response = ""
-        async for chunk in await self.chat.chat.completions.create(**kwargs, stream=True):
-            content = chunk.choices[0].delta.content
-            if content:
-                response += content
-                print(content, end="", flush=True)
-        return response
+        """ChatOpenAI.astream으로 생성되는 텍스트 조각을 순서대로 yield"""
+        model_key = self.get_model_key(kwargs.get('model'))
+        invoke_params = self._build_invoke_params(**kwargs)
+        async with self.model_router[model_key].lease() as replica:
+            async for chunk in replica.clients["chat"].astream(**invoke_params):
+                if chunk.content:
+                    yield chunk.content
+
     # =====================================================================
     #     # self.client = OpenAI(
     #     #     api_key=openai_config.openai_api_key,
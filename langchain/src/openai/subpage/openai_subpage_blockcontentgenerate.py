@@ -1,17 +1,29 @@
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 import re
 import json
 from src.utils.emmet_parser import EmmetParser
+from src.utils.partial_json import PartialJSONTracker, parse_partial_json
 
 from collections import defaultdict
+from src.utils.request_context import remaining_timeout
+from src.utils.guided_schema import guided_schema_builder
+from src.configs.batch_config import BlockContentConfig
+from src.utils.metrics import track_stage, record_parse_failure, record_repair_fallback
+from src.utils.tracing import traced
+
+# NOTE : landing 페이지와 같은 템플릿(같은 prefix)을 써서 vLLM prefix cache도 함께 재사용
+from src.openai.land.openai_blockcontentgenerator import BLOCK_CONTENT_PROMPT
+
 
 class OpenAIBlockContentGenerator:
-    def __init__(self, output_language, batch_handler):
+    def __init__(self, output_language, batch_handler, block_content_config: BlockContentConfig = None):
         self.output_language = output_language
         self.batch_handler = batch_handler
         self.emmet_parser = EmmetParser()
+        self.block_content_config = block_content_config or BlockContentConfig()
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, extra_body, max_tokens: int = 1000) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
         try:
@@ -28,7 +40,7 @@ class OpenAIBlockContentGenerator:
                     "stream": False,
                     "logprobs": None,
                 }, request_id=0),
-                timeout=120  # 타임아웃 설정
+                timeout=remaining_timeout(120)  # 타임아웃 설정
             )
             return response
         except asyncio.TimeoutError:
@@ -39,155 +51,19 @@ class OpenAIBlockContentGenerator:
             return f"Error: {str(e)}"
         
     def convert_tag_length_to_schema(self, tag_length):
-        properties = {}
-        required = []
-        
-        if isinstance(tag_length, dict):
-            for key, value in tag_length.items():
-                # 리스트인 경우 (li_0, li_1 등 처리)
-                if isinstance(value, list):
-                    for i, item in enumerate(value):
-                        if isinstance(item, dict):
-                            item_properties = {}
-                            item_required = []
-                            new_key = f"{key}_{i}"  # li_0_0, li_0_1, li_1_0 등
-                            for sub_key, sub_value in item.items():
-                                # max_length = round(int(sub_value) * 2.5)  # 넉넉히 설정
-                                # min_length = int(sub_value) // 2  # 예: 최소 절반
-                                item_properties[sub_key] = {
-                                    "type": "string",
-                                    # "maxLength": max_length,
-                                    # "minLength": min_length  # 최소 길이 추가
-                                }
-                                item_required.append(sub_key)
-                            properties[new_key] = {
-                                "type": "array",
-                                "items": {
-                                        "type": "object",
-                                        "properties": item_properties,
-                                        "required": item_required
-                                    },
-                                "minItems": 1,
-                                "maxItems": 1
-                            }
-                            
-                            required.append(new_key)
-                # 딕셔너리인 경우 (중첩 객체)
-                elif isinstance(value, dict):
-                    nested_schema = self.convert_tag_length_to_schema(value)
-                    properties[key] = {
-                        "type": "object",
-                        "properties": nested_schema["properties"],
-                        "required": nested_schema["required"]
-                    }
-                    required.append(key)
-                # 정수나 문자열인 경우 (최대/최소 길이 지정)
-                elif isinstance(value, (int, str)):
-                    # max_length = round(int(value) * 2.5)
-                    # min_length = int(value) // 2  # 예시로 절반 설정
-                    properties[key] = {
-                        "type": "string",
-                        # "maxLength": max_length,
-                        # "minLength": min_length
-                    }
-                    required.append(key)
-                # 기타 타입
-                else:
-                    properties[key] = {"type": "string"}
-                    required.append(key)
-        
-        return {
-            "properties": properties,
-            "required": required
-        }
+        # NOTE : 같은 구조면 항상 같은 schema가 나오도록 공용 builder 사용 (vLLM FSM 재컴파일 방지)
+        return guided_schema_builder.tag_length_schema(tag_length)
 
     def create_extra_body(self, tag_length):
-        schema = self.convert_tag_length_to_schema(tag_length)
-        return {
-            "guided_json": {
-                "type": "object",
-                "properties": schema["properties"],
-                "required": schema["required"]
-            }
-        }
+        return guided_schema_builder.extra_body(tag_length)
 
-    async def generate_tag_structure(self, 
-                                     usr_msg:str, 
-                                     tag_length: dict, 
-                                     extra_body: str, 
-                                     section_context: dict, 
-                                     max_tokens: int = 1000):
-        sys_prompt = f"""
-        
-            You are an AI assistant that generates content for semantic tags based on the provided Section_context. 
-            When given Section_context and json_type_tag_list, read the Section_context first, then create content for each semantic tag key in the json_type_tag_list and replace its value with generated content. 
-            Ensure each tag's content aligns with its purpose while strictly adhering to the maximum character length specified in json_type_tag_list.
-            If user add additional information by "usr_msg", MUST INTEGRATE THAT INFORMATION WITH SECTION_CONTEXT.
-            
-            #### Semantic Tag Definitions ####
-            - h1: The primary title of the web page, summarizing its main topic or purpose (typically one per page).
-            - h2: Major section headings, separating key parts of the page.
-            - h3: Subheadings under h2, detailing specific topics within sections.
-            - h4: Same with h3.
-            - h5: Brief supporting text around h tags, enhancing their meaning.
-            - p: Paragraphs of plain text, only express with narrative sentence.
-            - li: List items are separated into li_0, li_1, li_2, etc., but share a context.        
-            
-            #### Input Format ####
-            - usr_msg= {{usr_msg}}
-            - Section_context= {{section_context}}
-            - json_type_tag_list = {{"tag" : "max_length_CHARACTERS"}}
-            
-            #### Instructions ####
-            1. The results of each tag should be within each max_length_CHARACTERS. The maximum output of each tag must be within 250 characters. If you follow this well, I will give you a tip.
-            2. Format all headings (h tags) as concise phrases rather than complete sentences. For example, use 'Effective Marketing Strategies' instead of 'These are effective marketing strategies.'
-            3. p tag must express with narrative sentence. For example, use '위븐은 누구나 직관적으로 웹사이트를 만들 수 있게하며, 전문가도 활용가능한 기능을 제공합니다.' instead of '1. 위븐에선 직관적 웹사이트 제작 가능 2. 전문가도 활용가능한 기능 제공'
-            4. READ THE SECTION_CONTEXT AND THE MAXIMUM CHARACTER LENGTH, USE THESE AS THE BASIS FOR GENERATING CONTENT FOR EACH TAG IN JSON_TYPE_TAG_LIST.
-            5. FOR EACH KEY IN JSON_TYPE_TAG_LIST, THE VALUE REPRESENTS THE MAXIMUM CHARACTER LENGTH.
-            6. When generating text, be mindful of the max_length_CHARACTERS constraint. Plan your response so that it naturally concludes with a complete sentence well before reaching the token limit. Prioritize concise expression and avoid starting new thoughts or sentences if they might be cut off.
-            7. ENSURE CONTENT IS CONCISE, RELEVANT.
-            8. IF A LIST STRUCTURE EXISTS IN JSON_TYPE_TAG_LIST, IT IS CREATED WITH A SIMILAR FORMAT BUT DIFFERENT CONTENT.
-            9. DO NOT REPEAT THE SAME SENTENCES OR PATTERNS, AND WRITE WITH UNIQUE CONTENT.
-            10. DO NOT INCLUDE MARKDOWN SYMBOLS, ICON and SECTION KEY.
-            11. After drafting your response, verify whether it exceeds the max_length_CHARACTERS constraint. If it does, modify your output to conclude with a natural, complete sentence that falls within the token limit. Avoid truncating mid-sentence or leaving thoughts incomplete.
-
-            #### Output Language ####
-            **{self.output_language}**
-
-            #### Input Example ####
-            Section_context = "재밋은 AI 솔루션을 기반으로 사용자들에게 간단하고 편리하게 웹 사이트를 만들 수 있도록 도와주는 선도 서비스입니다. 기업 '위븐'은 AI 솔루션을 통해 일반인들도 쉽게 접근할 수 있으며, 전문가가 사용해도 무방한 에디터와 스튜디오 서비스를 보유하고 있어서 다방면에 능한 서비스를 갖고 있는 기업입니다."
-            json_type_tag_list = 
-            {{
-                "h1_0": "17",
-                "h2_0": "19",
-                "p_0": "31",
-                "li_0": [
-                    {{"h2_0": "15", "p_0": "40"}},
-                    {{"h2_0": "15", "p_0": "40"}}
-                ],
-                "p_1: "70"
-            }}
-
-            #### Output Example ####
-            {{
-                "h1_0": "AI로 간편하게 만드는 웹사이트",
-                "h2_0": "누구나 쉽게 활용하는 AI 웹 제작",
-                "p_0": "위븐은 다방면에 능한 AI 웹 제작 서비스를 제공합니다.",
-                "li_0_0": [
-                    {{
-                        "h2_0": "AI 웹 제작 혁신",
-                        "p_0": "기업 '위븐'의 AI 솔루션은 누구나 직관적으로 웹사이트를 만들 수 있도록 지원합니다."
-                    }},
-                ],
-                "li_0_1": [
-                    {{
-                        "h2_0": "전문가도 만족하는 기능",
-                        "p_0": "초보자는 물론 전문가도 활용 가능한 강력한 에디터와 스튜디오 기능을 제공합니다."
-                    }},
-                "p_1": "재밋은 AI 기반 웹사이트 제작 솔루션을 제공하는 선도 서비스로, 일반 사용자부터 전문가까지 쉽게 활용할 수 있는 강력한 에디터와 스튜디오 서비스를 갖추고 있습니다."
-            }}        
+    def build_tag_structure_prompt(self, usr_msg: str, tag_length: dict, section_context: dict):
+        """generate_tag_structure / generate_content_stream 에서 같이 쓰는 프롬프트 생성
 
+        Returns:
+            tuple: (sys_prompt, usr_prompt)
         """
+        sys_prompt = BLOCK_CONTENT_PROMPT.render(output_language=self.output_language)
 
         # Test용 ==========
         # #### Instructions ####
@@ -244,7 +120,15 @@ class OpenAIBlockContentGenerator:
             Section_context= {section_context.keys()}, {str_section_context_value[:500]}
             json_type_tag_list= {tag_length}
         """
-        
+        return sys_prompt, usr_prompt
+
+    async def generate_tag_structure(self, 
+                                     usr_msg:str, 
+                                     tag_length: dict, 
+                                     extra_body: str, 
+                                     section_context: dict, 
+                                     max_tokens: int = 1000):
+        sys_prompt, usr_prompt = self.build_tag_structure_prompt(usr_msg, tag_length, section_context)
         extra_body = self.create_extra_body(tag_length)
 
         result = await self.send_request(
@@ -260,6 +144,7 @@ class OpenAIBlockContentGenerator:
 #         async with semaphore:
 #             return await coro
 
+    @track_stage("content")
     async def generate_content(
         self,
         usr_msg:str,
@@ -289,6 +174,7 @@ class OpenAIBlockContentGenerator:
                 parsed_data = json.loads(json_string)
             except json.JSONDecodeError as e:
                 print(f"JSON 파싱 에러: {e}, Raw: {json_string}")
+                record_parse_failure()
                 # 보정 로직
                 stripped_json = json_string.strip()
                 if stripped_json.endswith('"'):
@@ -312,20 +198,10 @@ class OpenAIBlockContentGenerator:
                         parsed_data = json.loads(fixed_json)
                     except json.JSONDecodeError:
                         return {'gen_content': {'error': f"JSON 보정 실패: {json_string}"}}
-
-            # 리스트 그룹핑
-            li_groups = defaultdict(list)
-            for key, value in parsed_data.items():
-                if key.startswith('li_'):
-                    group_key = '_'.join(key.split('_')[:2])
-                    li_groups[group_key].extend(value)
-
-            # transformed_data 생성
-            transformed_data = {key: value for key, value in parsed_data.items() if not key.startswith('li_')}
-            transformed_data.update(li_groups)
+                record_repair_fallback("json_fix")
 
             # response 업데이트
-            response.data['generations'][0][0]['text'] = transformed_data
+            response.data['generations'][0][0]['text'] = self.transform_content(parsed_data)
             
             return {
                 'gen_content': {
@@ -337,6 +213,229 @@ class OpenAIBlockContentGenerator:
         except Exception as e:
             return {'gen_content': {'error': f"Unexpected error: {str(e)}"}}
         
+    @track_stage("content")
+    async def generate_page_content(
+        self,
+        usr_msg: str,
+        sections: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+        max_tokens: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """페이지 모드: 여러 섹션의 컨텐츠를 guided_json 1회 호출로 생성
+
+        시스템 프롬프트와 usr_msg를 섹션마다 반복하지 않도록 섹션별 tag_length schema를
+        section_1, section_2, ... 키로 묶은 schema 1개로 요청한다.
+        prompt + 예상 출력 토큰이 max_model_len을 넘으면 섹션 묶음을 반으로 나눠서 동시에 호출하고,
+        결과에서 빠진 섹션은 generate_content로 다시 생성한다.
+
+        Args:
+            usr_msg: 모든 섹션에 같이 들어가는 사용자 메시지
+            sections: [(tag_length, section_context), ...]
+            max_tokens: 섹션 1개당 max_tokens
+
+        Returns:
+            list: sections와 같은 순서의 generate_content 결과
+        """
+        groups = self.split_page_sections(usr_msg, list(enumerate(sections)), max_tokens)
+        group_results = await asyncio.gather(*(
+            self.generate_page_group(usr_msg, group, max_tokens) for group in groups
+        ))
+
+        results = [None] * len(sections)
+        for group, group_result in zip(groups, group_results):
+            for (index, _), result in zip(group, group_result):
+                results[index] = result
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            record_repair_fallback("per_section")
+            fallback = await asyncio.gather(*(
+                self.generate_content(usr_msg, sections[index][0], sections[index][1], max_tokens=max_tokens)
+                for index in missing
+            ))
+            for index, result in zip(missing, fallback):
+                results[index] = result
+        return results
+
+    def build_page_prompt(self, usr_msg: str, group: List[Tuple[int, Tuple[Dict[str, Any], Dict[str, Any]]]]):
+        """페이지 모드 프롬프트와 section_n 키로 묶은 guided_json 생성
+
+        Returns:
+            tuple: (sys_prompt, usr_prompt, extra_body)
+        """
+        sys_prompt = BLOCK_CONTENT_PROMPT.render(output_language=self.output_language)
+        if not usr_msg:
+            usr_msg = "NONE"
+
+        section_prompts = []
+        properties = {}
+        for n, (_, (tag_length, section_context)) in enumerate(group, start=1):
+            str_section_context_value = str(section_context.values())
+            section_prompts.append(f"""
+            section_{n}
+            Section_context= {section_context.keys()}, {str_section_context_value[:500]}
+            json_type_tag_list= {tag_length}
+            """)
+            schema = self.convert_tag_length_to_schema(tag_length)
+            properties[f"section_{n}"] = {
+                "type": "object",
+                "properties": schema["properties"],
+                "required": schema["required"]
+            }
+
+        usr_prompt = f"""
+
+            usr_msg= {usr_msg}
+
+            Generate the json_type_tag_list of EVERY section below and return them under its section key (section_1, section_2, ...).
+            {"".join(section_prompts)}
+        """
+        extra_body = {
+            "guided_json": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties.keys())
+            }
+        }
+        return sys_prompt, usr_prompt, extra_body
+
+    def estimate_output_tokens(self, tag_length: Any) -> int:
+        """tag_length의 최대 글자 수 합으로 출력 토큰 수 추정 (태그마다 JSON 키/따옴표 여유분 포함)"""
+        if isinstance(tag_length, dict):
+            return sum(self.estimate_output_tokens(value) + 8 for value in tag_length.values())
+        if isinstance(tag_length, list):
+            return sum(self.estimate_output_tokens(item) for item in tag_length)
+        try:
+            return int(int(tag_length) * self.block_content_config.tokens_per_char)
+        except (TypeError, ValueError):
+            return 0
+
+    def estimate_page_tokens(self, usr_msg: str, group) -> Tuple[int, int]:
+        """(prompt 토큰 추정치, 출력 토큰 추정치)"""
+        sys_prompt, usr_prompt, _ = self.build_page_prompt(usr_msg, group)
+        prompt_tokens = int(len(sys_prompt + usr_prompt) / self.block_content_config.chars_per_prompt_token)
+        output_tokens = sum(self.estimate_output_tokens(tag_length) for _, (tag_length, _) in group)
+        return prompt_tokens, output_tokens
+
+    def split_page_sections(self, usr_msg: str, group, max_tokens: int = 1000) -> list:
+        """max_model_len 안에 들어갈 때까지 섹션 묶음을 반으로 나눔"""
+        if len(group) <= 1:
+            return [group]
+        prompt_tokens, output_tokens = self.estimate_page_tokens(usr_msg, group)
+        if prompt_tokens + min(output_tokens, max_tokens * len(group)) <= self.block_content_config.max_model_len:
+            return [group]
+        middle = len(group) // 2
+        return (self.split_page_sections(usr_msg, group[:middle], max_tokens)
+                + self.split_page_sections(usr_msg, group[middle:], max_tokens))
+
+    async def generate_page_group(self, usr_msg: str, group, max_tokens: int = 1000) -> List[Any]:
+        """섹션 묶음 1개를 1회 호출로 생성 (생성하지 못한 섹션은 None)"""
+        if len(group) == 1:
+            _, (tag_length, section_context) = group[0]
+            return [await self.generate_content(usr_msg, tag_length, section_context, max_tokens=max_tokens)]
+
+        sys_prompt, usr_prompt, extra_body = self.build_page_prompt(usr_msg, group)
+        prompt_tokens, _ = self.estimate_page_tokens(usr_msg, group)
+        response = await self.send_request(
+            sys_prompt=sys_prompt,
+            usr_prompt=usr_prompt,
+            max_tokens=max(1, min(max_tokens * len(group), self.block_content_config.max_model_len - prompt_tokens)),
+            extra_body=extra_body
+        )
+        try:
+            parsed_data = parse_partial_json(response.data['generations'][0][0]['text'])
+        except Exception as e:
+            print(f"[ERROR] Page content generation failed: {str(e)}")
+            record_parse_failure()
+            parsed_data = None
+        if not isinstance(parsed_data, dict):
+            return [None] * len(group)
+
+        results = []
+        for n, (_, (tag_length, _)) in enumerate(group, start=1):
+            section_data = parsed_data.get(f"section_{n}")
+            # 출력이 잘려서 태그가 빠진 섹션은 다시 생성
+            required = self.convert_tag_length_to_schema(tag_length)["required"]
+            if isinstance(section_data, dict) and all(key in section_data for key in required):
+                results.append({
+                    'gen_content': {
+                        'data': {
+                            'generations': [[{'text': self.transform_content(section_data)}]]
+                        }
+                    }
+                })
+            else:
+                results.append(None)
+        return results
+
+    def transform_content(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """li_0_0, li_0_1 처럼 나뉘어 생성된 리스트를 li_0 으로 묶음"""
+        # 리스트 그룹핑
+        li_groups = defaultdict(list)
+        for key, value in parsed_data.items():
+            if key.startswith('li_'):
+                group_key = '_'.join(key.split('_')[:2])
+                li_groups[group_key].extend(value)
+
+        # transformed_data 생성
+        transformed_data = {key: value for key, value in parsed_data.items() if not key.startswith('li_')}
+        transformed_data.update(li_groups)
+        return transformed_data
+
+    async def stream_request(self, sys_prompt: str, usr_prompt: str, extra_body, max_tokens: int = 1000):
+        """send_request의 스트리밍 버전 (생성되는 텍스트 조각을 yield)"""
+        model = "/usr/local/bin/models/gemma-3-4b-it"
+        async for chunk in self.batch_handler.stream_single_request({
+            "model": model,
+            "sys_prompt": sys_prompt,
+            "usr_prompt": usr_prompt,
+            "extra_body": extra_body,
+            "max_tokens": max_tokens,
+            "temperature": 0.2,  # 안정성 우선
+            "top_p": 0.4,
+            "n": 1,
+            "stream": True,
+            "logprobs": None,
+        }, request_id=0):
+            yield chunk
+
+    async def generate_content_stream(
+        self,
+        usr_msg: str,
+        tag_length: Dict[str, Any],
+        section_context: Dict[str, Any],
+        max_tokens: int = 1000
+    ):
+        """generate_content의 스트리밍 버전
+
+        Yields:
+            ("tag", {tag: 지금까지 생성된 값}) : 값이 바뀐 태그가 있을 때마다
+            ("content", generate_content와 같은 형식의 최종 결과) : 마지막 1회
+        """
+        sys_prompt, usr_prompt = self.build_tag_structure_prompt(usr_msg, tag_length, section_context)
+        extra_body = self.create_extra_body(tag_length=tag_length)
+
+        tracker = PartialJSONTracker()
+        try:
+            async for chunk in self.stream_request(sys_prompt, usr_prompt, extra_body, max_tokens):
+                changed = tracker.feed(chunk)
+                if changed:
+                    yield "tag", changed
+        except Exception as e:
+            yield "content", {'gen_content': {'error': f"Unexpected error: {str(e)}"}}
+            return
+
+        parsed_data = parse_partial_json(tracker.text)
+        if not isinstance(parsed_data, dict):
+            yield "content", {'gen_content': {'error': f"JSON 보정 실패: {tracker.text}"}}
+            return
+        yield "content", {
+            'gen_content': {
+                'data': {
+                    'generations': [[{'text': self.transform_content(parsed_data)}]]
+                }
+            }
+        }
+
     def assign_content(self, result: Dict[str, Any], content: str, key_path: str):
         """
         key_path를 기반으로 생성된 텍스트를 결과 구조 내에 할당합니다.
@@ -1,7 +1,14 @@
 import json
 import re
 import asyncio
+import logging
 from src.utils.batch_handler import BatchRequestHandler
+from src.configs.batch_config import SectionGenerateConfig
+from src.utils.request_context import remaining_timeout
+from src.utils.metrics import track_stage, record_parse_failure, record_repair_fallback
+from src.utils.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 
 class OpenAISectionStructureGenerator:
@@ -15,6 +22,7 @@ class OpenAISectionStructureGenerator:
         self.extra_body = extra_body
         
     # async def send_request(self, prompt: str, max_tokens: int = 200) -> str:
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 200, extra_body: dict = None) -> str:
         if extra_body is None:
             extra_body = self.extra_body
@@ -33,10 +41,11 @@ class OpenAISectionStructureGenerator:
                 "stream": False,
                 "logprobs": None
             }, request_id=0),
-            timeout=300  # 적절한 타임아웃 값 설정
+            timeout=remaining_timeout(300)  # 적절한 타임아웃 값 설정
         )
         return response
     
+    @track_stage("structure")
     async def create_section_structure(self, final_summary_data: str, max_tokens: int = 200):
 
         sys_prompt = f"""
@@ -87,6 +96,7 @@ class OpenAISectionContentGenerator:
         self.output_language = output_language
         self.batch_handler = batch_handler
     
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 300) -> str:
     # async def send_request(self, prompt: str, max_tokens: int = 300) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
@@ -103,7 +113,7 @@ class OpenAISectionContentGenerator:
                 "stream": False,
                 "logprobs": None
             }, request_id=0),
-            timeout=120  # 적절한 타임아웃 값 설정
+            timeout=remaining_timeout(120)  # 적절한 타임아웃 값 설정
         )
         return response
     
@@ -176,8 +186,15 @@ class OpenAISectionGenerator:
         self.structure_generator = OpenAISectionStructureGenerator(batch_handler)
         # self.content_generator = OpenAISectionContentGenerator(output_language, batch_handler)
         
-    async def generate_subpage(self, requests, max_tokens: int = 200):
-        results = []
+    async def generate_subpage(self, requests, max_tokens: int = 200, max_concurrency: int = None):
+        """요청들을 최대 max_concurrency개까지 동시에 처리
+
+        max_concurrency를 지정하지 않으면 SECTION_GENERATE_CONCURRENCY,
+        그것도 없으면 gemma 서버의 AIMD 동시 실행 limit 현재값을 사용한다.
+
+        Returns:
+            list: requests와 같은 순서의 결과 (실패한 요청은 {"error": 에러 메시지})
+        """
         extra_body = {
             "guided_json": {
                 "type": "object",
@@ -197,11 +214,24 @@ class OpenAISectionGenerator:
         }
         
         self.structure_generator.set_extra_body(extra_body)
-        for req in requests:
+        if max_concurrency is None:
+            max_concurrency = SectionGenerateConfig.max_concurrency or \
+                self.batch_handler.current_concurrency_limit("/usr/local/bin/models/gemma-3-4b-it")
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def generate(index, req):
+            async with semaphore:
+                try:
+                    result = await self.generate_section(req.sub_context, max_tokens)
+                except Exception as e:
+                    # 한 요청이 실패해도 나머지 요청 결과는 그대로 반환 (/api/landing_pipeline 과 같은 에러 형식)
+                    logger.error(f"Error in generate_subpage request {index}: {str(e)}", exc_info=True)
+                    return {"error": str(e)}
+                if result is None:
+                    return {"error": "Section structure generation failed"}
+                return result
 
-            section_data = await self.generate_section(req.sub_context, max_tokens)
-            results.append(section_data)
-        return results
+        return await asyncio.gather(*(generate(index, req) for index, req in enumerate(requests)))
 
     # NOTE : merged된 데이터가 들어오면서 기존 2개를 합치던 방식이 1개로 바뀜
     async def generate_section(self, sub_context: str, max_tokens: int = 200):
@@ -267,6 +297,7 @@ class OpenAISectionGenerator:
             if json_str:
                 json_str = json_str.group() + '}'
             else:
+                record_parse_failure("structure")
                 return None
 
         # Balance braces if necessary
@@ -278,8 +309,11 @@ class OpenAISectionGenerator:
         try:
             return json.loads(json_str)
         except json.JSONDecodeError:
+            record_parse_failure("structure")
             # Try a more lenient parsing approach
             try:
-                return json.loads(json_str.replace("'", '"'))
+                parsed = json.loads(json_str.replace("'", '"'))
             except json.JSONDecodeError:
-                return None
\ No newline at end of file
+                return None
+            record_repair_fallback("quote_fix", "structure")
+            return parsed
\ No newline at end of file
@@ -1,11 +1,15 @@
 import asyncio
 from langchain.prompts import PromptTemplate
+from src.utils.request_context import remaining_timeout
+from src.utils.metrics import track_stage
+from src.utils.tracing import traced
 
 class OpenAIUsrMsgProposalGenerator:
     def __init__(self, output_language, batch_handler):
         self.output_language = output_language
         self.batch_handler = batch_handler
 
+    @traced()
     async def send_request(self, sys_prompt: str, usr_prompt: str, max_tokens: int = 500) -> str:
         model = "/usr/local/bin/models/gemma-3-4b-it"
         try:
@@ -23,7 +27,7 @@ class OpenAIUsrMsgProposalGenerator:
                     "stream": False,
                     "logprobs": None,
                 }, request_id=0),
-                timeout=120  # 타임아웃 설정
+                timeout=remaining_timeout(120)  # 타임아웃 설정
             )
             return response
         except asyncio.TimeoutError:
@@ -34,6 +38,7 @@ class OpenAIUsrMsgProposalGenerator:
             return f"Error: {str(e)}"
 
 
+    @track_stage("proposal")
     async def usr_msg_proposal(self, subpage_n_prompt, main_context, max_tokens: int = 500) -> dict:
         try:
             subpage = ""
@@ -2,9 +2,17 @@
 from dataclasses import dataclass
 import asyncio
 import time
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Optional
 from asyncio import TimeoutError
 from src.openai.openai_api_call import OpenAIService
+from src.configs.batch_config import RateLimitConfig, ConcurrencyConfig, ResponseCacheConfig
+from src.utils.rate_limiter import ModelRateLimiter
+from src.utils.concurrency_limiter import ModelConcurrencyLimiter, is_overload_error
+from src.utils.response_cache import ResponseCache, make_request_key
+from src.utils.single_flight import SingleFlight
+from src.utils.metrics import observe_queue_wait
+from src.utils.tracing import tracer, traced, current_span
+from src.utils.request_context import remaining_timeout, get_priority, get_tenant, DeadlineExceeded
 from datetime import datetime
 import logging
 
@@ -12,81 +20,281 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(init=False)
 class RequestResult:
+    """LLM 호출 1건의 결과
+
+    요청마다 수천 개씩 만들어지므로 __slots__로 인스턴스 dict를 없앤다.
+    (dataclass라서 FastAPI jsonable_encoder / copy.deepcopy는 그대로 동작)
+    """
+    __slots__ = ("success", "data", "error", "error_details")
     success: bool
-    data: Any = None
-    error: str = None
-    error_details: Dict = None
+    data: Any
+    error: Optional[str]
+    error_details: Optional[Dict]
+
+    def __init__(self, success: bool, data: Any = None, error: str = None, error_details: Dict = None):
+        self.success = success
+        self.data = data
+        self.error = error
+        self.error_details = error_details
+
+    @property
+    def text(self) -> Any:
+        """generations가 1개뿐이면 그 text (아니면 None)"""
+        try:
+            generations = self.data['generations']
+            if len(generations) == 1 and len(generations[0]) == 1:
+                return generations[0][0]['text']
+        except (TypeError, KeyError, IndexError):
+            pass
+        return None
+
+    def to_dict(self, compact: bool = False) -> Dict[str, Any]:
+        """응답용 dict
+
+        Args:
+            compact: True면 {"generations": [[{"text": ...}]]} 대신 "text"만, 실패 시 에러 종류만 담음
+        """
+        if not compact:
+            return {
+                "success": self.success,
+                "data": self.data if self.success else None,
+                "error": self.error,
+                "error_details": self.error_details
+            }
+        if not self.success:
+            return {
+                "success": False,
+                "error": self.error,
+                "error_type": (self.error_details or {}).get("type")
+            }
+        text = self.text
+        if text is not None:
+            return {"success": True, "text": text}
+        return {"success": True, "data": self.data}
 
 class BatchRequestHandler:
     def __init__(self, openai_service: OpenAIService, 
                  max_concurrent_requests: int = 50,
                  request_timeout: int = 240,
-                 requests_per_second: float = 20):  # 초당 요청 수 제한
+                 requests_per_second: float = 20,  # 설정에 없는 모델의 초당 요청 수 제한
+                 rate_limits: Dict[str, Dict[str, float]] = None,  # model_key 별 {"rate", "burst"}
+                 concurrency_limits: Dict[str, Dict[str, Any]] = None,  # model_key 별 AdaptiveConcurrencyLimiter 인자
+                 response_cache: ResponseCache = None,
+                 cache_config: ResponseCacheConfig = None):
         self.openai_service = openai_service
-        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self.max_concurrent_requests = max_concurrent_requests
         self.request_timeout = request_timeout
         self.requests_per_second = requests_per_second
-        self.last_request_time = None  # 마지막 요청 시간
+        # 모델(vLLM 서버) 별 토큰 버킷
+        self.rate_limiter = ModelRateLimiter(
+            limits=rate_limits if rate_limits is not None else RateLimitConfig().as_dict(),
+            default_rate=requests_per_second,
+            default_burst=max(1, int(requests_per_second))
+        )
+        # 모델(vLLM 서버) 별 적응형 동시 실행 제한 - 고정 Semaphore 대신 GPU 부하에 맞춰 조절
+        self.concurrency_limiter = ModelConcurrencyLimiter(
+            limits=concurrency_limits if concurrency_limits is not None
+            else ConcurrencyConfig(max_limit=max_concurrent_requests).as_dict(),
+            default_limits={
+                "initial_limit": min(10, max_concurrent_requests),
+                "max_limit": max_concurrent_requests
+            }
+        )
+
+        # 결정적인 단계(낮은 temperature, guided enum)의 응답 캐시
+        cache_config = cache_config or ResponseCacheConfig()
+        self.cache_max_temperature = cache_config.max_temperature
+        if response_cache is None and cache_config.enabled:
+            redis_client = None
+            if cache_config.redis_enabled:
+                from common.redis_client import redis_client
+            response_cache = ResponseCache(
+                max_size=cache_config.max_size,
+                ttl=cache_config.ttl,
+                redis_client=redis_client,
+                redis_ttl=cache_config.redis_ttl
+            )
+        self.response_cache = response_cache
+        # 같은 요청이 진행 중이면 GPU에 다시 보내지 않고 결과를 공유
+        self.single_flight = SingleFlight()
+
+    @staticmethod
+    def get_completion_tokens(response, default: int = 1) -> int:
+        """응답에서 생성된 토큰 수를 꺼냄 (없으면 default)"""
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage.get("output_tokens"):
+            return usage["output_tokens"]
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        return token_usage.get("completion_tokens") or default
+
+    def get_status(self) -> dict:
+        """모니터링용 핸들러 상태"""
+        status = {
+            "rate_limiter": self.rate_limiter.snapshot(),
+            "concurrency_limiter": self.concurrency_limiter.snapshot()
+        }
+        status["single_flight"] = self.single_flight.snapshot()
+        if self.response_cache is not None:
+            status["response_cache"] = self.response_cache.snapshot()
+        micro_batcher = getattr(self.openai_service, "micro_batcher", None)
+        if micro_batcher is not None:
+            status["micro_batcher"] = micro_batcher.snapshot()
+        if hasattr(self.openai_service, "get_pool_status"):
+            status["replica_pools"] = self.openai_service.get_pool_status()
+        return status
 
+    def current_concurrency_limit(self, model: str = None) -> int:
+        """model 서버의 AIMD 동시 실행 limit 현재값"""
+        return self.concurrency_limiter.limiter(self.openai_service.get_model_key(model)).current_limit
+
+    def is_reusable(self, request: Dict[str, Any], flag: bool = None) -> bool:
+        """같은 요청의 결과를 재사용해도 되는지
+
+        flag를 지정하지 않으면 temperature를 명시한 결정적인 호출(기본값: temperature <= 0)만 재사용한다.
+        temperature가 없으면 서버 기본값(1.0)으로 sampling되므로 재사용하지 않는다.
+        생성 단계에서 재사용이 필요하면 요청에 cache: True를 지정한다.
+        """
+        if request.get("stream"):
+            return False
+        if flag is not None:
+            return flag
+        temperature = request.get("temperature")
+        return temperature is not None and temperature <= self.cache_max_temperature
+
+    @traced()
     async def process_single_request(self, request: Dict[str, Any],
                                    request_id: int) -> RequestResult:
         """단일 요청을 처리하는 메서드
         
         Args:
             request: 요청 데이터 (max_tokens 포함 가능)
+                cache (bool, optional): True면 항상 캐시, False면 캐시 사용 안 함
+                    (지정하지 않으면 temperature <= RESPONSE_CACHE_MAX_TEMPERATURE 일 때만 캐시)
+                dedup (bool, optional): 진행 중인 같은 요청과 결과를 공유할지 여부 (기본값은 cache와 같음)
+                priority (str, optional): interactive / default / bulk (지정하지 않으면 엔드포인트에서 정한 값)
+                tenant (str, optional): 동시 실행 슬롯을 공정하게 나눌 단위 (Completions.user)
             request_id: 요청 ID
         
         Returns:
             RequestResult: 처리 결과
         """
+        request = dict(request)
+        cache = request.pop("cache", None)
+        dedup = request.pop("dedup", None)
+        priority = request.pop("priority", None) or get_priority()
+        tenant = request.pop("tenant", None) or get_tenant()
+        use_cache = self.response_cache is not None and self.is_reusable(request, cache)
+        use_dedup = self.is_reusable(request, cache if dedup is None else dedup)
+        span = current_span()
+        span.set_attribute("priority", priority or "default")
+        span.set_attribute("cache", use_cache)
+        span.set_attribute("dedup", use_dedup)
+        if not use_cache and not use_dedup:
+            return await self._execute_request(request, request_id, priority, tenant)
+
+        request_key = make_request_key(request)
+        if use_cache:
+            cached = await self.response_cache.get(request_key)
+            if cached is not None:
+                span.set_attribute("cache_hit", True)
+                return RequestResult(success=True, data=cached)
+
+        async def execute() -> RequestResult:
+            result = await self._execute_request(request, request_id, priority, tenant)
+            if use_cache and result.success:
+                await self.response_cache.set(request_key, result.data)
+            return result
+
+        if use_dedup:
+            # priority class가 다른 요청끼리는 묶지 않음 (bulk 요청의 슬롯 대기를 interactive 요청이 떠안지 않도록)
+            try:
+                return await self.single_flight.do(f"{priority or 'default'}:{request_key}", execute)
+            except DeadlineExceeded as e:
+                return RequestResult(
+                    success=False,
+                    error=str(e),
+                    error_details={"type": "deadline_exceeded"}
+                )
+        return await execute()
+
+    async def _execute_request(self, request: Dict[str, Any], request_id: int,
+                               priority: str = None, tenant: str = None) -> RequestResult:
+        """rate limit / 동시 실행 제한을 거쳐 실제로 vLLM을 호출"""
         try:
             # logger.debug(f"Processing request {request_id}: {request}")
             max_tokens = request.get("max_tokens", "default")  # 디버깅용으로 max_tokens 확인
             extra_body = request.get("extra_body", {})  # 기본값으로 
+            model_key = self.openai_service.get_model_key(request.get("model"))
+            current_span().set_attribute("model", model_key)
 
-            # 로그 메시지 수정: 두 번째 로그 메시지의 변수명 수정
-            async with self.semaphore:
-                # Rate limiting - wait if needed
-                now = time.time()
-                if self.last_request_time is not None:
-                    time_since_last = now - self.last_request_time
-                    min_interval = 1.0 / self.requests_per_second  # 요청 간 최소 간격
-                    if time_since_last < min_interval:
-                        await asyncio.sleep(min_interval - time_since_last)
-
-                self.last_request_time = time.time()
-                
+            # 요청 budget을 이미 다 쓴 경우 GPU에 보내지 않음
+            if remaining_timeout(self.request_timeout) <= 0:
+                return RequestResult(
+                    success=False,
+                    error="Request deadline exceeded before dispatch",
+                    error_details={"type": "deadline_exceeded"}
+                )
+
+            # Rate limiting - 모델별 토큰 버킷에서 토큰을 받은 뒤에 동시 실행 슬롯 확보
+            queue_span = tracer.start_span("queue_wait")
+            queued_at = time.monotonic()
+            await self.rate_limiter.acquire(model_key)
+
+            async with self.concurrency_limiter.slot(model_key, priority, tenant) as slot:
+                queue_span.end()
+                observe_queue_wait(model_key, priority, time.monotonic() - queued_at)
+                # 대기하는 동안 줄어든 budget 기준으로 이번 호출의 타임아웃 결정
+                timeout = remaining_timeout(self.request_timeout)
+                # 실제 생성 길이를 모르면 max_tokens를 토큰당 지연 계산에 사용
+                slot.tokens = max_tokens if isinstance(max_tokens, int) else 1
                 # Execute request with timeout
+                backend_span = tracer.start_span("backend")
                 try:
                     if 'sys_prompt' in request or 'usr_prompt' in request:
-                        response = await self.openai_service.chat_completions(**request)  # 단일 결과 반환
+                        response = await asyncio.wait_for(
+                            self.openai_service.chat_completions(**request),  # 단일 결과 반환
+                            timeout=timeout
+                        )
+                        slot.tokens = self.get_completion_tokens(response, slot.tokens)
                         return RequestResult(
                             success=True,
                             data={'generations': [[{'text': response.content}]]}
                         )
                     elif 'messages' in request:
-                        response = await self.openai_service.chat_completions(**request)  # 단일 결과 반환
+                        response = await asyncio.wait_for(
+                            self.openai_service.chat_completions(**request),  # 단일 결과 반환
+                            timeout=timeout
+                        )
+                        slot.tokens = self.get_completion_tokens(response, slot.tokens)
                         return RequestResult(
                             success=True,
-                            data={'choices': [{'message': {'content': response}}]}
+                            data={'choices': [{'message': {'content': response.content}}]}
                         )
                     else:
                         response = await asyncio.wait_for(
                             self.openai_service.completions(**request),
-                            timeout=self.request_timeout
+                            timeout=timeout
                         )
                         return RequestResult(success=True, data=response)
 
-                except TimeoutError:
+                except TimeoutError as e:
+                    backend_span.record_error(e)
+                    # 요청 budget 때문에 짧아진 타임아웃은 서버 과부하 신호로 보지 않음
+                    slot.dropped = timeout >= self.request_timeout
+                    slot.ignored = not slot.dropped
                     return RequestResult(
                         success=False,
-                        error=f"Request timed out after {self.request_timeout}s",
+                        error=f"Request timed out after {timeout:.1f}s",
                         error_details={"type": "timeout"}
                     )
                 except Exception as e:
                     logger.error(f"Request {request_id} failed with error: {str(e)}")
+                    backend_span.record_error(e)
+                    # 잘못된 요청 등 서버 부하와 무관한 에러는 limit 계산에서 제외
+                    slot.dropped = is_overload_error(e)
+                    slot.ignored = not slot.dropped
                     return RequestResult(
                         success=False,
                         error=str(e),
@@ -95,6 +303,8 @@ class BatchRequestHandler:
                             "args": getattr(e, 'args', None)
                         }
                     )
+                finally:
+                    backend_span.end()
         except Exception as e:
             logger.error(f"Unexpected error in request {request_id}: {str(e)}")
             return RequestResult(
@@ -107,7 +317,63 @@ class BatchRequestHandler:
                 }
             )
 
-    async def process_batch(self, requests: list) -> dict:
+    async def stream_single_request(self, request: Dict[str, Any], request_id: int):
+        """단일 요청을 스트리밍으로 처리 (생성되는 텍스트 조각을 yield)
+
+        process_single_request와 같은 rate limit / 동시 실행 슬롯을 스트림이 끝날 때까지 잡고 있는다.
+        캐시와 single-flight는 사용하지 않는다. 에러는 호출한 쪽으로 그대로 전달된다.
+
+        Args:
+            request: 요청 데이터 (sys_prompt / usr_prompt 필수)
+            request_id: 요청 ID
+        """
+        request = dict(request)
+        request.pop("cache", None)
+        request.pop("dedup", None)
+        priority = request.pop("priority", None) or get_priority()
+        tenant = request.pop("tenant", None) or get_tenant()
+        model_key = self.openai_service.get_model_key(request.get("model"))
+
+        # async generator 안에서는 contextvar를 바꾸지 않도록 span을 직접 열고 닫음
+        queue_span = tracer.start_span("queue_wait", model=model_key)
+        queued_at = time.monotonic()
+        await self.rate_limiter.acquire(model_key)
+
+        async with self.concurrency_limiter.slot(model_key, priority, tenant) as slot:
+            queue_span.end()
+            observe_queue_wait(model_key, priority, time.monotonic() - queued_at)
+            backend_span = tracer.start_span("backend_stream", model=model_key)
+            slot.tokens = 0
+            stream = self.openai_service.stream_chat_completion(**request)
+            deadline = time.monotonic() + remaining_timeout(self.request_timeout)
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            stream.__anext__(),
+                            timeout=max(0, deadline - time.monotonic())
+                        )
+                    except StopAsyncIteration:
+                        break
+                    slot.tokens += 1
+                    yield chunk
+            except TimeoutError as e:
+                slot.dropped = True
+                backend_span.record_error(e)
+                logger.error(f"Stream {request_id} timed out")
+                raise
+            except Exception as e:
+                logger.error(f"Stream {request_id} failed with error: {str(e)}")
+                slot.dropped = is_overload_error(e)
+                backend_span.record_error(e)
+                raise
+            finally:
+                backend_span.set_attribute("chunks", slot.tokens)
+                backend_span.end()
+                slot.tokens = max(1, slot.tokens)
+                await stream.aclose()
+
+    async def process_batch(self, requests: list, compact: bool = False) -> dict:
         if not requests:
             return {
                 "error": "No requests provided",
@@ -125,21 +391,13 @@ class BatchRequestHandler:
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Prepare detailed response
+        items = [self.batch_item(idx, result, compact) for idx, result in enumerate(results)]
         response = {
             "timestamp": datetime.utcnow().isoformat(),
             "total_requests": len(requests),
-            "successful_requests": sum(1 for r in results if getattr(r, 'success', False)),
-            "failed_requests": sum(1 for r in results if not getattr(r, 'success', False)),
-            "results": [
-                {
-                    "request_id": idx,
-                    "success": getattr(result, 'success', False),
-                    "data": result.data if getattr(result, 'success', False) else None,
-                    "error": result.error if hasattr(result, 'error') else str(result),
-                    "error_details": result.error_details if hasattr(result, 'error_details') else None
-                }
-                for idx, result in enumerate(results)
-            ]
+            "successful_requests": sum(1 for item in items if item["success"]),
+            "failed_requests": sum(1 for item in items if not item["success"]),
+            "results": items
         }
         
         # 디버깅을 위한 상세 로그
@@ -154,4 +412,32 @@ class BatchRequestHandler:
             ])
             logger.error(f"All requests failed. Errors:\n{error_summary}")
             
-        return response
\ No newline at end of file
+        return response
+
+    async def iter_batch(self, requests: list, compact: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """process_batch의 스트리밍 버전: 끝나는 순서대로 항목을 yield (request_id로 순서 확인)"""
+        async def run(idx, req):
+            try:
+                return idx, await self.process_single_request(req, idx)
+            except Exception as e:
+                return idx, e
+
+        tasks = [asyncio.ensure_future(run(idx, req)) for idx, req in enumerate(requests)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                idx, result = await next_done
+                yield self.batch_item(idx, result, compact)
+        finally:
+            # 소비하는 쪽이 중간에 멈추면(연결 종료 등) 남은 요청 취소
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def batch_item(idx: int, result: Any, compact: bool = False) -> Dict[str, Any]:
+        """process_batch / iter_batch 결과 항목 1개"""
+        if not isinstance(result, RequestResult):
+            # gather에서 넘어온 예외
+            result = RequestResult(success=False, error=str(result),
+                                   error_details={"type": type(result).__name__})
+        return {"request_id": idx, **result.to_dict(compact)}
@@ -0,0 +1,248 @@
+# src/utils/block_catalog.py
+import asyncio
+import copy
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import orjson
+
+from src.configs.batch_config import BlockCatalogConfig
+
+logger = logging.getLogger(__name__)
+
+# 스냅샷 형식이 바뀌면 올려서 이전 스냅샷을 무시
+SNAPSHOT_VERSION = 2
+
+
+class BlockCatalogData:
+    """엑셀 1회 로드 결과 (인덱스 / 파싱된 tag_length / guided_json enum)"""
+
+    def __init__(self, source_mtime_ns: int, source_size: int,
+                 block_ids_by_tag: Dict[str, List[Any]],
+                 tag_lengths: Dict[Any, Any]):
+        self.source_mtime_ns = source_mtime_ns
+        self.source_size = source_size
+        self.block_ids_by_tag = block_ids_by_tag
+        self.tag_lengths = tag_lengths
+        # converted_html_tag 목록 (엑셀 순서, 중복 제거)
+        self.tags = list(block_ids_by_tag.keys())
+
+    @classmethod
+    def from_excel(cls, path: str, stat: os.stat_result) -> "BlockCatalogData":
+        import pandas as pd
+
+        dataframe = pd.read_excel(path, index_col=0)
+        block_ids_by_tag: Dict[str, List[Any]] = {}
+        tag_lengths: Dict[Any, Any] = {}
+        # index.tolist()와 같이 파이썬 기본 타입으로 변환 (numpy int64는 JSON 응답에 못 씀)
+        for block_id, tag, tag_length in zip(dataframe.index.tolist(),
+                                             dataframe["converted_html_tag"].astype(str).tolist(),
+                                             dataframe["tag_length"].tolist()):
+            block_ids_by_tag.setdefault(tag, []).append(block_id)
+            try:
+                tag_lengths[block_id] = json.loads(tag_length)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Invalid tag_length for block {block_id}: {e}")
+        return cls(stat.st_mtime_ns, stat.st_size, block_ids_by_tag, tag_lengths)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """스냅샷용 기본 타입 dict (block id가 int일 수 있어 tag_lengths는 [block_id, tag_length] 목록으로 저장)"""
+        return {
+            "source_mtime_ns": self.source_mtime_ns,
+            "source_size": self.source_size,
+            "block_ids_by_tag": self.block_ids_by_tag,
+            "tag_lengths": [[block_id, tag_length] for block_id, tag_length in self.tag_lengths.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BlockCatalogData":
+        return cls(data["source_mtime_ns"], data["source_size"], data["block_ids_by_tag"],
+                   {block_id: tag_length for block_id, tag_length in data["tag_lengths"]})
+
+
+class BlockCatalog:
+    """Modoo_matching_blocks.xlsx 블록 카탈로그
+
+    - 처음 사용할 때 1번만 엑셀을 읽고 JSON 스냅샷으로 저장한다.
+      (pickle은 읽을 때 코드가 실행될 수 있어 쓰지 않음)
+      (엑셀 mtime/크기가 같으면 다음 프로세스부터는 스냅샷을 바로 읽음)
+    - converted_html_tag → block id 목록 dict, 미리 파싱한 tag_length, guided_json enum을 보관한다.
+    - start_watch()로 엑셀 mtime을 주기적으로 확인해 바뀌면 다시 로드한다.
+    """
+
+    def __init__(self, path: str, snapshot_path: Optional[str] = None, watch_interval: float = 10):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.watch_interval = watch_interval
+        self._data: Optional[BlockCatalogData] = None
+        self._guided_json: Optional[Dict[str, Any]] = None
+        self._watch_task: Optional[asyncio.Future] = None
+
+        # 상태 export 용 카운터
+        self.loads = 0
+        self.snapshot_loads = 0
+        self.reload_errors = 0
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def data(self) -> BlockCatalogData:
+        if self._data is None:
+            self.load()
+        return self._data
+
+    def load(self) -> bool:
+        """엑셀(또는 최신 스냅샷)을 읽어서 교체. 엑셀이 그대로면 아무것도 하지 않음
+
+        Returns:
+            bool: 새로 로드했는지 여부
+        """
+        stat = os.stat(self.path)
+        if self._data is not None and self._is_current(self._data, stat):
+            return False
+
+        data = self._read_snapshot(stat)
+        if data is None:
+            data = BlockCatalogData.from_excel(self.path, stat)
+            self._write_snapshot(data)
+            self.loads += 1
+        else:
+            self.snapshot_loads += 1
+
+        # 참조 1번으로 교체하므로 읽는 쪽은 항상 이전/새 카탈로그 중 하나를 온전히 본다
+        self._guided_json = self._build_guided_json(data.tags)
+        self._data = data
+        self.loaded_at = time.time()
+        logger.info(f"Block catalog loaded: {len(data.tag_lengths)} blocks, {len(data.tags)} tags from {self.path}")
+        return True
+
+    def block_ids(self, converted_html_tag: str) -> List[Any]:
+        return list(self.data.block_ids_by_tag.get(converted_html_tag, []))
+
+    def tag_length(self, block_id: Any) -> Any:
+        """미리 파싱한 tag_length (호출하는 쪽에서 수정해도 되도록 복사본)"""
+        return copy.deepcopy(self.data.tag_lengths[block_id])
+
+    def tag_length_list(self) -> List[Any]:
+        """모든 블록의 tag_length (schema warmup용, 수정하지 말 것)"""
+        return list(self.data.tag_lengths.values())
+
+    def choose_block(self, converted_html_tag: str) -> Tuple[Any, Any]:
+        """converted_html_tag에 맞는 블록 중 하나를 랜덤 선택
+
+        Returns:
+            tuple: (block_id, tag_length)
+
+        Raises:
+            KeyError: 해당 태그의 블록이 없음
+        """
+        block_ids = self.data.block_ids_by_tag.get(converted_html_tag)
+        if not block_ids:
+            raise KeyError(f"No block for converted_html_tag '{converted_html_tag}'")
+        block_id = random.choice(block_ids)
+        return block_id, self.tag_length(block_id)
+
+    def guided_json(self) -> Dict[str, Any]:
+        """selected_tag enum이 들어간 extra_body (미리 만들어 둔 값의 복사본)"""
+        if self._guided_json is None:
+            self.load()
+        return copy.deepcopy(self._guided_json)
+
+    def start_watch(self, interval: float = None):
+        """엑셀 mtime을 주기적으로 확인하는 백그라운드 task 시작 (이미 실행 중이면 무시)"""
+        if self._watch_task is not None and not self._watch_task.done():
+            return
+        self._watch_task = asyncio.ensure_future(self._watch_loop(interval or self.watch_interval))
+
+    async def stop_watch(self):
+        if self._watch_task is None:
+            return
+        self._watch_task.cancel()
+        try:
+            await self._watch_task
+        except asyncio.CancelledError:
+            pass
+        self._watch_task = None
+
+    async def _watch_loop(self, interval: float):
+        while True:
+            try:
+                # 엑셀 파싱은 느리므로 이벤트 루프를 막지 않도록 스레드에서 실행
+                if await asyncio.to_thread(self.load):
+                    logger.info("Block catalog hot-reloaded")
+            except Exception as e:
+                # 파일을 쓰는 중이면 읽기에 실패할 수 있음 → 이전 카탈로그를 계속 사용
+                self.reload_errors += 1
+                logger.warning(f"Block catalog reload failed: {e}")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def _is_current(data: BlockCatalogData, stat: os.stat_result) -> bool:
+        return data.source_mtime_ns == stat.st_mtime_ns and data.source_size == stat.st_size
+
+    @staticmethod
+    def _build_guided_json(tags: List[str]) -> Dict[str, Any]:
+        return {
+            "guided_json": {
+                "type": "object",
+                "properties": {
+                    "selected_tag": {
+                        "type": "string",
+                        "enum": tags
+                    }
+                },
+                "required": ["selected_tag"]
+            }
+        }
+
+    def _read_snapshot(self, stat: os.stat_result) -> Optional[BlockCatalogData]:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = orjson.loads(f.read())
+            if snapshot.get("version") != SNAPSHOT_VERSION:
+                return None
+            data = BlockCatalogData.from_dict(snapshot["data"])
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable block catalog snapshot {self.snapshot_path}: {e}")
+            return None
+        if not self._is_current(data, stat):
+            return None
+        return data
+
+    def _write_snapshot(self, data: BlockCatalogData):
+        if not self.snapshot_path:
+            return
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps({"version": SNAPSHOT_VERSION, "data": data.to_dict()}))
+            # 다른 worker가 읽는 중이어도 깨진 파일을 보지 않도록 rename으로 교체
+            os.replace(tmp_path, self.snapshot_path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Failed to write block catalog snapshot {self.snapshot_path}: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = self._data
+        return {
+            "path": self.path,
+            "loaded": data is not None,
+            "blocks": len(data.tag_lengths) if data is not None else 0,
+            "tags": len(data.tags) if data is not None else 0,
+            "loaded_at": self.loaded_at,
+            "loads": self.loads,
+            "snapshot_loads": self.snapshot_loads,
+            "reload_errors": self.reload_errors,
+            "watching": self._watch_task is not None and not self._watch_task.done(),
+        }
+
+
+modoo_block_catalog = BlockCatalog(
+    BlockCatalogConfig.modoo_path,
+    snapshot_path=BlockCatalogConfig.modoo_snapshot_path,
+    watch_interval=BlockCatalogConfig.watch_interval,
+)
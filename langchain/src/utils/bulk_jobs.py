@@ -0,0 +1,426 @@
+# src/utils/bulk_jobs.py
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+import logging
+
+from src.configs.batch_config import BulkJobConfig
+from src.utils.request_context import background_scope
+from src.utils.sse import format_ndjson
+
+logger = logging.getLogger(__name__)
+
+INPUT_FILE = "input.jsonl"
+OUTPUT_FILE = "output.jsonl"
+MANIFEST_FILE = "job.json"
+
+# 끝나지 않은 상태 (재시작하면 이어서 처리)
+PENDING_STATUSES = ("queued", "running")
+
+
+def item_id_of(item: Any, line_no: int) -> str:
+    """항목 식별자: request_id가 있으면 그 값, 없으면 input의 줄 번호"""
+    if isinstance(item, dict) and item.get("request_id") is not None:
+        return str(item["request_id"])
+    return str(line_no)
+
+
+class BulkJob:
+    """bulk 작업 1개의 manifest와 진행 상태"""
+
+    def __init__(self, job_id: str, job_dir: str, total: int = 0, tenant: str = None,
+                 status: str = "queued", created_at: float = None, finished_at: float = None,
+                 error: str = None):
+        self.job_id = job_id
+        self.job_dir = job_dir
+        self.total = total
+        self.tenant = tenant
+        self.status = status
+        self.created_at = created_at or time.time()
+        self.finished_at = finished_at
+        self.error = error
+
+        # 실행 중 상태 (manifest에는 저장하지 않고 output.jsonl에서 다시 계산)
+        self.succeeded = 0
+        self.failed = 0
+        self.resumed = 0
+        self.started_at: Optional[float] = None
+        self.processed_since_start = 0
+        self.cancel_requested = False
+        self.task: Optional[asyncio.Future] = None
+
+    @property
+    def input_path(self) -> str:
+        return os.path.join(self.job_dir, INPUT_FILE)
+
+    @property
+    def output_path(self) -> str:
+        return os.path.join(self.job_dir, OUTPUT_FILE)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.job_dir, MANIFEST_FILE)
+
+    @property
+    def completed(self) -> int:
+        return self.succeeded + self.failed
+
+    def manifest(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "total": self.total,
+            "tenant": self.tenant,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+    def save(self):
+        """manifest 저장 (중간에 죽어도 깨진 파일이 남지 않도록 rename으로 교체)"""
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest(), f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    @classmethod
+    def load(cls, job_dir: str) -> "BulkJob":
+        with open(os.path.join(job_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        return cls(job_dir=job_dir, **manifest)
+
+    def progress(self) -> Dict[str, Any]:
+        """진행 상태 (처리 속도 / 남은 시간은 이번 실행에서 처리한 항목 기준)"""
+        progress = self.manifest()
+        progress.update({
+            "completed": self.completed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "resumed": self.resumed,
+            "percent": round(self.completed / self.total * 100, 2) if self.total else 100.0,
+        })
+        if self.status == "running" and self.started_at is not None and self.processed_since_start:
+            rate = self.processed_since_start / max(time.time() - self.started_at, 1e-6)
+            progress["items_per_second"] = round(rate, 3)
+            progress["eta_seconds"] = round((self.total - self.completed) / rate, 1)
+        return progress
+
+
+class BulkJobManager:
+    """JSONL 파일 단위 offline bulk 작업 관리
+
+    - 작업 디렉토리({jobs_dir}/{job_id})에 input.jsonl / output.jsonl / job.json(manifest)을 둔다.
+    - input 한 줄 = BatchRequestHandler.process_single_request에 넘길 요청 dict
+      (sys_prompt, usr_prompt, max_tokens, extra_body 등, 선택적으로 request_id)
+    - 항목이 끝날 때마다 output.jsonl에 {"request_id", "line", 결과...} 한 줄을 바로 추가한다.
+    - 다시 시작하면 output.jsonl에 이미 있는 request_id는 건너뛰므로 끝난 항목을 다시 호출하지 않는다.
+    - 모든 호출은 bulk priority로 나가고, bulk 작업 전체의 동시 호출 수는
+      모델 동시 실행 limit * capacity_share 를 넘지 않는다. (사용자 요청 몫을 남겨둠)
+    """
+
+    def __init__(self, config: BulkJobConfig = None):
+        self.config = config or BulkJobConfig()
+        self.jobs: Dict[str, BulkJob] = {}
+        self.batch_handler = None
+        self._in_flight: Dict[str, int] = {}
+        self._capacity_changed: Optional[asyncio.Condition] = None
+
+        # 상태 export 용 카운터
+        self.total_items = 0
+        self.capacity_waits = 0
+
+    def start(self, batch_handler, resume: bool = None) -> int:
+        """batch_handler를 연결하고 끝나지 않은 작업을 이어서 시작 (이벤트 루프 안에서 호출)
+
+        Returns:
+            int: 다시 시작한 작업 수
+        """
+        self.batch_handler = batch_handler
+        # asyncio.Condition은 생성 시점의 이벤트 루프에 묶이므로 실행 중인 루프에서 만듦
+        self._capacity_changed = asyncio.Condition()
+        os.makedirs(self.config.jobs_dir, exist_ok=True)
+
+        resumed = 0
+        for job_id in sorted(os.listdir(self.config.jobs_dir)):
+            job_dir = os.path.join(self.config.jobs_dir, job_id)
+            if job_id in self.jobs or not os.path.isfile(os.path.join(job_dir, MANIFEST_FILE)):
+                continue
+            try:
+                job = BulkJob.load(job_dir)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable bulk job manifest in {job_dir}: {e}")
+                continue
+            self.jobs[job.job_id] = job
+            if job.status in PENDING_STATUSES and (self.config.resume_on_startup if resume is None else resume):
+                self._launch(job)
+                resumed += 1
+            else:
+                self._count_output(job)
+
+        if resumed:
+            logger.info(f"Resuming {resumed} bulk jobs from {self.config.jobs_dir}")
+        return resumed
+
+    async def stop(self):
+        """실행 중인 작업 중단 (status는 그대로 두므로 다음 start()에서 이어서 처리)"""
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, chunks: AsyncIterator[bytes], tenant: str = None) -> BulkJob:
+        """JSONL 본문을 저장하고 작업 시작
+
+        Args:
+            chunks: 요청 본문 (Request.stream())
+            tenant: 대기열 WFQ에서 이 작업의 호출을 묶을 tenant
+
+        Raises:
+            ValueError: 비어 있거나 JSON 객체가 아닌 줄, 중복된 request_id가 있음
+        """
+        if self.batch_handler is None:
+            raise RuntimeError("BulkJobManager.start() has not been called")
+
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        job = BulkJob(job_id, os.path.join(self.config.jobs_dir, job_id), tenant=tenant)
+        os.makedirs(job.job_dir)
+        try:
+            with open(job.input_path, "wb") as f:
+                async for chunk in chunks:
+                    f.write(chunk)
+            job.total = await asyncio.to_thread(self._validate_input, job.input_path)
+        except BaseException:
+            shutil.rmtree(job.job_dir, ignore_errors=True)
+            raise
+
+        job.save()
+        self.jobs[job_id] = job
+        self._launch(job)
+        logger.info(f"Bulk job {job_id} submitted with {job.total} items")
+        return job
+
+    def get(self, job_id: str) -> Optional[BulkJob]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [job.progress() for job in sorted(self.jobs.values(), key=lambda job: job.created_at)]
+
+    async def cancel(self, job_id: str) -> Optional[BulkJob]:
+        """작업 취소 (이미 끝난 항목의 결과는 output.jsonl에 그대로 남음)"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.task is not None and not job.task.done():
+            job.cancel_requested = True
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+        elif job.status in PENDING_STATUSES:
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            job.save()
+        return job
+
+    def _launch(self, job: BulkJob):
+        job.task = asyncio.ensure_future(self._run(job))
+
+    async def _run(self, job: BulkJob):
+        """작업 1개 처리: output에 이미 있는 항목은 건너뛰고 나머지를 worker들이 나눠서 처리"""
+        try:
+            done_ids = await asyncio.to_thread(self._recover_output, job)
+            job.status = "running"
+            job.started_at = time.time()
+            job.processed_since_start = 0
+            job.save()
+
+            workers = max(1, self.config.workers)
+            queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+            write_lock = asyncio.Lock()
+            with open(job.output_path, "ab") as output:
+                worker_tasks = [asyncio.ensure_future(self._worker(job, queue, output, write_lock))
+                                for _ in range(workers)]
+                try:
+                    await self._produce(job, queue, done_ids)
+                    for _ in worker_tasks:
+                        await queue.put(None)
+                    await asyncio.gather(*worker_tasks)
+                finally:
+                    for task in worker_tasks:
+                        if not task.done():
+                            task.cancel()
+                    await asyncio.gather(*worker_tasks, return_exceptions=True)
+                    output.flush()
+                    os.fsync(output.fileno())
+
+            job.status = "completed"
+            job.finished_at = time.time()
+            job.save()
+            logger.info(f"Bulk job {job.job_id} completed: {job.succeeded} succeeded, {job.failed} failed")
+        except asyncio.CancelledError:
+            # 서버 종료로 멈춘 경우는 running 상태로 남겨 다음 시작 때 이어서 처리
+            if job.cancel_requested:
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                job.save()
+                logger.info(f"Bulk job {job.job_id} cancelled at {job.completed}/{job.total}")
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = time.time()
+            job.save()
+            logger.error(f"Bulk job {job.job_id} failed: {str(e)}")
+
+    async def _produce(self, job: BulkJob, queue: asyncio.Queue, done_ids: Set[str]):
+        """input.jsonl을 한 줄씩 읽어 아직 결과가 없는 항목만 queue에 넣음 (파일 전체를 메모리에 올리지 않음)"""
+        with open(job.input_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    item = e
+                if item_id_of(item, line_no) in done_ids:
+                    continue
+                await queue.put((line_no, item))
+
+    async def _worker(self, job: BulkJob, queue: asyncio.Queue, output, write_lock: asyncio.Lock):
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            line_no, item = entry
+            record = {"request_id": item_id_of(item, line_no), "line": line_no}
+            record.update(await self._process_item(job, line_no, item))
+
+            async with write_lock:
+                output.write(format_ndjson(record))
+                # 프로세스가 죽어도 끝난 항목은 남도록 항목마다 flush
+                output.flush()
+            if record.get("success"):
+                job.succeeded += 1
+            else:
+                job.failed += 1
+            job.processed_since_start += 1
+            self.total_items += 1
+
+    async def _process_item(self, job: BulkJob, line_no: int, item: Any) -> Dict[str, Any]:
+        if not isinstance(item, dict):
+            return {"success": False, "error": f"Invalid JSONL item: {item}", "error_type": "invalid_item"}
+
+        request = {key: value for key, value in item.items() if key != "request_id"}
+        model_key = self.batch_handler.openai_service.get_model_key(request.get("model"))
+        await self._acquire(model_key)
+        try:
+            # 사용자 요청과 분리된 deadline + bulk priority로 호출
+            with background_scope(self.config.item_timeout, tenant=job.tenant):
+                result = await self.batch_handler.process_single_request(request, request_id=line_no)
+            return result.to_dict(compact=self.config.compact_results)
+        except Exception as e:
+            logger.error(f"Bulk job {job.job_id} line {line_no} failed: {str(e)}")
+            return {"success": False, "error": str(e), "error_type": type(e).__name__}
+        finally:
+            await self._release(model_key)
+
+    def allowed_in_flight(self, model_key: str) -> int:
+        """bulk 작업 전체가 model_key에 동시에 보낼 수 있는 호출 수 (현재 적응형 limit 기준)"""
+        limit = self.batch_handler.concurrency_limiter.limiter(model_key).current_limit
+        return max(1, int(limit * self.config.capacity_share))
+
+    async def _acquire(self, model_key: str):
+        async with self._capacity_changed:
+            while self._in_flight.get(model_key, 0) >= self.allowed_in_flight(model_key):
+                self.capacity_waits += 1
+                try:
+                    # limit은 반납 없이도 늘어날 수 있으므로 주기적으로 다시 확인
+                    await asyncio.wait_for(self._capacity_changed.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+            self._in_flight[model_key] = self._in_flight.get(model_key, 0) + 1
+
+    async def _release(self, model_key: str):
+        async with self._capacity_changed:
+            self._in_flight[model_key] -= 1
+            self._capacity_changed.notify_all()
+
+    @staticmethod
+    def _validate_input(path: str) -> int:
+        """항목 수 반환 (잘못된 줄이 있으면 ValueError)"""
+        total = 0
+        item_ids: Set[str] = set()
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"Line {line_no} is not valid JSON: {e}") from e
+                if not isinstance(item, dict):
+                    raise ValueError(f"Line {line_no} is not a JSON object")
+                item_id = item_id_of(item, line_no)
+                if item_id in item_ids:
+                    raise ValueError(f"Line {line_no} has duplicate request_id '{item_id}'")
+                item_ids.add(item_id)
+                total += 1
+        if not total:
+            raise ValueError("No items in JSONL input")
+        return total
+
+    def _recover_output(self, job: BulkJob) -> Set[str]:
+        """output.jsonl에서 끝난 항목 id를 모으고 중간에 끊긴 마지막 줄은 잘라냄"""
+        job.succeeded = job.failed = 0
+        done_ids, valid_size = self._read_output(job)
+        if os.path.exists(job.output_path) and os.path.getsize(job.output_path) != valid_size:
+            logger.warning(f"Truncating partial line in {job.output_path}")
+            with open(job.output_path, "r+b") as f:
+                f.truncate(valid_size)
+        job.resumed = len(done_ids)
+        return done_ids
+
+    def _count_output(self, job: BulkJob):
+        job.succeeded = job.failed = 0
+        self._read_output(job)
+
+    @staticmethod
+    def _read_output(job: BulkJob) -> Tuple[Set[str], int]:
+        done_ids: Set[str] = set()
+        valid_size = 0
+        if not os.path.exists(job.output_path):
+            return done_ids, valid_size
+        with open(job.output_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                valid_size += len(line)
+                if record.get("request_id") in done_ids:
+                    continue
+                done_ids.add(record.get("request_id"))
+                if record.get("success"):
+                    job.succeeded += 1
+                else:
+                    job.failed += 1
+        return done_ids, valid_size
+
+    def snapshot(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self.jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "jobs": statuses,
+            "in_flight": dict(self._in_flight),
+            "capacity_share": self.config.capacity_share,
+            "total_items": self.total_items,
+            "capacity_waits": self.capacity_waits,
+        }
+
+
+bulk_job_manager = BulkJobManager()
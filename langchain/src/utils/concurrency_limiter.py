@@ -0,0 +1,316 @@
+# src/utils/concurrency_limiter.py
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 과부하로 판단하는 에러 (limit 감소 / replica 실패 신호)
+OVERLOAD_ERRORS = ("APITimeoutError", "RateLimitError", "InternalServerError", "APIConnectionError",
+                   "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError")
+OVERLOAD_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def is_overload_error(e: BaseException) -> bool:
+    """vLLM 서버가 감당하지 못해서 생긴 에러인지 (잘못된 요청 등 4xx는 제외)"""
+    return type(e).__name__ in OVERLOAD_ERRORS or \
+        getattr(e, "status_code", None) in OVERLOAD_STATUS_CODES
+
+
+# 우선순위 클래스 (앞쪽이 높음). 높은 클래스의 대기자가 있으면 낮은 클래스는 기다린다.
+PRIORITY_CLASSES = ("interactive", "default", "bulk")
+DEFAULT_PRIORITY = "default"
+
+
+class FairQueue:
+    """동시 실행 슬롯 대기열
+
+    - priority class 사이에는 strict priority
+    - 같은 class 안에서는 tenant 별 weighted fair queuing (start-time fair queuing)
+      tenant마다 가상 종료 시각(finish = max(virtual_time, 직전 finish) + cost / weight)을 매기고
+      가장 작은 finish부터 꺼낸다. 한 tenant가 요청을 몰아 넣어도 다른 tenant와 번갈아 처리된다.
+    """
+
+    def __init__(self, tenant_weights: Dict[str, float] = None):
+        self.tenant_weights = tenant_weights or {}
+        self._heaps = {priority: [] for priority in PRIORITY_CLASSES}
+        self._virtual_time = {priority: 0.0 for priority in PRIORITY_CLASSES}
+        self._last_finish: Dict[Tuple[str, str], float] = {}
+        self._entries: Dict[asyncio.Future, list] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def push(self, waiter: asyncio.Future, priority: str, tenant: str = None, cost: float = 1.0):
+        virtual_time = self._virtual_time[priority]
+        start = max(virtual_time, self._last_finish.get((priority, tenant), 0.0))
+        finish = start + cost / self.tenant_weights.get(tenant, 1.0)
+        self._last_finish[(priority, tenant)] = finish
+        entry = [finish, next(self._seq), start, waiter]
+        self._entries[waiter] = entry
+        heapq.heappush(self._heaps[priority], entry)
+
+    def pop(self) -> Optional[asyncio.Future]:
+        for priority in PRIORITY_CLASSES:
+            heap = self._heaps[priority]
+            while heap:
+                entry = heapq.heappop(heap)
+                waiter = entry[3]
+                if self._entries.pop(waiter, None) is None:
+                    continue  # remove 된 대기자
+                self._virtual_time[priority] = entry[2]
+                if len(self._last_finish) > 1000:
+                    self._prune()
+                return waiter
+        return None
+
+    def remove(self, waiter: asyncio.Future):
+        # heap에서는 pop 할 때 건너뜀
+        self._entries.pop(waiter, None)
+
+    def _prune(self):
+        """대기 중인 요청이 없는 tenant의 finish 기록 정리"""
+        self._last_finish = {
+            key: finish for key, finish in self._last_finish.items()
+            if finish > self._virtual_time[key[0]]
+        }
+
+
+class QueueWaitStats:
+    """priority class 별 대기 시간 통계 (최근 window개 기준)"""
+
+    def __init__(self, window: int = 1000):
+        self.waits = deque(maxlen=window)
+        self.total = 0
+
+    def observe(self, wait: float):
+        self.waits.append(wait)
+        self.total += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        if not self.waits:
+            return {"total": self.total}
+        waits = sorted(self.waits)
+        return {
+            "total": self.total,
+            "avg": round(sum(waits) / len(waits), 4),
+            "p50": round(waits[len(waits) // 2], 4),
+            "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 4),
+            "max": round(waits[-1], 4),
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD 방식의 적응형 동시 실행 제한
+
+    한 vLLM 백엔드에 동시에 보내는 요청 수(limit)를 관측된 지연 시간에 맞춰 조절한다.
+    - 토큰당 지연(latency / completion_tokens)이 기준값(baseline) * tolerance 이하이고
+      target_tpot 이하이면 limit을 한 윈도우(limit개 완료)마다 1씩 늘린다. (additive increase)
+    - 타임아웃, 429/5xx 같은 과부하 에러, 또는 토큰당 지연이 기준을 넘으면
+      limit을 backoff_ratio 배로 줄인다. (multiplicative decrease, cooldown 동안 1회만)
+
+    baseline은 부하가 없을 때의 토큰당 지연(Vegas의 min RTT)으로, 주기적으로 EWMA 쪽으로
+    끌어올려 모델/서버 상태 변화에 따라가게 한다.
+
+    슬롯을 기다리는 요청은 FairQueue 순서(priority class → tenant 간 WFQ)로 깨운다.
+    """
+
+    def __init__(self,
+                 initial_limit: int = 10,
+                 min_limit: int = 1,
+                 max_limit: int = 50,
+                 target_tpot: Optional[float] = None,  # 목표 토큰당 지연(초), None이면 baseline만 사용
+                 latency_tolerance: float = 2.0,
+                 backoff_ratio: float = 0.7,
+                 smoothing: float = 0.2,
+                 decrease_cooldown: float = 1.0,
+                 baseline_window: int = 500,
+                 tenant_weights: Dict[str, float] = None):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_tpot = target_tpot
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.smoothing = smoothing
+        self.decrease_cooldown = decrease_cooldown
+        self.baseline_window = baseline_window
+
+        self.in_flight = 0
+        self._waiters = FairQueue(tenant_weights)
+        self.queue_wait = {priority: QueueWaitStats() for priority in PRIORITY_CLASSES}
+
+        self.ewma_tpot: Optional[float] = None
+        self.baseline_tpot: Optional[float] = None
+        self._samples_since_baseline = 0
+        self._last_decrease = 0.0
+
+        # 상태 export 용 카운터
+        self.total_completed = 0
+        self.total_dropped = 0
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < self.current_limit:
+            waiter = self._waiters.pop()
+            if waiter is not None and not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self, priority: str = DEFAULT_PRIORITY, tenant: str = None, cost: float = 1.0):
+        """동시 실행 슬롯을 얻을 때까지 대기
+
+        Args:
+            priority: PRIORITY_CLASSES 중 하나 (모르는 값은 default)
+            tenant: 공정하게 나눌 단위 (Completions.user 등). None끼리는 같은 tenant로 취급
+            cost: WFQ에서 이 요청이 차지하는 몫 (기본 1)
+        """
+        if priority not in self.queue_wait:
+            priority = DEFAULT_PRIORITY
+        if self.in_flight < self.current_limit and not self._waiters:
+            self.in_flight += 1
+            self.queue_wait[priority].observe(0.0)
+            return
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.push(waiter, priority, tenant, cost)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 슬롯을 받은 직후 취소된 경우 → 다음 대기자에게 넘김
+                self.in_flight -= 1
+                self._wake_waiters()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        self.queue_wait[priority].observe(time.monotonic() - start)
+
+    def release(self, latency: float = None, tokens: int = 1, dropped: bool = False):
+        """슬롯 반납과 함께 관측값으로 limit 갱신
+
+        Args:
+            latency: 요청 소요 시간(초). None이면 limit을 갱신하지 않음 (취소, 잘못된 요청 등)
+            tokens: 생성된 토큰 수 (토큰당 지연 계산용)
+            dropped: 타임아웃/과부하 에러 여부
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+        if dropped:
+            self.total_dropped += 1
+            self._decrease("drop")
+        elif latency is not None:
+            self.total_completed += 1
+            self._observe(latency / max(1, tokens))
+        self._wake_waiters()
+
+    def _observe(self, tpot: float):
+        self.ewma_tpot = tpot if self.ewma_tpot is None else \
+            (1 - self.smoothing) * self.ewma_tpot + self.smoothing * tpot
+
+        self._samples_since_baseline += 1
+        if self.baseline_tpot is None or tpot < self.baseline_tpot:
+            self.baseline_tpot = tpot
+        elif self._samples_since_baseline >= self.baseline_window:
+            # 오래된 baseline은 현재 평균 쪽으로 천천히 끌어올림
+            self.baseline_tpot = (self.baseline_tpot + self.ewma_tpot) / 2
+            self._samples_since_baseline = 0
+
+        over_gradient = self.ewma_tpot > self.baseline_tpot * self.latency_tolerance
+        over_target = self.target_tpot is not None and self.ewma_tpot > self.target_tpot
+        if over_gradient or over_target:
+            self._decrease("latency")
+        elif self.in_flight + len(self._waiters) + 1 >= self.current_limit:
+            # 슬롯을 실제로 다 쓰고 있을 때만 늘림 (한가할 때 limit이 무한정 커지지 않도록)
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        new_limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        if int(new_limit) != int(self.limit):
+            logger.info(f"Concurrency limit decreased ({reason}): {self.limit:.1f} -> {new_limit:.1f}")
+        self.limit = new_limit
+
+    def slot(self, priority: str = DEFAULT_PRIORITY, tenant: str = None) -> "ConcurrencySlot":
+        return ConcurrencySlot(self, priority, tenant)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "ewma_tpot": round(self.ewma_tpot, 5) if self.ewma_tpot is not None else None,
+            "baseline_tpot": round(self.baseline_tpot, 5) if self.baseline_tpot is not None else None,
+            "total_completed": self.total_completed,
+            "total_dropped": self.total_dropped,
+            "queue_wait": {priority: stats.snapshot() for priority, stats in self.queue_wait.items()},
+        }
+
+
+class ConcurrencySlot:
+    """async with 로 사용하는 슬롯
+
+    블록 안에서 tokens / dropped / ignored 를 채워두면 반납할 때 limit 갱신에 쓰인다.
+    예외가 블록 밖으로 나가면 타임아웃은 drop, 그 외(취소 포함)는 관측하지 않는다.
+    """
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter, priority: str = DEFAULT_PRIORITY, tenant: str = None):
+        self.limiter = limiter
+        self.priority = priority
+        self.tenant = tenant
+        self.tokens = 1
+        self.dropped = False
+        self.ignored = False
+        self.start = None
+
+    async def __aenter__(self):
+        await self.limiter.acquire(self.priority, self.tenant)
+        self.start = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        latency = time.monotonic() - self.start
+        if exc_type is not None:
+            self.dropped = self.dropped or issubclass(exc_type, asyncio.TimeoutError)
+            self.ignored = not self.dropped
+        self.limiter.release(
+            latency=None if self.ignored else latency,
+            tokens=self.tokens,
+            dropped=self.dropped
+        )
+        return False
+
+
+class ModelConcurrencyLimiter:
+    """model_key(OpenAIService.model_router의 키) 별 적응형 동시 실행 제한 묶음"""
+
+    def __init__(self, limits: Dict[str, Dict[str, Any]] = None, default_limits: Dict[str, Any] = None):
+        self.default_limits = default_limits or {}
+        self.limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+        for model_key, limit in (limits or {}).items():
+            self.limiters[model_key] = AdaptiveConcurrencyLimiter(**limit)
+
+    def limiter(self, model_key: str) -> AdaptiveConcurrencyLimiter:
+        if model_key not in self.limiters:
+            logger.info(f"Creating default concurrency limiter for model '{model_key}'")
+            self.limiters[model_key] = AdaptiveConcurrencyLimiter(**self.default_limits)
+        return self.limiters[model_key]
+
+    def slot(self, model_key: str, priority: str = DEFAULT_PRIORITY, tenant: str = None) -> ConcurrencySlot:
+        return self.limiter(model_key).slot(priority or DEFAULT_PRIORITY, tenant)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {model_key: limiter.snapshot() for model_key, limiter in self.limiters.items()}
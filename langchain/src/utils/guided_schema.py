@@ -0,0 +1,182 @@
+# src/utils/guided_schema.py
+import asyncio
+import json
+import re
+from typing import Any, Dict, Iterable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _natural_key(key: str):
+    """h1_0, h2_0, li_0_0, p_0, p_1, p_10 순서가 되도록 숫자는 숫자로 비교"""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", str(key))]
+
+
+def _sorted_keys(keys: Iterable[str]) -> list:
+    return sorted(dict.fromkeys(str(key) for key in keys), key=_natural_key)
+
+
+def tag_length_shape(tag_length: Any) -> Any:
+    """schema를 결정하는 구조만 남긴 값 (글자 수 값은 schema에 영향이 없으므로 제거)"""
+    if isinstance(tag_length, dict):
+        return {str(key): tag_length_shape(value) for key, value in tag_length.items()}
+    if isinstance(tag_length, list):
+        return [tag_length_shape(item) if isinstance(item, dict) else None for item in tag_length]
+    return "string"
+
+
+def schema_signature(tag_length: Any) -> str:
+    """구조가 같은 tag_length면 키 순서/글자 수와 상관없이 같은 문자열"""
+    return json.dumps(tag_length_shape(tag_length), sort_keys=True, separators=(",", ":"))
+
+
+class GuidedSchemaBuilder:
+    """tag_length → guided_json schema 생성기 (canonical + memoize)
+
+    vLLM guided decoding backend(outlines)는 schema 문자열 단위로 FSM을 컴파일해서 캐시하므로
+    논리적으로 같은 schema는 항상 바이트 단위로 같게 만들어야 재컴파일이 없다.
+    - properties / required 는 키 이름 기준(숫자는 숫자 순서)으로 정렬하고 중복 키는 제거한다.
+    - 구조 signature 별로 만든 schema를 보관해서 같은 객체를 다시 돌려준다. (수정하지 말 것)
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._schemas: Dict[str, Dict[str, Any]] = {}
+        self._extra_bodies: Dict[str, Dict[str, Any]] = {}
+
+        # 상태 export 용 카운터
+        self.hits = 0
+        self.misses = 0
+        self.warmed = 0
+        self.warmup_errors = 0
+
+    def tag_length_schema(self, tag_length: Any) -> Dict[str, Any]:
+        """{"properties": {...}, "required": [...]} (기존 convert_tag_length_to_schema와 같은 형식)"""
+        signature = schema_signature(tag_length)
+        schema = self._schemas.get(signature)
+        if schema is not None:
+            self.hits += 1
+            return schema
+
+        self.misses += 1
+        schema = self._build(tag_length_shape(tag_length))
+        if len(self._schemas) >= self.max_size:
+            # 블록 구조 종류는 한정적이므로 넘치면 단순히 비움
+            self._schemas.clear()
+            self._extra_bodies.clear()
+        self._schemas[signature] = schema
+        return schema
+
+    def extra_body(self, tag_length: Any) -> Dict[str, Any]:
+        """{"guided_json": {...}} (기존 create_extra_body와 같은 형식)"""
+        signature = schema_signature(tag_length)
+        extra_body = self._extra_bodies.get(signature)
+        if extra_body is None:
+            schema = self.tag_length_schema(tag_length)
+            extra_body = {
+                "guided_json": {
+                    "type": "object",
+                    "properties": schema["properties"],
+                    "required": schema["required"]
+                }
+            }
+            self._extra_bodies[signature] = extra_body
+        return extra_body
+
+    def _build(self, shape: Any) -> Dict[str, Any]:
+        properties = {}
+        if isinstance(shape, dict):
+            for key in _sorted_keys(shape.keys()):
+                value = shape[key]
+                # 리스트인 경우 (li_0 → li_0_0, li_0_1 등으로 나눔)
+                if isinstance(value, list):
+                    for i, item in enumerate(value):
+                        if isinstance(item, dict):
+                            item_keys = _sorted_keys(item.keys())
+                            properties[f"{key}_{i}"] = {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {sub_key: {"type": "string"} for sub_key in item_keys},
+                                    "required": item_keys
+                                },
+                                "minItems": 1,
+                                "maxItems": 1
+                            }
+                # 딕셔너리인 경우 (중첩 객체)
+                elif isinstance(value, dict):
+                    nested_schema = self._build(value)
+                    properties[key] = {
+                        "type": "object",
+                        "properties": nested_schema["properties"],
+                        "required": nested_schema["required"]
+                    }
+                else:
+                    properties[key] = {"type": "string"}
+
+        # li_0 리스트를 나눈 키와 원래 키가 겹칠 수 있으므로 마지막에 한 번 더 정렬
+        keys = _sorted_keys(properties.keys())
+        return {
+            "properties": {key: properties[key] for key in keys},
+            "required": keys
+        }
+
+    async def warmup(self, batch_handler, tag_lengths: Iterable[Any], model: Optional[str] = None,
+                     concurrency: int = 4) -> int:
+        """구조가 다른 tag_length schema마다 max_tokens=1 요청을 보내 vLLM의 FSM 컴파일을 미리 끝냄
+
+        Args:
+            batch_handler: BatchRequestHandler
+            tag_lengths: 미리 컴파일할 tag_length 목록 (카탈로그 블록 등)
+            model: 요청할 모델 경로 (None이면 실제 호출들과 같이 기본 모델)
+            concurrency: 동시에 보낼 warmup 요청 수
+
+        Returns:
+            int: 성공한 schema 수
+        """
+        extra_bodies = {}
+        for tag_length in tag_lengths:
+            extra_bodies.setdefault(schema_signature(tag_length), self.extra_body(tag_length))
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def warm(extra_body):
+            request = {
+                "sys_prompt": "Fill the JSON.",
+                "usr_prompt": "warmup",
+                "extra_body": extra_body,
+                "max_tokens": 1,
+                "temperature": 0,
+                "n": 1,
+                "stream": False,
+                "logprobs": None,
+                "cache": False,
+            }
+            if model is not None:
+                request["model"] = model
+            async with semaphore:
+                result = await batch_handler.process_single_request(request, request_id=0)
+            return result.success
+
+        results = await asyncio.gather(*(warm(extra_body) for extra_body in extra_bodies.values()),
+                                       return_exceptions=True)
+        succeeded = sum(1 for result in results if result is True)
+        self.warmed += succeeded
+        self.warmup_errors += len(results) - succeeded
+        logger.info(f"Guided JSON warmup: {succeeded}/{len(results)} schemas compiled")
+        return succeeded
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "schemas": len(self._schemas),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "warmed": self.warmed,
+            "warmup_errors": self.warmup_errors,
+        }
+
+
+guided_schema_builder = GuidedSchemaBuilder()
@@ -0,0 +1,244 @@
+# src/utils/http_pools.py
+import time
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+import logging
+
+import aiohttp
+import httpx
+
+from src.configs.batch_config import HTTPPoolConfig
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """host 1개의 연결 사용 현황
+
+    in_flight는 연결을 기다리는 요청까지 포함한 진행 중 요청 수,
+    saturated_requests는 시작할 때 이미 max_connections 만큼 사용 중이라 연결을 기다린 요청 수.
+    (이 값이 계속 늘면 GPU가 아니라 연결 수에 막혀 있다는 뜻)
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.saturated_requests = 0
+        self.errors = 0
+
+    def acquire(self):
+        if self.in_flight >= self.max_connections:
+            self.saturated_requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.total_requests += 1
+
+    def release(self):
+        self.in_flight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "total_requests": self.total_requests,
+            "saturated_requests": self.saturated_requests,
+            "errors": self.errors,
+        }
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """응답 body를 다 읽거나 닫을 때 연결 사용을 반납 (스트리밍 응답은 끝날 때까지 연결을 점유)"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """httpx 기본 transport에 PoolStats 집계를 더한 것"""
+
+    def __init__(self, stats: PoolStats, **transport_kwargs):
+        self.stats = stats
+        self._transport = httpx.AsyncHTTPTransport(**transport_kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.stats.errors += 1
+            self.stats.release()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, self.stats.release),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class HTTPPools:
+    """외부 LLM 서버로 나가는 모든 HTTP 호출이 공유하는 connection pool
+
+    - vLLM : 서버(scheme://host:port)마다 httpx.AsyncClient 1개를 만들어 ChatOpenAI / AsyncOpenAI가 같이 쓴다.
+      host마다 client가 따로라서 max_connections가 곧 host당 연결 제한이다.
+      (vLLM은 docker 서비스 이름으로 keep-alive 연결을 재사용하므로 DNS 조회는 연결을 새로 만들 때만 일어남)
+    - Ollama : aiohttp.ClientSession 1개 (TCPConnector의 host당 제한 / keep-alive / DNS 캐시 사용)
+      ClientSession은 실행 중인 이벤트 루프에서 만들어야 하므로 start() 또는 첫 사용 때 만든다.
+    - 서버 종료 시 aclose()로 모두 닫는다.
+    """
+
+    def __init__(self, config: HTTPPoolConfig = None):
+        self.config = config or HTTPPoolConfig()
+        self._vllm_clients: Dict[str, httpx.AsyncClient] = {}
+        self._vllm_stats: Dict[str, PoolStats] = {}
+        self._ollama_session: Optional[aiohttp.ClientSession] = None
+        self.http2 = self.config.http2 and self._http2_available()
+
+        # Ollama 연결 대기 / 재사용 집계 (aiohttp TraceConfig)
+        self.ollama_stats = {
+            "requests": 0,
+            "queued": 0,
+            "waiting": 0,
+            "queued_seconds": 0.0,
+            "new_connections": 0,
+            "reused_connections": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+
+    @staticmethod
+    def _http2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP_POOL_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+            return False
+        return True
+
+    @staticmethod
+    def origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def vllm_client(self, url: str) -> httpx.AsyncClient:
+        """url 서버용 공유 httpx client (같은 host면 같은 객체)"""
+        origin = self.origin(url)
+        client = self._vllm_clients.get(origin)
+        if client is None or client.is_closed:
+            stats = self._vllm_stats.setdefault(origin, PoolStats(self.config.vllm_max_connections))
+            transport = CountingTransport(
+                stats,
+                limits=httpx.Limits(
+                    max_connections=self.config.vllm_max_connections,
+                    max_keepalive_connections=self.config.vllm_max_keepalive,
+                    keepalive_expiry=self.config.keepalive_seconds,
+                ),
+                http2=self.http2,
+            )
+            # 요청별 timeout은 openai client가 지정하고, 여기서는 연결 timeout만 짧게 둔다
+            client = httpx.AsyncClient(
+                transport=transport,
+                timeout=httpx.Timeout(600, connect=self.config.connect_timeout),
+            )
+            self._vllm_clients[origin] = client
+        return client
+
+    async def start(self):
+        """Ollama session을 미리 열어둠 (FastAPI startup)"""
+        await self.ollama_session()
+
+    async def ollama_session(self) -> aiohttp.ClientSession:
+        """Ollama 호출용 공유 aiohttp session (닫으면 안 됨)"""
+        if self._ollama_session is None or self._ollama_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.ollama_max_connections,
+                limit_per_host=self.config.ollama_max_connections_per_host,
+                keepalive_timeout=self.config.keepalive_seconds,
+                ttl_dns_cache=self.config.dns_ttl,
+                use_dns_cache=True,
+            )
+            self._ollama_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, connect=self.config.connect_timeout),
+                trace_configs=[self._ollama_trace_config()],
+            )
+        return self._ollama_session
+
+    def _ollama_trace_config(self) -> aiohttp.TraceConfig:
+        stats = self.ollama_stats
+
+        async def on_request_start(session, context, params):
+            stats["requests"] += 1
+
+        async def on_queued_start(session, context, params):
+            context.queued_at = time.monotonic()
+            stats["queued"] += 1
+            stats["waiting"] += 1
+
+        async def on_queued_end(session, context, params):
+            stats["waiting"] -= 1
+            stats["queued_seconds"] += time.monotonic() - context.queued_at
+
+        async def on_create_end(session, context, params):
+            stats["new_connections"] += 1
+
+        async def on_reuse(session, context, params):
+            stats["reused_connections"] += 1
+
+        async def on_dns_hit(session, context, params):
+            stats["dns_cache_hits"] += 1
+
+        async def on_dns_miss(session, context, params):
+            stats["dns_cache_misses"] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_end.append(on_create_end)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        trace_config.on_dns_cache_hit.append(on_dns_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_miss)
+        return trace_config
+
+    async def aclose(self):
+        """모든 pool 닫기 (FastAPI shutdown)"""
+        for client in self._vllm_clients.values():
+            await client.aclose()
+        self._vllm_clients.clear()
+        if self._ollama_session is not None and not self._ollama_session.closed:
+            await self._ollama_session.close()
+        self._ollama_session = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        ollama = dict(self.ollama_stats)
+        ollama["queued_seconds"] = round(ollama["queued_seconds"], 3)
+        ollama["open"] = self._ollama_session is not None and not self._ollama_session.closed
+        return {
+            "http2": self.http2,
+            "vllm": {origin: stats.snapshot() for origin, stats in self._vllm_stats.items()},
+            "ollama": ollama,
+        }
+
+
+http_pools = HTTPPools()
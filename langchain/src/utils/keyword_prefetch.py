@@ -0,0 +1,119 @@
+# src/utils/keyword_prefetch.py
+import asyncio
+import copy
+import hashlib
+from typing import Any, Dict, Iterable
+import logging
+
+from src.configs.batch_config import KeywordPrefetchConfig
+from src.utils.request_context import background_scope
+from src.utils.response_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def make_context_key(context: str, max_tokens: int) -> str:
+    """섹션 context + max_tokens 해시"""
+    return hashlib.sha256(f"{max_tokens}:{context}".encode("utf-8")).hexdigest()
+
+
+class KeywordPrefetcher:
+    """섹션 context 해시로 이미지 키워드 결과를 보관하고 미리 생성해 두는 저장소
+
+    이미지 키워드는 섹션 context에만 의존하므로 /api/section_select 가 context를 돌려준 직후
+    백그라운드로 생성을 시작해 두고, /api/block_content_generate 에서는 get()으로 꺼내 쓴다.
+
+    - prefetch task는 요청의 deadline과 분리된 background_scope(bulk)에서 실행된다.
+    - 아직 생성 중이면 그 task를 함께 기다리고, 실패했거나 없으면 그 자리에서 생성한다.
+    - keyword_client는 section_keyword_create_logic(context, max_tokens)를 가진 객체 (OpenAIKeywordClient)
+    """
+
+    def __init__(self, config: KeywordPrefetchConfig = None):
+        self.config = config or KeywordPrefetchConfig()
+        self.store = LRUCache(max_size=self.config.max_size, ttl=self.config.ttl)
+        self._tasks: Dict[str, asyncio.Future] = {}
+
+        # 상태 export 용 카운터
+        self.total_prefetched = 0
+        self.hits = 0
+        self.in_flight_hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def prefetch(self, keyword_client, contexts: Iterable[str], max_tokens: int = 100, tenant: str = None) -> int:
+        """contexts의 키워드 생성을 백그라운드로 시작 (이미 있거나 생성 중인 context는 건너뜀)
+
+        Args:
+            tenant: 대기열 WFQ에서 prefetch 호출을 묶을 tenant (Completions.user)
+
+        Returns:
+            int: 새로 시작한 prefetch 수
+        """
+        if not self.config.enabled:
+            return 0
+
+        started = 0
+        for context in contexts:
+            if not isinstance(context, str) or not context:
+                continue
+            key = make_context_key(context, max_tokens)
+            if key in self._tasks or self.store.get(key) is not None:
+                continue
+            with background_scope(self.config.timeout, tenant=tenant):
+                # task 생성 시점에 요청과 분리된 deadline / bulk priority가 복사됨
+                task = asyncio.ensure_future(self._generate(keyword_client, key, context, max_tokens))
+            self._tasks[key] = task
+            task.add_done_callback(lambda task, key=key: self._forget(key, task))
+            started += 1
+
+        self.total_prefetched += started
+        if started:
+            logger.debug(f"Prefetching image keywords for {started} section contexts")
+        return started
+
+    async def get(self, keyword_client, context: str, max_tokens: int = 100) -> Any:
+        """section_keyword_create_logic과 같은 결과 (보관된 결과가 있으면 LLM 호출 없이 반환)"""
+        key = make_context_key(context, max_tokens)
+        result = self.store.get(key)
+        if result is not None:
+            self.hits += 1
+            return copy.deepcopy(result)
+
+        task = self._tasks.get(key)
+        if task is not None:
+            self.in_flight_hits += 1
+            # 이 요청이 취소되어도 prefetch 결과는 저장되도록 shield
+            result = await asyncio.shield(task)
+            if getattr(result, "success", False):
+                return copy.deepcopy(result)
+        else:
+            self.misses += 1
+
+        return await self._generate(keyword_client, key, context, max_tokens)
+
+    async def _generate(self, keyword_client, key: str, context: str, max_tokens: int) -> Any:
+        result = await keyword_client.section_keyword_create_logic(context=context, max_tokens=max_tokens)
+        if getattr(result, "success", False):
+            self.store.set(key, copy.deepcopy(result))
+        else:
+            self.failures += 1
+        return result
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.config.enabled,
+            "size": len(self.store),
+            "in_flight": len(self._tasks),
+            "total_prefetched": self.total_prefetched,
+            "hits": self.hits,
+            "in_flight_hits": self.in_flight_hits,
+            "misses": self.misses,
+            "failures": self.failures,
+        }
+
+
+keyword_prefetcher = KeywordPrefetcher()
@@ -0,0 +1,164 @@
+# src/utils/metrics.py
+import functools
+import time
+from contextvars import ContextVar
+from typing import Optional, Tuple
+import logging
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from src.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# LLM 호출은 수십 ms ~ 수십 초까지 걸리므로 기본 bucket(최대 10초)보다 넓게 잡는다
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300)
+QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+ENDPOINT_LATENCY = Histogram(
+    "llm_rag_endpoint_latency_seconds",
+    "HTTP endpoint latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+QUEUE_WAIT = Histogram(
+    "llm_rag_queue_wait_seconds",
+    "Time a request waited for the rate limiter and a concurrency slot in BatchRequestHandler",
+    ["model", "priority"],
+    buckets=QUEUE_WAIT_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "llm_rag_stage_latency_seconds",
+    "Pipeline stage latency",
+    ["stage", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+RETRIES = Counter(
+    "llm_rag_retries_total",
+    "LLM calls repeated because the previous attempt gave an unusable result",
+    ["stage"],
+)
+GUIDED_JSON_PARSE_FAILURES = Counter(
+    "llm_rag_guided_json_parse_failures_total",
+    "guided_json outputs that were not valid JSON as generated",
+    ["stage"],
+)
+REPAIR_FALLBACKS = Counter(
+    "llm_rag_repair_fallbacks_total",
+    "Outputs recovered by a repair step (JSON fix-up, per-section regeneration, random choice)",
+    ["stage", "kind"],
+)
+PROMPT_TOKENS = Counter(
+    "llm_rag_prompt_tokens_total",
+    "Prompt tokens reported by the backend",
+    ["model"],
+)
+COMPLETION_TOKENS = Counter(
+    "llm_rag_completion_tokens_total",
+    "Completion tokens reported by the backend",
+    ["model"],
+)
+LEASE_REJECTIONS = Counter(
+    "llm_rag_lease_rejections_total",
+    "Flow lease renew/release calls ignored because the lease id was missing or not issued by this service",
+    ["action", "reason"],
+)
+IN_FLIGHT = Gauge(
+    "llm_rag_backend_in_flight_requests",
+    "Requests currently running on each vLLM replica",
+    ["model", "backend"],
+)
+
+# 지금 실행 중인 stage (track_stage 안에서 만든 task도 같은 값을 물려받음)
+_current_stage: ContextVar[Optional[str]] = ContextVar("metrics_stage", default=None)
+
+
+def current_stage() -> str:
+    return _current_stage.get() or "unknown"
+
+
+def track_stage(stage: str):
+    """async 메서드의 실행 시간을 stage 이름으로 기록하는 decorator
+
+    안에서 호출되는 record_retry 등은 stage를 지정하지 않으면 이 stage로 집계된다.
+    tracing이 켜진 요청에서는 같은 구간이 Class.method 이름의 span으로도 기록된다.
+
+        @track_stage("keyword")
+        async def section_keyword_recommend(self, ...):
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _current_stage.set(stage)
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                with tracer.span(func.__qualname__, stage=stage):
+                    result = await func(*args, **kwargs)
+                outcome = "success"
+                return result
+            finally:
+                STAGE_LATENCY.labels(stage, outcome).observe(time.perf_counter() - start)
+                _current_stage.reset(token)
+        return wrapper
+    return decorator
+
+
+def record_retry(stage: str = None):
+    RETRIES.labels(stage or current_stage()).inc()
+
+
+def record_parse_failure(stage: str = None):
+    GUIDED_JSON_PARSE_FAILURES.labels(stage or current_stage()).inc()
+
+
+def record_repair_fallback(kind: str, stage: str = None):
+    """
+    Args:
+        kind: 보정 방법 (json_fix / quote_fix / per_section / random_choice 등)
+    """
+    REPAIR_FALLBACKS.labels(stage or current_stage(), kind).inc()
+
+
+def record_tokens(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    """backend가 알려준 token 사용량 (값이 없으면 건너뜀)"""
+    if prompt_tokens:
+        PROMPT_TOKENS.labels(model).inc(prompt_tokens)
+    if completion_tokens:
+        COMPLETION_TOKENS.labels(model).inc(completion_tokens)
+
+
+def record_chat_usage(model: str, response):
+    """ChatOpenAI 응답(AIMessage)의 token 사용량 기록"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        record_tokens(model, usage.get("input_tokens"), usage.get("output_tokens"))
+        return
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    record_tokens(model, token_usage.get("prompt_tokens"), token_usage.get("completion_tokens"))
+
+
+def record_lease_rejection(action: str, reason: str):
+    """
+    Args:
+        action: release / renew
+        reason: missing(lease id 없음) / invalid(서명 불일치)
+    """
+    LEASE_REJECTIONS.labels(action, reason).inc()
+
+
+def observe_queue_wait(model: str, priority: Optional[str], seconds: float):
+    QUEUE_WAIT.labels(model, priority or "default").observe(seconds)
+
+
+def observe_endpoint(method: str, route: str, status: int, seconds: float):
+    ENDPOINT_LATENCY.labels(method, route, str(status)).observe(seconds)
+
+
+def in_flight(model: str, backend: str) -> Gauge:
+    return IN_FLIGHT.labels(model, backend)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """/metrics 응답 (body, content type)"""
+    return generate_latest(), CONTENT_TYPE_LATEST
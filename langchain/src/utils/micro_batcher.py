@@ -0,0 +1,112 @@
+# src/utils/micro_batcher.py
+import asyncio
+import contextvars
+import json
+from typing import Dict, Any, List, Callable, Awaitable, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def make_batch_key(params: Dict[str, Any]) -> str:
+    """같은 호출로 묶을 수 있는지 판단하는 키 (model, sampling 파라미터, guided schema)
+
+    dict 키 순서가 달라도 같은 키가 나오도록 정렬된 JSON으로 만든다.
+    """
+    return json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class MicroBatcher:
+    """짧은 시간(window) 동안 들어온 호환 가능한 프롬프트를 모아 한 번에 전송
+
+    flush_fn(params, prompts)는 prompts와 같은 순서의 텍스트 리스트를 돌려줘야 한다.
+    (vLLM /v1/completions 의 list prompt 호출)
+    """
+
+    def __init__(self,
+                 flush_fn: Callable[[Dict[str, Any], List[str]], Awaitable[List[str]]],
+                 window_ms: float = 5,
+                 max_batch_size: int = 16):
+        self.flush_fn = flush_fn
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        # batch key -> (params, [(prompt, future)])
+        self._pending: Dict[str, Tuple[Dict[str, Any], List[Tuple[str, asyncio.Future]]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # 실행 중인 flush (참조를 잡아둬서 GC되지 않게 하고, 대기자가 모두 빠지면 취소)
+        self._flushes: Set[asyncio.Task] = set()
+
+        # 상태 export 용 카운터
+        self.total_prompts = 0
+        self.total_calls = 0
+
+    async def submit(self, params: Dict[str, Any], prompt: str) -> str:
+        """프롬프트를 배치에 넣고 결과 텍스트를 기다림"""
+        loop = asyncio.get_running_loop()
+        key = make_batch_key(params)
+        future = loop.create_future()
+
+        if key not in self._pending:
+            self._pending[key] = (params, [])
+            self._timers[key] = loop.call_later(self.window, self._schedule_flush, key)
+        self._pending[key][1].append((prompt, future))
+
+        if len(self._pending[key][1]) >= self.max_batch_size:
+            self._schedule_flush(key)
+
+        # NOTE : 대기 중인 호출자가 취소되어도 같은 배치의 다른 요청은 그대로 진행
+        #        (모든 호출자가 취소되면 flush도 취소)
+        return await future
+
+    def _schedule_flush(self, key: str):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        # 여러 요청이 함께 쓰는 호출이므로 처음 들어온 요청의 deadline / priority / trace span을 물려받지 않도록
+        # 빈 context에서 실행
+        task = contextvars.Context().run(asyncio.ensure_future, self._flush(*batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+        futures = [future for _, future in batch[1]]
+
+        def cancel_if_abandoned(_):
+            if not task.done() and all(future.done() for future in futures):
+                task.cancel()
+
+        for future in futures:
+            future.add_done_callback(cancel_if_abandoned)
+
+    async def _flush(self, params: Dict[str, Any], items: List[Tuple[str, asyncio.Future]]):
+        items = [(prompt, future) for prompt, future in items if not future.done()]
+        if not items:
+            return
+        self.total_calls += 1
+        self.total_prompts += len(items)
+        logger.debug(f"Flushing micro batch of {len(items)} prompts")
+        try:
+            texts = await self.flush_fn(params, [prompt for prompt, _ in items])
+            if len(texts) != len(items):
+                raise RuntimeError(f"Expected {len(items)} completions, got {len(texts)}")
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), text in zip(items, texts):
+            if not future.done():
+                future.set_result(text)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "pending_batches": len(self._pending),
+            "running_flushes": len(self._flushes),
+            "total_prompts": self.total_prompts,
+            "total_calls": self.total_calls,
+            "avg_batch_size": round(self.total_prompts / self.total_calls, 2) if self.total_calls else 0.0,
+        }
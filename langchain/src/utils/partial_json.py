@@ -0,0 +1,83 @@
+# src/utils/partial_json.py
+import json
+from typing import Any, Dict, Optional
+
+
+def _close_partial_json(text: str) -> str:
+    """아직 생성 중인 JSON 문자열의 열린 문자열/배열/객체를 닫아줌"""
+    closers = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            closers.append("}")
+        elif ch == "[":
+            closers.append("]")
+        elif ch in "}]" and closers:
+            closers.pop()
+
+    if escaped:
+        text = text[:-1]
+    if in_string:
+        text += '"'
+    text = text.rstrip()
+    if text.endswith(":"):
+        text += " null"
+    elif text.endswith(","):
+        text = text[:-1]
+    return text + "".join(reversed(closers))
+
+
+def parse_partial_json(text: str, max_retries: int = 5) -> Optional[Any]:
+    """스트리밍 중인 JSON 텍스트를 지금까지 받은 만큼 파싱
+
+    예) '{"h1_0": "AI로 간편하게' -> {"h1_0": "AI로 간편하게"}
+    아직 값이 없는 키나 끝나지 않은 키 이름은 버린다.
+
+    Returns:
+        파싱 결과 (파싱할 수 없으면 None)
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    text = text[start:]
+    for _ in range(max_retries):
+        try:
+            return json.loads(_close_partial_json(text))
+        except json.JSONDecodeError:
+            # 끝나지 않은 키 이름 등 → 마지막 쉼표 이전까지만 사용
+            cut = text.rfind(",")
+            if cut <= 0:
+                return None
+            text = text[:cut]
+    return None
+
+
+class PartialJSONTracker:
+    """스트리밍 텍스트를 누적하면서 값이 바뀐 최상위 키만 돌려줌"""
+
+    def __init__(self):
+        self.text = ""
+        self.values: Dict[str, Any] = {}
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """chunk를 추가하고 새로 생기거나 바뀐 {key: value} 반환"""
+        self.text += chunk
+        parsed = parse_partial_json(self.text)
+        if not isinstance(parsed, dict):
+            return {}
+        changed = {}
+        for key, value in parsed.items():
+            if value is not None and self.values.get(key) != value:
+                changed[key] = value
+        self.values.update(changed)
+        return changed
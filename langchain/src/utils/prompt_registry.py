@@ -0,0 +1,89 @@
+# src/utils/prompt_registry.py
+import hashlib
+import string
+import textwrap
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: str) -> str:
+    """들여쓰기/앞뒤 공백 제거 (코드 들여쓰기가 바뀌어도 프롬프트 바이트가 바뀌지 않도록)"""
+    return textwrap.dedent(text).strip()
+
+
+class PromptTemplate:
+    """고정 prefix + 가변 suffix 로 나뉜 시스템 프롬프트
+
+    vLLM automatic prefix caching은 앞에서부터 같은 토큰 블록만 재사용하므로
+    요청마다 바뀌는 값(output_language, 길이, 태그 등)은 모두 suffix에만 둔다.
+
+    Attributes:
+        name: 템플릿 이름
+        static: 모든 요청에서 바이트 단위로 같은 prefix (format 하지 않으므로 중괄호를 그대로 씀)
+        dynamic: str.format 으로 채우는 suffix
+        fields: suffix에서 쓰는 변수 이름
+    """
+
+    def __init__(self, name: str, static: str, dynamic: str = ""):
+        self.name = name
+        self.static = _normalize(static)
+        self.dynamic = _normalize(dynamic)
+        self.fields = tuple(
+            field for _, field, _, _ in string.Formatter().parse(self.dynamic) if field
+        )
+        self.prefix_hash = hashlib.sha256(self.static.encode("utf-8")).hexdigest()[:12]
+
+    def render(self, **values) -> str:
+        missing = [field for field in self.fields if field not in values]
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' is missing values for {missing}")
+        if not self.dynamic:
+            return self.static
+        return f"{self.static}\n\n{self.dynamic.format(**values)}"
+
+    def snapshot(self) -> dict:
+        return {
+            "prefix_hash": self.prefix_hash,
+            "prefix_chars": len(self.static),
+            "fields": list(self.fields),
+        }
+
+
+class PromptRegistry:
+    """프롬프트 템플릿을 한 번만 컴파일해서 재사용하는 저장소
+
+    클라이언트 모듈이 import 될 때 register 하고, 요청마다 render만 호출한다.
+    """
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, name: str, static: str, dynamic: str = "") -> PromptTemplate:
+        """템플릿 등록 (같은 이름 + 같은 내용이면 기존 템플릿 반환)
+
+        Raises:
+            ValueError: 같은 이름으로 다른 내용을 등록한 경우
+        """
+        template = PromptTemplate(name, static, dynamic)
+        registered = self._templates.get(name)
+        if registered is not None:
+            if (registered.static, registered.dynamic) != (template.static, template.dynamic):
+                raise ValueError(f"Prompt '{name}' is already registered with different content")
+            return registered
+        self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, **values) -> str:
+        return self._templates[name].render(**values)
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {name: template.snapshot() for name, template in self._templates.items()}
+
+
+# 프로세스 전역 레지스트리
+prompt_registry = PromptRegistry()
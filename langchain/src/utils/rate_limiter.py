@@ -0,0 +1,140 @@
+# src/utils/rate_limiter.py
+import asyncio
+import time
+from typing import Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """비동기 토큰 버킷
+
+    초당 rate개의 토큰이 보충되고 최대 burst개까지 쌓인다.
+    대기 중인 요청은 asyncio.Lock의 FIFO 순서대로 깨어나므로
+    먼저 들어온 요청이 먼저 토큰을 받는다 (fair wakeup).
+    """
+
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = float(rate)
+        self.burst = int(burst)
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        # NOTE : Lock은 이벤트 루프 안에서 처음 사용할 때 생성 (import 시점의 루프와 엮이지 않도록)
+        self._lock: Optional[asyncio.Lock] = None
+
+        # 상태 export 용 카운터
+        self.waiting = 0
+        self.total_acquired = 0
+        self.total_wait_time = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def configure(self, rate: float = None, burst: int = None):
+        """실행 중에 보충 속도와 버스트 크기를 변경"""
+        self._refill(time.monotonic())
+        if rate is not None:
+            if rate <= 0:
+                raise ValueError("rate must be greater than 0")
+            self.rate = float(rate)
+        if burst is not None:
+            if burst < 1:
+                raise ValueError("burst must be at least 1")
+            self.burst = int(burst)
+            self.tokens = min(self.tokens, self.burst)
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """토큰을 얻을 때까지 대기
+
+        Args:
+            tokens: 소비할 토큰 수
+
+        Returns:
+            float: 대기한 시간(초)
+        """
+        if tokens > self.burst:
+            raise ValueError(f"Cannot acquire {tokens} tokens from bucket with burst {self.burst}")
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    self._refill(time.monotonic())
+                    if self.tokens >= tokens:
+                        self.tokens -= tokens
+                        break
+                    # 부족한 토큰이 채워질 때까지만 잠들기
+                    await asyncio.sleep((tokens - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.total_acquired += 1
+        self.total_wait_time += waited
+        return waited
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """대기 없이 토큰 획득을 시도 (대기자가 있으면 새치기하지 않음)"""
+        if self.waiting:
+            return False
+        self._refill(time.monotonic())
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            self.total_acquired += 1
+            return True
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 3),
+            "waiting": self.waiting,
+            "total_acquired": self.total_acquired,
+            "avg_wait_seconds": round(self.total_wait_time / self.total_acquired, 4) if self.total_acquired else 0.0,
+        }
+
+
+class ModelRateLimiter:
+    """model_key(OpenAIService.model_router의 키) 별로 독립된 토큰 버킷을 관리
+
+    eeve와 gemma가 서로 다른 vLLM 서버를 쓰므로 한 모델의 트래픽이
+    다른 모델의 예산을 소진하지 않도록 버킷을 분리한다.
+    """
+
+    def __init__(self,
+                 limits: Dict[str, Dict[str, float]] = None,
+                 default_rate: float = 20,
+                 default_burst: int = 20):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.buckets: Dict[str, TokenBucket] = {}
+        for model_key, limit in (limits or {}).items():
+            self.buckets[model_key] = TokenBucket(
+                rate=limit.get("rate", default_rate),
+                burst=limit.get("burst", default_burst)
+            )
+
+    def bucket(self, model_key: str) -> TokenBucket:
+        if model_key not in self.buckets:
+            logger.info(f"Creating default token bucket for model '{model_key}'")
+            self.buckets[model_key] = TokenBucket(rate=self.default_rate, burst=self.default_burst)
+        return self.buckets[model_key]
+
+    async def acquire(self, model_key: str, tokens: float = 1.0) -> float:
+        return await self.bucket(model_key).acquire(tokens)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {model_key: bucket.snapshot() for model_key, bucket in self.buckets.items()}
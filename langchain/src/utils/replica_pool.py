@@ -0,0 +1,219 @@
+# src/utils/replica_pool.py
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import logging
+
+import httpx
+
+from src.utils.concurrency_limiter import is_overload_error
+from src.utils.metrics import in_flight
+from src.utils.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    """vLLM 서버 1대와 그 서버를 호출하는 클라이언트들
+
+    Attributes:
+        base_url: vLLM OpenAI 호환 서버 주소 (.../v1)
+        clients: 이 서버용 클라이언트 (예: {"chat": ChatOpenAI, "completion": AsyncOpenAI})
+    """
+
+    def __init__(self, base_url: str, clients: Dict[str, Any] = None):
+        self.base_url = base_url.rstrip("/")
+        self.clients = clients or {}
+
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.eject_count = 0  # 연속으로 제외된 횟수 (제외 시간 backoff 용)
+        self.ejected_by_probe = False  # health probe 실패로 제외됐는지 (probe는 자기가 제외한 replica만 복귀시킴)
+
+        # 상태 export 용 카운터
+        self.total_requests = 0
+        self.total_failures = 0
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until > time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "healthy": not self.ejected,
+            "outstanding": self.outstanding,
+            "ewma_latency": round(self.ewma_latency, 4) if self.ewma_latency is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "eject_count": self.eject_count,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+        }
+
+
+class ReplicaPool:
+    """논리 모델 1개(eeve, gemma)에 대한 vLLM replica 묶음
+
+    - 선택: 정상 replica 중 2개를 무작위로 뽑아 (진행 중 요청 수 + 1) * 평균 지연이 작은 쪽 (power of two choices)
+    - 수동 health: 과부하/연결 에러가 max_failures번 연속되면 eject_seconds 동안 제외 (반복되면 최대 8배까지 늘림)
+    - 능동 health: 주기적으로 {base_url}/models 를 호출해서 실패하면 제외, probe가 제외한 replica는 성공하면 바로 복귀
+      (과부하 vLLM도 /models 에는 200을 주므로, 요청 실패로 제외된 replica는 제외 시간이 끝날 때까지 기다림)
+    - 제외 시간이 지나면 다시 후보가 되고 (half-open), 첫 요청이 실패하면 바로 다시 제외
+    - 모든 replica가 제외된 경우에는 그래도 가장 빨리 복귀할 replica로 보낸다
+    """
+
+    def __init__(self,
+                 name: str,
+                 replicas: List[Replica],
+                 max_failures: int = 3,
+                 eject_seconds: float = 30,
+                 latency_smoothing: float = 0.2):
+        if not replicas:
+            raise ValueError(f"Replica pool '{name}' needs at least one replica")
+        self.name = name
+        self.replicas = replicas
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.latency_smoothing = latency_smoothing
+        self._probe_task: Optional[asyncio.Task] = None
+        # health probe 전용 client (요청 트래픽의 connection pool이 가득 차도 probe가 막히지 않도록 따로 둠)
+        self._probe_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def primary(self) -> Replica:
+        return self.replicas[0]
+
+    def _score(self, replica: Replica) -> float:
+        known = [r.ewma_latency for r in self.replicas if r.ewma_latency is not None]
+        # 아직 측정값이 없는 replica는 평균값으로 취급 (새 replica도 트래픽을 받도록)
+        latency = replica.ewma_latency if replica.ewma_latency is not None else \
+            (sum(known) / len(known) if known else 1.0)
+        return (replica.outstanding + 1) * latency
+
+    def pick(self) -> Replica:
+        candidates = [r for r in self.replicas if not r.ejected]
+        if not candidates:
+            return min(self.replicas, key=lambda r: r.ejected_until)
+        if len(candidates) == 1:
+            return candidates[0]
+        a, b = random.sample(candidates, 2)
+        return a if self._score(a) <= self._score(b) else b
+
+    @asynccontextmanager
+    async def lease(self):
+        """replica 하나를 골라 요청 1건 동안 사용
+
+        async with pool.lease() as replica:
+            await replica.clients["chat"].ainvoke(...)
+        """
+        replica = self.pick()
+        gauge = in_flight(self.name, replica.base_url)
+        current_span().set_attribute("replica", replica.base_url)
+        replica.outstanding += 1
+        gauge.inc()
+        replica.total_requests += 1
+        start = time.monotonic()
+        try:
+            yield replica
+        except asyncio.CancelledError:
+            # 호출한 쪽의 취소(타임아웃, 연결 끊김)는 replica 상태와 무관
+            raise
+        except Exception as e:
+            if is_overload_error(e):
+                self.record_failure(replica, reason=type(e).__name__)
+            raise
+        else:
+            self.record_success(replica, time.monotonic() - start)
+        finally:
+            replica.outstanding -= 1
+            gauge.dec()
+
+    def record_success(self, replica: Replica, latency: float = None):
+        if latency is not None:
+            replica.ewma_latency = latency if replica.ewma_latency is None else \
+                (1 - self.latency_smoothing) * replica.ewma_latency + self.latency_smoothing * latency
+        replica.consecutive_failures = 0
+        if replica.eject_count and not replica.ejected:
+            logger.info(f"[{self.name}] replica {replica.base_url} recovered")
+            replica.eject_count = 0
+
+    def record_failure(self, replica: Replica, reason: str = ""):
+        replica.total_failures += 1
+        replica.consecutive_failures += 1
+        # half-open 상태(제외됐다가 복귀한 직후)에서는 한 번만 실패해도 다시 제외
+        if replica.consecutive_failures >= self.max_failures or replica.eject_count:
+            self.eject(replica, reason)
+
+    def eject(self, replica: Replica, reason: str = "", by_probe: bool = False):
+        backoff = min(2 ** replica.eject_count, 8)
+        replica.ejected_until = time.monotonic() + self.eject_seconds * backoff
+        replica.eject_count += 1
+        replica.ejected_by_probe = by_probe
+        replica.consecutive_failures = 0
+        logger.warning(f"[{self.name}] replica {replica.base_url} ejected for "
+                       f"{self.eject_seconds * backoff:.0f}s ({reason})")
+
+    def readmit(self, replica: Replica):
+        """probe가 제외한 replica를 바로 복귀 (eject_count는 남겨서 half-open / backoff가 그대로 동작)"""
+        if replica.ejected:
+            logger.info(f"[{self.name}] replica {replica.base_url} re-admitted by health probe")
+        replica.ejected_until = 0.0
+        replica.ejected_by_probe = False
+        replica.consecutive_failures = 0
+
+    async def probe(self, timeout: float = 3):
+        """모든 replica의 /models 를 호출해서 상태 갱신"""
+        if self._probe_client is None or self._probe_client.is_closed:
+            self._probe_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=len(self.replicas), max_keepalive_connections=len(self.replicas))
+            )
+        http_client = self._probe_client
+
+        async def probe_one(replica: Replica):
+            try:
+                response = await http_client.get(f"{replica.base_url}/models", timeout=timeout)
+                healthy = response.status_code == 200
+            except Exception as e:
+                logger.debug(f"[{self.name}] probe to {replica.base_url} failed: {e}")
+                healthy = False
+            if healthy:
+                if replica.ejected_by_probe:
+                    self.readmit(replica)
+            elif not replica.ejected:
+                self.eject(replica, "health probe failed", by_probe=True)
+
+        await asyncio.gather(*(probe_one(replica) for replica in self.replicas))
+
+    async def _probe_loop(self, interval: float, timeout: float):
+        while True:
+            try:
+                await self.probe(timeout)
+            except Exception as e:
+                logger.error(f"[{self.name}] health probe loop error: {e}")
+            await asyncio.sleep(interval)
+
+    def start_probes(self, interval: float = 10, timeout: float = 3):
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.ensure_future(self._probe_loop(interval, timeout))
+
+    async def stop_probes(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        if self._probe_client is not None:
+            await self._probe_client.aclose()
+            self._probe_client = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "healthy_replicas": sum(1 for r in self.replicas if not r.ejected),
+            "replicas": [r.snapshot() for r in self.replicas],
+        }
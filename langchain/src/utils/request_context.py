@@ -0,0 +1,159 @@
+# src/utils/request_context.py
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 요청 단위 deadline (time.monotonic 기준). asyncio task는 생성 시점의 context를 복사하므로
+# 엔드포인트에서 설정하면 gather / ensure_future로 나뉜 하위 작업까지 그대로 전달된다.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+# 요청의 스케줄링 정보 (concurrency_limiter.PRIORITY_CLASSES 중 하나, tenant = Completions.user)
+_priority: ContextVar[Optional[str]] = ContextVar("request_priority", default=None)
+_tenant: ContextVar[Optional[str]] = ContextVar("request_tenant", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """요청 budget을 다 써서 더 이상 LLM 호출을 할 수 없음"""
+
+
+class ClientDisconnected(Exception):
+    """클라이언트 연결이 끊겨서 작업을 취소함"""
+
+
+def get_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """남은 시간(초). deadline이 없으면 None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def remaining_timeout(default: float) -> float:
+    """각 단계의 기본 타임아웃과 남은 budget 중 작은 값
+
+    Args:
+        default: deadline이 없을 때 쓸 단계별 타임아웃(초)
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return default
+    return min(default, remaining)
+
+
+def get_priority() -> Optional[str]:
+    return _priority.get()
+
+
+def get_tenant() -> Optional[str]:
+    return _tenant.get()
+
+
+@contextmanager
+def scheduling_scope(priority: str = None, tenant: str = None):
+    """with 블록 안에서 만든 LLM 호출에 priority class / tenant 지정 (None이면 바깥 값 유지)"""
+    tokens = []
+    if priority is not None:
+        tokens.append((_priority, _priority.set(priority)))
+    if tenant is not None:
+        tokens.append((_tenant, _tenant.set(tenant)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+@contextmanager
+def deadline_scope(timeout: float):
+    """with 블록 안에서 deadline 설정 (바깥 deadline보다 늦게 잡히지는 않음)"""
+    deadline = time.monotonic() + timeout
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def clear_request_scope():
+    """현재 context의 deadline / priority / tenant를 지움
+
+    contextvars.copy_context()로 복사한 context 안에서(ctx.run) 호출해서
+    여러 요청이 공유하는 task가 특정 요청의 budget / priority를 물려받지 않게 할 때 사용
+    """
+    _deadline.set(None)
+    _priority.set(None)
+    _tenant.set(None)
+
+
+@contextmanager
+def background_scope(timeout: float, priority: str = "bulk", tenant: str = None):
+    """요청과 분리된 백그라운드 작업용 scope
+
+    with 블록 안에서 만든 task는 바깥 요청의 deadline을 물려받지 않고 새 deadline(timeout 초)을 가진다.
+    (응답을 먼저 보낸 뒤에도 계속 실행되는 prefetch 등)
+    """
+    token = _deadline.set(time.monotonic() + timeout)
+    try:
+        with scheduling_scope(priority, tenant):
+            yield
+    finally:
+        _deadline.reset(token)
+
+
+async def run_with_deadline(coro: Awaitable[Any], timeout: float, request=None, poll_interval: float = 0.5,
+                            priority: str = None, tenant: str = None) -> Any:
+    """요청 budget 안에서 coro를 실행
+
+    - budget을 다 쓰면 진행 중인 하위 작업(vLLM 호출 포함)을 모두 취소하고 DeadlineExceeded
+    - request(starlette Request)를 주면 클라이언트 연결이 끊겼을 때도 취소하고 ClientDisconnected
+
+    Args:
+        coro: 실행할 코루틴 (엔드포인트의 실제 처리)
+        timeout: 요청 전체 budget(초)
+        request: 연결 끊김을 확인할 FastAPI Request
+        poll_interval: 연결 상태 확인 주기(초)
+        priority: 하위 LLM 호출의 priority class (interactive / default / bulk)
+        tenant: 하위 LLM 호출을 공정하게 나눌 단위 (Completions.user)
+    """
+    with deadline_scope(timeout) as deadline, scheduling_scope(priority, tenant):
+        # task 생성 시점에 deadline / priority / tenant가 context에 복사됨
+        task = asyncio.ensure_future(coro)
+
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Request deadline of {timeout}s exceeded")
+            wait = remaining if request is None else min(poll_interval, remaining)
+            done, _ = await asyncio.wait({task}, timeout=wait)
+            if done:
+                return task.result()
+            if request is not None and await request.is_disconnected():
+                raise ClientDisconnected("Client disconnected")
+    finally:
+        if not task.done():
+            # 하위 task(gather 된 LLM 호출들)까지 취소가 전파되어 GPU 슬롯을 바로 반납
+            logger.info("Cancelling in-flight request work (deadline exceeded or client disconnected)")
+            task.cancel()
+
+
+async def gather_with_deadline(coros, timeout: float, request=None, return_exceptions: bool = True,
+                               priority: str = None, tenant: str = None) -> list:
+    """asyncio.gather(*coros)를 요청 budget 안에서 실행
+
+    NOTE : gather는 호출 시점에 task를 만들기 때문에 deadline이 설정된 task 안에서 호출해야 한다.
+    """
+    async def _gather():
+        return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+    return await run_with_deadline(_gather(), timeout, request, priority=priority, tenant=tenant)
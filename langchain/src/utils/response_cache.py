@@ -0,0 +1,137 @@
+# src/utils/response_cache.py
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 같은 결과를 만드는 요청인지 판단할 때 보는 필드
+REQUEST_KEY_FIELDS = (
+    "model", "sys_prompt", "usr_prompt", "messages", "prompt",
+    "extra_body", "max_tokens", "temperature", "top_p", "n",
+)
+
+
+def make_request_key(request: Dict[str, Any]) -> str:
+    """model / 프롬프트 / extra_body / sampling 파라미터의 canonical 해시
+
+    dict 키 순서와 상관없이 같은 요청이면 같은 키가 나온다.
+    """
+    keyed = {field: request.get(field) for field in REQUEST_KEY_FIELDS if request.get(field) is not None}
+    canonical = json.dumps(keyed, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """크기/TTL 기반으로 만료되는 프로세스 내 LRU 캐시"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.evictions += 1
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    """LLM 응답 2단 캐시 (프로세스 내 LRU + Redis)
+
+    값은 JSON 문자열로 저장하고 꺼낼 때마다 새로 decode 한다.
+    (호출하는 쪽에서 result.data를 직접 수정하므로 캐시 원본을 공유하면 안 됨)
+    Redis(redis.asyncio 클라이언트) 에러는 캐시 miss로 처리하고 요청은 그대로 진행한다.
+    """
+
+    def __init__(self,
+                 max_size: int = 1024,
+                 ttl: float = 3600,
+                 redis_client=None,
+                 redis_ttl: int = 86400,
+                 key_prefix: str = "llm:cache:"):
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.redis_client = redis_client
+        self.redis_ttl = redis_ttl
+        self.key_prefix = key_prefix
+
+        # 상태 export 용 카운터
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.redis_errors = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return json.loads(value)
+
+        if self.redis_client is not None:
+            try:
+                value = await self.redis_client.get(self.key_prefix + key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Redis cache get failed: {e}")
+                value = None
+            if value is not None:
+                self.redis_hits += 1
+                self.local.set(key, value)
+                return json.loads(value)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, data: Any):
+        try:
+            value = json.dumps(data, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # JSON으로 못 바꾸는 응답(AIMessage 등)은 캐시하지 않음
+            return
+        self.local.set(key, value)
+        self.stores += 1
+
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.setex(self.key_prefix + key, self.redis_ttl, value)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Redis cache set failed: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        hits = self.local_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self.local),
+            "max_size": self.local.max_size,
+            "redis_enabled": self.redis_client is not None,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.local.evictions,
+            "redis_errors": self.redis_errors,
+        }
@@ -0,0 +1,84 @@
+# src/utils/single_flight.py
+import asyncio
+import contextvars
+import copy
+from typing import Dict, Any, Callable, Awaitable
+import logging
+
+from src.utils.request_context import DeadlineExceeded, clear_request_scope, remaining_time
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """같은 키의 요청이 진행 중이면 새로 보내지 않고 진행 중인 결과를 함께 기다림
+
+    - 실제 호출은 별도 task로 실행되고 호출자들은 asyncio.shield로 기다린다.
+      한 호출자가 취소되어도 다른 호출자의 결과에는 영향이 없다.
+    - 실제 호출 task는 처음 호출한 요청의 deadline / priority / tenant를 물려받지 않는다.
+      deadline은 호출자마다 각자 기다리는 시간으로 적용된다. (budget이 짧은 호출자만 DeadlineExceeded)
+    - 기다리는 호출자가 모두 취소되면 실제 호출 task도 취소한다.
+    - 에러는 기다리는 모든 호출자에게 그대로 전달된다.
+    - 호출자들이 결과를 직접 수정하므로 각자 복사본을 받는다.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+
+        # 상태 export 용 카운터
+        self.total_calls = 0
+        self.total_deduplicated = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            # tracing span 등은 유지하고 요청별 scheduling 정보만 지운 context에서 실행
+            context = contextvars.copy_context()
+            context.run(clear_request_scope)
+            call = _Call(context.run(asyncio.ensure_future, fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._forget(key, call))
+            self.total_calls += 1
+        else:
+            self.total_deduplicated += 1
+            logger.debug(f"Joining in-flight request {key[:12]} ({call.waiters} waiting)")
+
+        call.waiters += 1
+        try:
+            remaining = remaining_time()
+            if remaining is None:
+                result = await asyncio.shield(call.task)
+            else:
+                try:
+                    result = await asyncio.wait_for(asyncio.shield(call.task), timeout=remaining)
+                except asyncio.TimeoutError:
+                    if call.task.done():
+                        raise
+                    raise DeadlineExceeded(f"Deadline exceeded while waiting for in-flight request {key[:12]}")
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 아무도 기다리지 않는 요청은 GPU 낭비이므로 취소
+                call.task.cancel()
+                self._forget(key, call)
+        return copy.deepcopy(result)
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # 아무도 결과를 가져가지 않은 예외가 "never retrieved" 경고로 남지 않도록
+        if call.task.done() and not call.task.cancelled():
+            call.task.exception()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "total_calls": self.total_calls,
+            "total_deduplicated": self.total_deduplicated,
+        }
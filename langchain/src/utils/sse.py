@@ -0,0 +1,57 @@
+# src/utils/sse.py
+import asyncio
+from typing import Any, AsyncIterator, List
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def dumps(data: Any) -> bytes:
+    """orjson 직렬화 (ORJSONResponse와 같은 옵션, 한글은 그대로 UTF-8)"""
+    return orjson.dumps(jsonable_encoder(data), option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Server-Sent Events 한 건을 문자열로 변환"""
+    payload = dumps(data).decode("utf-8")
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def format_ndjson(data: Any) -> bytes:
+    """NDJSON 한 줄로 변환"""
+    return dumps(data) + b"\n"
+
+
+async def merge_streams(streams: List[AsyncIterator[Any]]) -> AsyncIterator[Any]:
+    """여러 async generator를 동시에 돌리면서 먼저 나온 항목부터 yield
+
+    소비하는 쪽이 중간에 멈추면(클라이언트 연결 종료 등) 남은 generator를 모두 취소한다.
+    각 generator의 예외는 그대로 전달되므로 generator 안에서 처리해두는 것이 좋다.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def drain(stream):
+        try:
+            async for item in stream:
+                await queue.put(item)
+        finally:
+            await queue.put(finished)
+
+    tasks = [asyncio.ensure_future(drain(stream)) for stream in streams]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is finished:
+                remaining -= 1
+                continue
+            yield item
+        # 예외로 끝난 generator가 있으면 전달
+        for task in tasks:
+            task.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
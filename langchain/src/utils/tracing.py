@@ -0,0 +1,393 @@
+# src/utils/tracing.py
+import asyncio
+import functools
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional
+import logging
+
+import httpx
+import orjson
+
+from src.configs.batch_config import TracingConfig
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_EXPORT_BATCH_SIZE = 64
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def parse_traceparent(header: Optional[str]):
+    """W3C traceparent 헤더 → (trace_id, parent span id, sampled). 형식이 틀리면 None"""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class Span:
+    """시간 구간 1개 (trace 안에서 parent_id로 트리를 이룸)"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    sampled = True
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str] = None, attributes: Dict[str, Any] = None):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = "error"
+        self.attributes["error.type"] = type(error).__name__
+        message = str(error)
+        if message:
+            self.attributes["error.message"] = message[:500]
+
+    def end(self, error: BaseException = None):
+        """span 종료 (여러 번 호출해도 처음 한 번만 반영)"""
+        if self.end_ns is not None:
+            return
+        if error is not None:
+            self.record_error(error)
+        self.end_ns = time.time_ns()
+        self.trace.tracer._on_end(self)
+
+
+class _NoopSpan:
+    """sampling되지 않은 요청에서 쓰는 span (아무것도 기록하지 않음)"""
+
+    sampled = False
+    trace = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self, error: BaseException = None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+# 지금 열려 있는 span. NOOP_SPAN이면 sampling되지 않은 요청 안이라는 뜻 (하위 span도 만들지 않음)
+_current_span: ContextVar[Optional[Any]] = ContextVar("trace_span", default=None)
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextmanager
+def use_span(span):
+    """with 블록 안에서 span을 현재 span으로 지정 (종료는 하지 않음)"""
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+class Trace:
+    """요청 1건의 span 묶음 (root span이 끝나면 통째로 내보냄)"""
+
+    __slots__ = ("tracer", "trace_id", "root", "spans", "dropped_spans", "finished")
+
+    def __init__(self, tracer: "Tracer", trace_id: str = None):
+        self.tracer = tracer
+        self.trace_id = trace_id or _new_id(128)
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self.finished = False
+
+    def to_tree(self) -> Dict[str, Any]:
+        """jsonl exporter 형식: root부터 children으로 중첩한 span 트리 (시각은 root 시작 기준 ms)"""
+        origin = self.root.start_ns
+        nodes = {}
+        for span in self.spans:
+            nodes[span.span_id] = {
+                "name": span.name,
+                "span_id": span.span_id,
+                "start_ms": round((span.start_ns - origin) / 1e6, 3),
+                "duration_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+                "status": span.status,
+                "attributes": span.attributes,
+                "children": [],
+            }
+        for span in self.spans:
+            if span is not self.root and span.parent_id in nodes:
+                nodes[span.parent_id]["children"].append(nodes[span.span_id])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "start_time": origin / 1e9,
+            "duration_ms": nodes[self.root.span_id]["duration_ms"],
+            "dropped_spans": self.dropped_spans,
+            "root": nodes[self.root.span_id],
+        }
+
+    def to_otlp_spans(self) -> List[Dict[str, Any]]:
+        """OTLP/HTTP JSON 형식의 span 목록"""
+        spans = []
+        for span in self.spans:
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 2 if span is self.root else 1,  # SERVER / INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": _otlp_attributes(span.attributes),
+                "status": {"code": 2 if span.status == "error" else 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+        return spans
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    converted = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            otlp_value = {"boolValue": value}
+        elif isinstance(value, int):
+            otlp_value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            otlp_value = {"doubleValue": value}
+        else:
+            otlp_value = {"stringValue": str(value)}
+        converted.append({"key": key, "value": otlp_value})
+    return converted
+
+
+class Tracer:
+    """contextvars 기반 경량 tracer
+
+    - 요청마다 root span(new_trace)을 만들고, 그 안에서 연 span은 contextvar로 parent를 찾는다.
+      (asyncio task는 만들 때 context를 복사하므로 gather로 나뉜 stage / send_request도 같은 trace에 붙음)
+    - sampling은 root에서 한 번만 결정하고, sampling되지 않은 요청은 NOOP_SPAN만 쓰므로 비용이 거의 없다.
+    - root span이 끝나면 trace를 queue에 넣고 백그라운드 task가 jsonl 파일 / OTLP collector로 내보낸다.
+      queue가 가득 차면 버림 (요청 처리를 막지 않음)
+    - root가 끝난 뒤에 시작한 span(응답 후에도 도는 백그라운드 작업 등)은 기록하지 않고 late_spans로만 센다.
+      root가 끝날 때 아직 열려 있던 span은 root 종료 시각까지로 잘라서 unfinished로 내보낸다.
+    """
+
+    def __init__(self, config: TracingConfig = None):
+        self.config = config or TracingConfig()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.stats = {
+            "sampled": 0,
+            "exported": 0,
+            "dropped": 0,
+            "late_spans": 0,
+            "export_errors": 0,
+        }
+
+    def new_trace(self, name: str, traceparent: str = None, **attributes):
+        """root span 생성 (sampling되지 않으면 NOOP_SPAN)
+
+        Args:
+            traceparent: 들어온 W3C traceparent 헤더 (sampled flag가 있으면 sample_rate 대신 따름)
+        """
+        parsed = parse_traceparent(traceparent)
+        if parsed is not None:
+            trace_id, parent_id, sampled = parsed
+        else:
+            trace_id, parent_id = None, None
+            sampled = random.random() < self.config.sample_rate
+        if not sampled:
+            return NOOP_SPAN
+
+        self.stats["sampled"] += 1
+        trace = Trace(self, trace_id)
+        root = Span(trace, name, parent_id, attributes)
+        trace.root = root
+        trace.spans.append(root)
+        return root
+
+    def start_span(self, name: str, **attributes):
+        """현재 span의 하위 span 생성 (현재 span으로 지정하지는 않음. 끝날 때 end() 호출)
+
+        현재 span이 없으면(요청 밖의 백그라운드 작업 등) 새 trace의 root가 된다.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return self.new_trace(name, **attributes)
+        if not parent.sampled:
+            return NOOP_SPAN
+        trace = parent.trace
+        if trace.finished:
+            self.stats["late_spans"] += 1
+            return NOOP_SPAN
+        if len(trace.spans) >= self.config.max_spans_per_trace:
+            trace.dropped_spans += 1
+            return NOOP_SPAN
+        span = Span(trace, name, parent.span_id, attributes)
+        trace.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """with 블록을 span 1개로 기록 (블록 안에서는 이 span이 현재 span)
+
+            with tracer.span("queue_wait", model=model_key) as span:
+                ...
+        """
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def _on_end(self, span: Span):
+        trace = span.trace
+        if trace.finished or span is not trace.root:
+            return
+        trace.finished = True
+        # root보다 늦게 끝나는 span은 root 종료 시각으로 잘라서 내보냄
+        for other in trace.spans:
+            if other.end_ns is None:
+                other.end_ns = span.end_ns
+                other.status = "unfinished"
+        if self._queue is None:
+            self.stats["dropped"] += 1
+            return
+        try:
+            self._queue.put_nowait(trace)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    def start(self):
+        """내보내기 task 시작 (이벤트 루프 안에서 호출)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.config.queue_size)
+        if "otlp" in self.config.exporters and self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(10, connect=5))
+        self._task = asyncio.ensure_future(self._export_loop())
+
+    async def stop(self):
+        """남은 trace를 내보내고 종료"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._queue is not None:
+            remaining = []
+            while not self._queue.empty():
+                remaining.append(self._queue.get_nowait())
+            self._queue = None
+            if remaining:
+                await self._export(remaining)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _export_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty() and len(batch) < _EXPORT_BATCH_SIZE:
+                batch.append(self._queue.get_nowait())
+            await self._export(batch)
+
+    async def _export(self, traces: List[Trace]):
+        for exporter in self.config.exporters:
+            try:
+                if exporter == "jsonl":
+                    await asyncio.to_thread(self._write_jsonl, [trace.to_tree() for trace in traces])
+                elif exporter == "otlp":
+                    await self._post_otlp(traces)
+                else:
+                    logger.warning(f"Unknown trace exporter '{exporter}'")
+                    continue
+            except Exception as e:
+                self.stats["export_errors"] += 1
+                logger.warning(f"Trace export to {exporter} failed: {e}")
+        self.stats["exported"] += len(traces)
+
+    def _write_jsonl(self, trees: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.config.jsonl_path) or ".", exist_ok=True)
+        with open(self.config.jsonl_path, "ab") as f:
+            for tree in trees:
+                f.write(orjson.dumps(tree, default=str) + b"\n")
+
+    async def _post_otlp(self, traces: List[Trace]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.config.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span for trace in traces for span in trace.to_otlp_spans()],
+                }],
+            }]
+        }
+        response = await self._client.post(
+            self.config.otlp_endpoint,
+            content=orjson.dumps(payload, default=str),
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.config.sample_rate,
+            "exporters": self.config.exporters,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            **self.stats,
+        }
+
+
+tracer = Tracer()
+
+
+def traced(name: str = None):
+    """async 함수 실행을 span 1개로 기록하는 decorator (span 이름 기본값은 Class.method)"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def end_after(body: AsyncIterator[bytes], span) -> AsyncIterator[bytes]:
+    """응답 body를 다 보낸 뒤 span 종료 (스트리밍 응답도 생성이 끝날 때까지 포함)"""
+    try:
+        async for chunk in body:
+            yield chunk
+    except BaseException as e:
+        span.end(e)
+        raise
+    finally:
+        span.end()
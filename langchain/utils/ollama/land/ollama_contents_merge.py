@@ -1,46 +1,29 @@
 from config.config import OLLAMA_API_URL
 import requests
 import json
-import aiohttp
+from utils.ollama.ollama_transport import OllamaTransport
 import asyncio
+from src.utils.tracing import traced
 
 
 class OllamaDataMergeClient:
 
     def __init__(self, api_url=OLLAMA_API_URL+'api/generate', temperature=0.7, model: str = '', user_msg: str = '', data: str = ''):
         self.api_url = api_url
+        self.transport = OllamaTransport(api_url)
         self.temperature = temperature
         self.model = model
         self.user_msg = user_msg
         self.data = data
 
+    @traced()
     async def send_request(self, prompt: str) -> str:
         payload = {
             "model": self.model,
             "prompt": prompt,
             "temperature": self.temperature,
         }
-        # aiohttp ClientSession을 사용하여 비동기 HTTP 요청 수행
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(self.api_url, json=payload, timeout=15) as response:
-                    response.raise_for_status()  # HTTP 에러 발생 시 예외 처리
-                    full_response = await response.text()  # 응답을 비동기적으로 읽기
-            except aiohttp.ClientError as e:
-                print(f"HTTP 요청 실패: {e}")
-                raise RuntimeError(f"Ollama API 요청 실패: {e}") from e
-
-        # 전체 응답을 줄 단위로 분할하고 JSON 파싱
-        lines = full_response.splitlines()
-        all_text = ""
-        for line in lines:
-            try:
-                json_line = json.loads(line.strip())
-                all_text += json_line.get("response", "")
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error: {e}")
-                continue
-
+        all_text = await self.transport.generate(payload, timeout=15)
         return all_text.strip() if all_text else "Empty response received"
 
     async def contents_merge(self) -> str:
@@ -1,9 +1,11 @@
 from config.config import OLLAMA_API_URL
+from utils.ollama.ollama_transport import OllamaTransport
 import requests, json, re
 from typing import List, Dict, Optional
 from pydantic import BaseModel, Field
 from langchain.output_parsers import PydanticOutputParser
 from utils.ollama.land.ollama_tagmatch import parse_html, extract_body_content_with_regex, fix_html_without_parser, convert_html_to_structure
+from src.utils.tracing import traced
 
 class BaseSection(BaseModel):
     section_type: str
@@ -34,9 +36,11 @@ class OllamaLandingClient:
     
     def __init__(self, api_url=OLLAMA_API_URL+'api/generate', temperature=0.4, model:str = ''):
         self.api_url = api_url
+        self.transport = OllamaTransport(api_url)
         self.temperature = temperature
         self.model = model
         
+    @traced()
     async def send_request(self, prompt: str) -> str:
         """
         공통 요청 처리 함수 : API 호출 및 응답 처리
@@ -50,26 +54,9 @@ class OllamaLandingClient:
             "temperature": self.temperature,
         }
         
-        try:
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()  # HTTP 에러 발생 시 예외 처리
-
-            full_response = response.text  # 전체 응답
-            lines = full_response.splitlines()
-            all_text = ""
-            for line in lines:
-                try:
-                    json_line = json.loads(line.strip())  # 각 줄을 JSON 파싱
-                    all_text += json_line.get("response", "")
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {e}")
-                    continue  # JSON 파싱 오류 시 건너뛰기
-                
-            return all_text.strip() if all_text else "Empty response received"
+        all_text = await self.transport.generate(payload)
+        return all_text.strip() if all_text else "Empty response received"
 
-        except requests.exceptions.RequestException as e:
-            print(f"HTTP 요청 실패: {e}")
-            raise RuntimeError(f"Ollama API 요청 실패: {e}")
 
     async def process_data(self, data: str) -> dict:
         """
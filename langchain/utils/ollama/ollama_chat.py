@@ -1,18 +1,22 @@
 import requests, json, random, re
 from config.config import OLLAMA_API_URL
+from utils.ollama.ollama_transport import OllamaTransport
 from langchain_ollama import OllamaLLM
 from langchain_core.prompts import ChatPromptTemplate
+from src.utils.tracing import traced
 
 
 class OllamaChatClient:
     def __init__(self, api_url=OLLAMA_API_URL+'api/chat', temperature=0.4, structure_limit = True,  n_ctx = 4196, max_token = 3000):
         self.api_url = api_url
+        self.transport = OllamaTransport(api_url)
         self.temperature = temperature
         self.structure_limit = structure_limit
         self.n_ctx = n_ctx
         self.max_token = max_token
         self.message_history = []
         
+    @traced()
     async def send_request(self, model: str, messages: list) -> str:
         """
         공통 요청 처리 함수: /chat API 호출 및 응답 처리
@@ -26,22 +30,13 @@ class OllamaChatClient:
             "stream" : False
         }
 
-        try:
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()  # HTTP 에러 발생 시 예외 처리
-
-            response_json = response.json()
-            print(f"response_json : {response_json}")
-            assistant_reply = response_json.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            return assistant_reply.strip() if assistant_reply else "Empty response received"
-
-        except requests.exceptions.RequestException as e:
-            print(f"HTTP 요청 실패: {e}")
-            raise RuntimeError(f"Ollama API 요청 실패: {e}")
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
+        response_json = await self.transport.json(payload)
+        if not response_json:
             return "Invalid JSON response received"
+        print(f"response_json : {response_json}")
+        assistant_reply = response_json.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+        return assistant_reply.strip() if assistant_reply else "Empty response received"
         
     def split_into_chunks(self, data: str, max_tokens: int) -> list:
         """
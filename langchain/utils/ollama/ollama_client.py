@@ -4,6 +4,7 @@ import json
 from typing import Optional, List, Any
 from langchain.llms.base import BaseLLM
 from config.config import OLLAMA_API_URL
+from utils.ollama.ollama_transport import OllamaTransport
 from langchain.schema import LLMResult
 from pydantic import Field
 from script.prompt import MENU_STRUCTURE, TITLE_STRUCTURE, KEYWORDS_STRUCTURE
@@ -18,6 +19,7 @@ logger = logging.getLogger(__name__)
 class OllamaClient:
     def __init__(self, api_url=OLLAMA_API_URL+'api/generate', temperature=0.5):
         self.api_url = api_url
+        self.transport = OllamaTransport(api_url)
         self.temperature = temperature
 
     def get_num_tokens(self, text: str) -> int:
@@ -43,26 +45,18 @@ class OllamaClient:
             "temperature": self.temperature,
         }
 
-        try:
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()  # HTTP 에러 발생 시 예외 처리
-
-            full_response = response.text  # 전체 응답
-            lines = full_response.splitlines()
-            all_text = ""
-            for line in lines:
-                try:
-                    json_line = json.loads(line.strip())  # 각 줄을 JSON 파싱
-                    all_text += json_line.get("response", "")
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {e}")
-                    continue  # JSON 파싱 오류 시 건너뛰기
-                
-            return all_text.strip() if all_text else "Empty response received"
+        all_text = self.transport.generate_sync(payload)
+        return all_text.strip() if all_text else "Empty response received"
 
-        except requests.exceptions.RequestException as e:
-            print(f"HTTP 요청 실패: {e}")
-            raise RuntimeError(f"Ollama API 요청 실패: {e}")
+    async def agenerate(self, model: str, prompt: str) -> str:
+        """generate의 비동기 버전 (async 코드에서는 이벤트 루프를 막지 않도록 이쪽을 사용)"""
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "temperature": self.temperature,
+        }
+        all_text = await self.transport.generate(payload)
+        return all_text.strip() if all_text else "Empty response received"
   
     def PDF_Menu(self, model: str, text: str) -> dict:
         """
@@ -176,30 +170,13 @@ class OllamaClient:
             # "top_k": 0.1,
             # "top_p": 0.25
         }
-        try:
-            print("start response : ", len(prompt))
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()  # HTTP 에러 발생 시 예외 처리
-
-            full_response = response.text  # 전체 응답
-            lines = full_response.splitlines()
-            all_text = ""
-            for line in lines:
-                try:
-                    json_line = json.loads(line.strip())  # 각 줄을 JSON 파싱
-                    all_text += json_line.get("response", "")
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {e}")
-                    continue  # JSON 파싱 오류 시 건너뛰기
-                
-            all_text = parse_response(all_text)
-            all_text = all_text[0]
-            print("all_text :", all_text[0])
-            return all_text.strip() if all_text else "Empty response received"
-
-        except requests.exceptions.RequestException as e:
-            print(f"HTTP 요청 실패: {e}")
-            raise RuntimeError(f"Ollama API 요청 실패: {e}")
+        print("start response : ", len(prompt))
+        all_text = self.transport.generate_sync(payload)
+        all_text = parse_response(all_text)
+        all_text = all_text[0]
+        print("all_text :", all_text[0])
+        return all_text.strip() if all_text else "Empty response received"
+
         
     def PDF_Menu_Contents(self, model: str, text: str, menu: str):
         """
@@ -224,30 +201,13 @@ class OllamaClient:
             "model": model,  # 사용 중인 Ollama 모델 이름으로 변경하세요
             "prompt": prompt
         }
-        try:
-            print("start response : ", len(prompt))
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()  # HTTP 에러 발생 시 예외 처리
-
-            full_response = response.text  # 전체 응답
-            lines = full_response.splitlines()
-            all_text = ""
-            for line in lines:
-                try:
-                    json_line = json.loads(line.strip())  # 각 줄을 JSON 파싱
-                    all_text += json_line.get("response", "")
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {e}")
-                    continue  # JSON 파싱 오류 시 건너뛰기
-                
-            all_text = parse_response(all_text)
-            all_text = all_text[0]
-            print("all_text :", all_text[0])
-            return all_text.strip() if all_text else "Empty response received"
-
-        except requests.exceptions.RequestException as e:
-            print(f"HTTP 요청 실패: {e}")
-            raise RuntimeError(f"Ollama API 요청 실패: {e}")
+        print("start response : ", len(prompt))
+        all_text = self.transport.generate_sync(payload)
+        all_text = parse_response(all_text)
+        all_text = all_text[0]
+        print("all_text :", all_text[0])
+        return all_text.strip() if all_text else "Empty response received"
+
     
     
     
@@ -305,7 +265,7 @@ class OllamaLLM(BaseLLM):
         return answer
 
     async def _acall(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-        answer = self._call(prompt, stop)
+        answer = await self.client.agenerate(model=self.model_name, prompt=prompt)
         return answer
 
     
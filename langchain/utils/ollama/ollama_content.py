@@ -1,20 +1,24 @@
 import requests, json, random, re
 from config.config import OLLAMA_API_URL
+from utils.ollama.ollama_transport import OllamaTransport
 from fastapi import HTTPException
 from langchain_ollama import OllamaLLM
 from langchain_core.prompts import ChatPromptTemplate
 import tiktoken
 from typing import List
 from utils.ollama.ollama_embedding import get_embedding_from_ollama
+from src.utils.tracing import traced
 
 class OllamaContentClient:
     def __init__(self, api_url=OLLAMA_API_URL+'api/generate', temperature=0.4, structure_limit = True,  n_ctx = 4096, max_token = 4096):
         self.api_url = api_url
+        self.transport = OllamaTransport(api_url)
         self.temperature = temperature
         self.structure_limit = structure_limit
         self.n_ctx = n_ctx
         self.max_token = max_token
         
+    @traced()
     async def send_request(self, model: str, prompt: str) -> str:
         """
         공통 요청 처리 함수: API 호출 및 응답 처리
@@ -28,26 +32,9 @@ class OllamaContentClient:
             "repetition penalty":1.2,
         }
 
-        try:
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()  # HTTP 에러 발생 시 예외 처리
-
-            full_response = response.text  # 전체 응답
-            lines = full_response.splitlines()
-            all_text = ""
-            for line in lines:
-                try:
-                    json_line = json.loads(line.strip())  # 각 줄을 JSON 파싱
-                    all_text += json_line.get("response", "")
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {e}")
-                    continue  # JSON 파싱 오류 시 건너뛰기
-                
-            return all_text.strip() if all_text else "Empty response received"
+        all_text = await self.transport.generate(payload)
+        return all_text.strip() if all_text else "Empty response received"
 
-        except requests.exceptions.RequestException as e:
-            print(f"HTTP 요청 실패: {e}")
-            raise RuntimeError(f"Ollama API 요청 실패: {e}")
     #========================================================================================
     # chunk test code
     
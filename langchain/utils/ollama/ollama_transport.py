@@ -0,0 +1,161 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import aiohttp
+import requests
+
+from src.utils.http_pools import http_pools
+
+logger = logging.getLogger(__name__)
+
+
+def response_text(obj: Dict[str, Any]) -> str:
+    """/api/generate 스트림 한 줄의 생성 텍스트"""
+    return obj.get("response", "")
+
+
+def message_text(obj: Dict[str, Any]) -> str:
+    """/api/chat 스트림 한 줄의 생성 텍스트"""
+    return (obj.get("message") or {}).get("content", "")
+
+
+class NDJSONDecoder:
+    """받은 chunk를 이어 붙이면서 완성된 줄만 JSON으로 파싱 (줄이 chunk 경계에서 잘려도 됨)"""
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return self._parse(lines)
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """마지막 줄 (stream=False 응답처럼 줄바꿈 없이 끝나는 경우)"""
+        lines, self._buffer = [self._buffer], b""
+        return self._parse(lines)
+
+    @staticmethod
+    def _parse(lines: List[bytes]) -> List[Dict[str, Any]]:
+        objects = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                objects.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                logger.warning(f"JSON decode error: {e}")
+        return objects
+
+
+class OllamaTransport:
+    """Ollama HTTP 호출 공통 처리
+
+    - 공유 aiohttp session(http_pools)으로 연결을 재사용하고 이벤트 루프를 막지 않는다.
+    - NDJSON 응답을 chunk가 도착하는 대로 파싱해서 한 줄씩 넘긴다. (전체 응답을 모아서 splitlines 하지 않음)
+    - generate / generate_sync에 stop_when을 주면 원하는 결과가 나온 시점에 응답을 닫아 생성을 일찍 멈추고,
+      호출한 task가 취소되어도 응답이 닫혀 Ollama 쪽 생성이 중단된다.
+    - 동기 코드(LangChain LLM._call 등)용 generate_sync는 requests.Session으로 같은 방식으로 처리한다.
+    """
+
+    _sync_session: Optional[requests.Session] = None
+
+    def __init__(self, api_url: str, timeout: float = None):
+        self.api_url = api_url
+        self.timeout = timeout
+
+    async def stream(self, payload: Dict[str, Any], timeout: float = None) -> AsyncIterator[Dict[str, Any]]:
+        """응답 NDJSON 객체를 도착하는 대로 yield
+
+        Raises:
+            RuntimeError: HTTP 요청 실패
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        session = await http_pools.ollama_session()
+        # timeout을 지정하지 않으면 session 기본값(연결 timeout만) 사용
+        request_kwargs = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        decoder = NDJSONDecoder()
+        try:
+            async with session.post(self.api_url, json=payload, **request_kwargs) as response:
+                response.raise_for_status()  # HTTP 에러 발생 시 예외 처리
+                async for chunk in response.content.iter_any():
+                    for obj in decoder.feed(chunk):
+                        yield obj
+                for obj in decoder.flush():
+                    yield obj
+        except aiohttp.ClientError as e:
+            logger.error(f"HTTP 요청 실패: {e}")
+            raise RuntimeError(f"Ollama API 요청 실패: {e}") from e
+
+    async def generate(self, payload: Dict[str, Any], timeout: float = None,
+                       extract: Callable[[Dict[str, Any]], str] = response_text,
+                       stop_when: Callable[[str], bool] = None) -> str:
+        """생성된 텍스트 전체
+
+        Args:
+            extract: NDJSON 객체 1개에서 텍스트를 꺼내는 함수 (/api/chat이면 message_text)
+            stop_when: 지금까지의 텍스트를 받아 True를 반환하면 응답을 닫고 그때까지의 텍스트 반환
+                (예: 첫 JSON 객체가 완성되면 멈춤 - stop_when=lambda text: text.rstrip().endswith("}"))
+        """
+        parts = []
+        stream = self.stream(payload, timeout)
+        try:
+            async for obj in stream:
+                parts.append(extract(obj))
+                if obj.get("done"):
+                    break
+                if stop_when is not None and stop_when("".join(parts)):
+                    break
+        finally:
+            # 중간에 멈추거나 취소되면 여기서 응답이 닫히면서 Ollama 쪽 생성도 중단됨
+            await stream.aclose()
+        return "".join(parts)
+
+    async def json(self, payload: Dict[str, Any], timeout: float = None) -> Dict[str, Any]:
+        """stream=False 요청의 응답 객체"""
+        result: Dict[str, Any] = {}
+        stream = self.stream(payload, timeout)
+        try:
+            async for obj in stream:
+                result = obj
+        finally:
+            await stream.aclose()
+        return result
+
+    @classmethod
+    def _session(cls) -> requests.Session:
+        if cls._sync_session is None:
+            cls._sync_session = requests.Session()
+        return cls._sync_session
+
+    def stream_sync(self, payload: Dict[str, Any], timeout: float = None) -> Iterator[Dict[str, Any]]:
+        timeout = timeout if timeout is not None else self.timeout
+        decoder = NDJSONDecoder()
+        try:
+            with self._session().post(self.api_url, json=payload, stream=True, timeout=timeout) as response:
+                response.raise_for_status()  # HTTP 에러 발생 시 예외 처리
+                for chunk in response.iter_content(chunk_size=None):
+                    yield from decoder.feed(chunk)
+                yield from decoder.flush()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"HTTP 요청 실패: {e}")
+            raise RuntimeError(f"Ollama API 요청 실패: {e}") from e
+
+    def generate_sync(self, payload: Dict[str, Any], timeout: float = None,
+                      extract: Callable[[Dict[str, Any]], str] = response_text,
+                      stop_when: Callable[[str], bool] = None) -> str:
+        """generate의 동기 버전 (이벤트 루프 밖에서만 사용, stop_when도 같은 방식으로 동작)"""
+        parts = []
+        stream = self.stream_sync(payload, timeout)
+        try:
+            for obj in stream:
+                parts.append(extract(obj))
+                if obj.get("done"):
+                    break
+                if stop_when is not None and stop_when("".join(parts)):
+                    break
+        finally:
+            stream.close()
+        return "".join(parts)